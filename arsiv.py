@@ -0,0 +1,194 @@
+"""
+Parquet arşiv katmanı
+Saklama süresi dolan ham ölçümler silinmek yerine sıkıştırılmış, sütun tabanlı Parquet
+dosyalarına taşınır. Düzen cihaz ve aya göredir:
+
+    data/archive/cihaz=<slave_id>/ay=<YYYYMM>/<ilk_ms>.parquet   (günlük parçalar, sınır gün başıdır)
+    data/archive/cihaz=<slave_id>/ay=<YYYYMM>/tam.parquet         (ay tamamen arşivlenince birleştirilir)
+
+Parça dosyasının adı o parçanın başladığı arşiv sınırıdır; yarıda kalan bir taşıma
+tekrarlandığında aynı dosyanın üzerine yazılır (aynı satır iki kez arşivlenmez).
+tam.parquet varsa klasördeki parçalar yok sayılır.
+
+pyarrow kurulu değilse KULLANILABILIR False olur; saklama süresi dolan veri eskisi
+gibi silinir.
+"""
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    KULLANILABILIR = True
+except ImportError:  # pragma: no cover - pyarrow opsiyonel
+    pa = ds = pq = None
+    KULLANILABILIR = False
+
+SIKISTIRMA = 'zstd'
+YAZMA_PARCASI = 50000   # Parquet row group başına satır
+OKUMA_PARCASI = 50000   # Okurken tek seferde dönen en fazla satır
+TAM_DOSYA = 'tam.parquet'
+
+# veritabani.OLCUM_SUTUNLARI sırası (zaman yerel saatin epoch ms'i olarak tutulur)
+SUTUNLAR = ('slave_id', 'zaman', 'guc', 'voltaj', 'akim', 'sicaklik', 'hata_kodu', 'hata_kodu_193', 'toplam_uretim_wh')
+
+
+def _sema():
+    return pa.schema([
+        ('slave_id', pa.int32()),
+        ('zaman', pa.timestamp('ms')),
+        ('guc', pa.float64()),
+        ('voltaj', pa.float64()),
+        ('akim', pa.float64()),
+        ('sicaklik', pa.float64()),
+        ('hata_kodu', pa.int64()),
+        ('hata_kodu_193', pa.int64()),
+        ('toplam_uretim_wh', pa.float64()),
+    ])
+
+
+def klasor(db_yolu):
+    """Veritabanı dosyasının yanındaki arşiv klasörü"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_yolu)), "archive")
+
+
+def _ay_klasoru(kok, slave_id, ay):
+    return os.path.join(kok, f"cihaz={int(slave_id)}", f"ay={ay}")
+
+
+def parca_yaz(kok, slave_id, ay, ad, satir_parcalari):
+    """
+    Bir cihazın bir aya ait satırlarını tek Parquet dosyasına yazar.
+
+    Args:
+        satir_parcalari: [(slave_id, zaman_ms, guc, ...), ...] listeleri üreten iterable
+        ad: dosya adı (uzantısız; parça için başlangıç sınırı)
+
+    Returns:
+        int: yazılan satır sayısı (0 ise dosya oluşturulmaz)
+    """
+    hedef_klasor = _ay_klasoru(kok, slave_id, ay)
+    os.makedirs(hedef_klasor, exist_ok=True)
+    hedef = os.path.join(hedef_klasor, f"{ad}.parquet")
+    gecici = hedef + ".tmp"
+    sema = _sema()
+    yazici = None
+    toplam = 0
+    try:
+        for satirlar in satir_parcalari:
+            if not satirlar:
+                continue
+            sutunlar = list(zip(*satirlar))
+            tablo = pa.Table.from_arrays(
+                [pa.array(deger, type=alan.type) for deger, alan in zip(sutunlar, sema)], schema=sema)
+            if yazici is None:
+                yazici = pq.ParquetWriter(gecici, sema, compression=SIKISTIRMA)
+            yazici.write_table(tablo, row_group_size=YAZMA_PARCASI)
+            toplam += len(satirlar)
+    finally:
+        if yazici is not None:
+            yazici.close()
+    if toplam:
+        os.replace(gecici, hedef)  # Yarım yazılmış dosya hiçbir zaman okunmaz
+    return toplam
+
+
+def ay_birlestir(kok, slave_id, ay):
+    """Ayın tüm parçalarını tek tam.parquet dosyasında birleştirir (ay tamamen arşivlendiğinde)"""
+    ay_klasoru = _ay_klasoru(kok, slave_id, ay)
+    parcalar = _parca_dosyalari(ay_klasoru)
+    if not parcalar or parcalar == [os.path.join(ay_klasoru, TAM_DOSYA)]:
+        return
+    hedef = os.path.join(ay_klasoru, TAM_DOSYA)
+    gecici = hedef + ".tmp"
+    with pq.ParquetWriter(gecici, _sema(), compression=SIKISTIRMA) as yazici:
+        for yol in parcalar:
+            dosya = pq.ParquetFile(yol)
+            for grup in range(dosya.num_row_groups):
+                yazici.write_table(dosya.read_row_group(grup), row_group_size=YAZMA_PARCASI)
+    os.replace(gecici, hedef)
+    for yol in parcalar:
+        if os.path.basename(yol) != TAM_DOSYA:
+            os.remove(yol)
+
+
+def _parca_dosyalari(ay_klasoru):
+    """Ay klasöründeki geçerli dosyalar, zaman sırasıyla (tam.parquet varsa sadece o)"""
+    try:
+        adlar = os.listdir(ay_klasoru)
+    except OSError:
+        return []
+    if TAM_DOSYA in adlar:
+        return [os.path.join(ay_klasoru, TAM_DOSYA)]
+    parcalar = sorted((int(ad[:-8]), ad) for ad in adlar if ad.endswith(".parquet") and ad[:-8].isdigit())
+    return [os.path.join(ay_klasoru, ad) for _, ad in parcalar]
+
+
+def _klasor_degerleri(yol, onek):
+    try:
+        return sorted(ad[len(onek):] for ad in os.listdir(yol) if ad.startswith(onek))
+    except OSError:
+        return []
+
+
+def parcalari_oku(kok, baslangic_ms, bitis_ms, slave_ids=None, sutunlar=SUTUNLAR):
+    """
+    [baslangic_ms, bitis_ms) aralığındaki arşiv satırlarını ay -> cihaz -> zaman sırasıyla,
+    en fazla OKUMA_PARCASI satırlık pyarrow RecordBatch'ler olarak üretir (zaman epoch ms int64).
+    Aralık ve ay/cihaz klasörleri dışında kalan dosyalar açılmaz.
+    """
+    if not KULLANILABILIR or bitis_ms <= baslangic_ms:
+        return
+    ilk_ay, son_ay = _ms_ay(baslangic_ms), _ms_ay(bitis_ms - 1)
+    cihazlar = sorted(int(deger) for deger in _klasor_degerleri(kok, "cihaz=") if deger.isdigit())
+    if slave_ids is not None:
+        secili = set(int(slave_id) for slave_id in slave_ids)
+        cihazlar = [slave_id for slave_id in cihazlar if slave_id in secili]
+    aylar = sorted({ay for slave_id in cihazlar
+                    for ay in _klasor_degerleri(os.path.join(kok, f"cihaz={slave_id}"), "ay=")
+                    if ilk_ay <= ay <= son_ay})
+    zaman = ds.field('zaman')
+    filtre = ((zaman >= pa.scalar(baslangic_ms, pa.timestamp('ms'))) &
+              (zaman < pa.scalar(bitis_ms, pa.timestamp('ms'))))
+    for ay in aylar:
+        for slave_id in cihazlar:
+            for yol in _parca_dosyalari(_ay_klasoru(kok, slave_id, ay)):
+                try:
+                    parcalar = ds.dataset(yol, format='parquet').to_batches(
+                        columns=list(sutunlar), filter=filtre, batch_size=OKUMA_PARCASI)
+                    for parca in parcalar:
+                        if parca.num_rows:
+                            yield _zaman_ms_yap(parca)
+                except (OSError, pa.ArrowException) as e:
+                    logging.warning(f"Arşiv dosyası okunamadı ({yol}): {e}")
+
+
+def _zaman_ms_yap(parca):
+    i = parca.schema.get_field_index('zaman')
+    if i < 0:
+        return parca
+    return parca.set_column(i, 'zaman', parca.column(i).cast(pa.int64()))
+
+
+def _ms_ay(ms):
+    """epoch ms -> 'YYYYMM' (naif yerel saat)"""
+    return (datetime(1970, 1, 1) + timedelta(milliseconds=int(ms))).strftime('%Y%m')
+
+
+def istatistik(kok):
+    """Arşivdeki dosya sayısı ve toplam boyut (MB)"""
+    dosya, boyut = 0, 0
+    for dizin, _, adlar in os.walk(kok):
+        for ad in adlar:
+            if ad.endswith(".parquet"):
+                dosya += 1
+                boyut += os.path.getsize(os.path.join(dizin, ad))
+    return {'dosya_sayisi': dosya, 'boyut_mb': round(boyut / (1024 * 1024), 2)}
+
+
+def temizle(kok):
+    """Arşivi tamamen sil (db_temizle ile birlikte)"""
+    shutil.rmtree(kok, ignore_errors=True)
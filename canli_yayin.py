@@ -0,0 +1,248 @@
+"""
+Canlı veri yayını (collector -> panel)
+Collector okuduğu her örneği yerel bir Unix soketinden yayınlar ve cihaz başına son
+örnekleri halka tamponlarda (ring buffer) tutar. Panel süreci tek bir abone bağlantısı
+açar; bağlanınca tamponların anlık görüntüsünü, sonra her yeni örneği alır.
+Böylece kaç tarayıcı açık olursa olsun gateway'e ek Modbus isteği, veritabanına ek
+yazma gitmez. Her abonenin kendi gönderme kuyruğu ve thread'i vardır; takılan bir
+panel yayinla()'yı (dolayısıyla collector döngüsünü) bekletmez.
+
+Protokol: satır başına bir JSON mesaj
+    {"tip": "anlik", "ornekler": {"<slave_id>": [[zaman, ornek], ...]}}
+    {"tip": "ornek", "id": slave_id, "zaman": "...", "ornek": {...}}
+"""
+import collections
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+
+import veritabani
+
+# Soket veritabanıyla aynı klasörde (Docker'da iki konteynerin paylaştığı data volume'u)
+SOKET_YOLU = os.environ.get(
+    "CANLI_SOKET", os.path.join(os.path.dirname(veritabani.DB_NAME) or ".", "canli.sock"))
+
+# Cihaz başına tutulan son örnek sayısı
+HALKA_BOYUTU = 300
+
+# Mesajı bu sürede alamayan (takılmış) abonenin bağlantısı kesilir
+GONDERME_ZAMAN_ASIMI = 1.0
+
+# Abone başına gönderilmeyi bekleyen en fazla mesaj; dolarsa abone düşürülür
+# (yeniden bağlanınca anlık görüntüyü baştan alır, arada örnek kaçırmaz)
+ABONE_KUYRUGU = 1000
+
+# Abone bağlantısı koparsa yeniden deneme aralığı (saniye)
+YENIDEN_BAGLANMA = 2.0
+
+
+def _satir(mesaj):
+    return (json.dumps(mesaj, ensure_ascii=False, separators=(',', ':')) + "\n").encode()
+
+
+class _Abonelik:
+    """
+    Tek abonenin gönderme kuyruğu. Önce anlık görüntü, sonra kuyruğa eklenen satırlar
+    abonenin kendi thread'inde gönderilir; gönderemeyen abonelik kendini kapatır.
+    """
+
+    def __init__(self, baglanti, anlik, kuyruk_boyutu):
+        self.baglanti = baglanti
+        self.acik = True
+        self._kuyruk_boyutu = kuyruk_boyutu
+        # Sınır ilet()'te denetlenir; kapatma işareti (None) dolu kuyruğa da eklenebilsin
+        self._kuyruk = queue.Queue()
+        threading.Thread(target=self._gonder, args=(anlik,), name="canli-abone-gonder", daemon=True).start()
+
+    def ilet(self, satir):
+        """Satırı kuyruğa ekler; kuyruk doluysa (abone yetişemiyor) False"""
+        if not self.acik or self._kuyruk.qsize() >= self._kuyruk_boyutu:
+            return False
+        self._kuyruk.put(satir)
+        return True
+
+    def _gonder(self, anlik):
+        try:
+            self.baglanti.sendall(_satir({'tip': 'anlik', 'ornekler': anlik}))
+            while True:
+                satir = self._kuyruk.get()
+                if satir is None:
+                    break
+                self.baglanti.sendall(satir)
+        except OSError:
+            pass
+        self.acik = False
+        self.baglanti.close()
+
+    def kapat(self):
+        self.acik = False
+        self._kuyruk.put(None)
+        try:
+            self.baglanti.shutdown(socket.SHUT_RDWR)  # Bekleyen sendall hemen döner
+        except OSError:
+            pass
+
+
+class Yayinci:
+    """
+    Collector tarafı: halka tamponları tutar ve bağlı abonelere yeni örnekleri gönderir.
+
+    yayinla() örnek başına bir kez çağrılır; abone yoksa sadece tampona ekler, varsa
+    satırı abonelerin kuyruklarına koyar (soket yazmaz, beklemez).
+    Soket açılamazsa (Unix soketi desteklenmeyen sistem, izin hatası) yayın kapalı
+    kalır, collector normal çalışmaya devam eder.
+    """
+
+    def __init__(self, yol=None, halka_boyutu=HALKA_BOYUTU, abone_kuyrugu=ABONE_KUYRUGU):
+        self.yol = yol or SOKET_YOLU
+        self._halka_boyutu = halka_boyutu
+        self._abone_kuyrugu = abone_kuyrugu
+        self._tamponlar = {}   # {slave_id: deque[(zaman, ornek)]}
+        self._aboneler = []    # [_Abonelik]
+        self._kilit = threading.Lock()
+        self._sunucu = None
+
+    def baslat(self):
+        if not hasattr(socket, 'AF_UNIX'):
+            logging.warning("Unix soketi desteklenmiyor, canlı yayın kapalı")
+            return False
+        try:
+            if os.path.exists(self.yol):
+                os.remove(self.yol)  # Önceki çalışmadan kalan soket dosyası
+            sunucu = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sunucu.bind(self.yol)
+            sunucu.listen(16)
+        except OSError as e:
+            logging.warning(f"Canlı yayın soketi açılamadı ({self.yol}): {e}")
+            return False
+        self._sunucu = sunucu
+        threading.Thread(target=self._kabul_et, name="canli-yayin", daemon=True).start()
+        print(f"📣 Canlı yayın: {self.yol}")
+        return True
+
+    def _kabul_et(self):
+        while self._sunucu is not None:
+            try:
+                baglanti, _ = self._sunucu.accept()
+            except OSError:
+                break
+            baglanti.settimeout(GONDERME_ZAMAN_ASIMI)
+            # Kilit altında sadece tamponlar kopyalanır; kodlama ve gönderme abonenin thread'inde
+            with self._kilit:
+                anlik = {str(slave_id): list(tampon) for slave_id, tampon in self._tamponlar.items()}
+                self._aboneler.append(_Abonelik(baglanti, anlik, self._abone_kuyrugu))
+
+    def yayinla(self, slave_id, zaman, ornek):
+        """Örneği tampona ekle ve abonelerin kuyruklarına koy (kuyruğu dolan/kopan abone düşürülür)"""
+        satir = _satir({'tip': 'ornek', 'id': slave_id, 'zaman': zaman, 'ornek': ornek})
+        with self._kilit:
+            tampon = self._tamponlar.get(slave_id)
+            if tampon is None:
+                tampon = self._tamponlar[slave_id] = collections.deque(maxlen=self._halka_boyutu)
+            tampon.append((zaman, ornek))
+            for abone in list(self._aboneler):
+                if not abone.ilet(satir):
+                    if abone.acik:
+                        logging.warning("Canlı yayın abonesi yetişemiyor, bağlantısı kesildi")
+                    self._aboneler.remove(abone)
+                    abone.kapat()
+
+    def kapat(self):
+        sunucu, self._sunucu = self._sunucu, None
+        if sunucu is None:
+            return
+        sunucu.close()
+        with self._kilit:
+            for abone in self._aboneler:
+                abone.kapat()
+            self._aboneler = []
+        try:
+            os.remove(self.yol)
+        except OSError:
+            pass
+
+
+class Abone:
+    """
+    Panel tarafı: arka plandaki bir thread yayına bağlanır ve aynı halka tamponları
+    yerel olarak tutar. Bağlantı koparsa YENIDEN_BAGLANMA aralığıyla tekrar dener.
+    Bir süreçte tek örnek yeterlidir (panelde st.cache_resource ile paylaşılır).
+    """
+
+    def __init__(self, yol=None, halka_boyutu=HALKA_BOYUTU):
+        self.yol = yol or SOKET_YOLU
+        self._halka_boyutu = halka_boyutu
+        self._tamponlar = {}
+        self._kilit = threading.Lock()
+        self.bagli = False
+        self._durdur = threading.Event()
+        self._thread = threading.Thread(target=self._calis, name="canli-abone", daemon=True)
+        self._thread.start()
+
+    def _calis(self):
+        while not self._durdur.is_set():
+            try:
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sok:
+                    sok.connect(self.yol)
+                    self.bagli = True
+                    for satir in sok.makefile('r', encoding='utf-8'):
+                        self._isle(json.loads(satir))
+                        if self._durdur.is_set():
+                            break
+            except (OSError, ValueError, KeyError, AttributeError):
+                pass
+            self.bagli = False
+            self._durdur.wait(YENIDEN_BAGLANMA)
+
+    def _isle(self, mesaj):
+        with self._kilit:
+            if mesaj['tip'] == 'anlik':
+                self._tamponlar = {
+                    int(slave_id): collections.deque(map(tuple, ornekler), maxlen=self._halka_boyutu)
+                    for slave_id, ornekler in mesaj['ornekler'].items()}
+            elif mesaj['tip'] == 'ornek':
+                tampon = self._tamponlar.get(mesaj['id'])
+                if tampon is None:
+                    tampon = self._tamponlar[mesaj['id']] = collections.deque(maxlen=self._halka_boyutu)
+                tampon.append((mesaj['zaman'], mesaj['ornek']))
+
+    def son_durum(self):
+        """
+        Her cihazın son örneği (veritabani.tum_cihazlarin_son_durumu ile aynı biçimde)
+
+        Returns:
+            list: [(slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193), ...]
+        """
+        with self._kilit:
+            sonlar = {slave_id: tampon[-1] for slave_id, tampon in self._tamponlar.items() if tampon}
+        return [(slave_id, zaman, o.get('guc'), o.get('voltaj'), o.get('akim'), o.get('sicaklik'),
+                 o.get('hata_kodu', 0), o.get('hata_kodu_193', 0))
+                for slave_id, (zaman, o) in sorted(sonlar.items())]
+
+    def gecmis(self, slave_id, limit=100, sonra=None):
+        """
+        Bir cihazın tampondaki son örnekleri (veritabani.son_verileri_getir ile aynı biçimde)
+        sonra verilirse sadece zamanı ondan büyük örnekler (tamponun sonundan geriye, yeni örnek sayısı kadar)
+
+        Returns:
+            list: [(zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193), ...]
+        """
+        with self._kilit:
+            tampon = self._tamponlar.get(slave_id, ())
+            if sonra is None:
+                ornekler = list(tampon)[-limit:]
+            else:
+                ornekler = []
+                for zaman, ornek in reversed(tampon):
+                    if zaman <= sonra or len(ornekler) >= limit:
+                        break
+                    ornekler.append((zaman, ornek))
+                ornekler.reverse()
+        return [(zaman, o.get('guc'), o.get('voltaj'), o.get('akim'), o.get('sicaklik'),
+                 o.get('hata_kodu', 0), o.get('hata_kodu_193', 0)) for zaman, o in ornekler]
+
+    def kapat(self):
+        self._durdur.set()
@@ -0,0 +1,84 @@
+import os
+import socket
+import tempfile
+import time
+import unittest
+
+import canli_yayin
+
+
+class TestCanliYayin(unittest.TestCase):
+    def setUp(self):
+        self.klasor = tempfile.mkdtemp()
+        self.yol = os.path.join(self.klasor, "canli.sock")
+        self.yayinci = canli_yayin.Yayinci(self.yol, halka_boyutu=3)
+        self.assertTrue(self.yayinci.baslat())
+
+    def tearDown(self):
+        self.yayinci.kapat()
+        os.rmdir(self.klasor)
+
+    def _bekle(self, kosul, sure=3.0):
+        bitis = time.monotonic() + sure
+        while time.monotonic() < bitis:
+            if kosul():
+                return True
+            time.sleep(0.02)
+        return False
+
+    def test_abone_anlik_goruntu_ve_yeni_ornekleri_alir(self):
+        for i in range(5):
+            self.yayinci.yayinla(1, f"2026-01-01 10:00:0{i}", {'guc': i, 'voltaj': 230.0})
+        abone = canli_yayin.Abone(self.yol, halka_boyutu=3)
+        try:
+            self.assertTrue(self._bekle(lambda: len(abone.gecmis(1)) == 3))
+            self.assertEqual([satir[1] for satir in abone.gecmis(1)], [2, 3, 4])
+            self.assertEqual([satir[1] for satir in abone.gecmis(1, sonra="2026-01-01 10:00:02")], [3, 4])
+            self.assertEqual(abone.gecmis(1, sonra="2026-01-01 10:00:04"), [])
+
+            self.yayinci.yayinla(2, "2026-01-01 10:00:09", {'guc': 7, 'hata_kodu': 5})
+            self.assertTrue(self._bekle(lambda: len(abone.son_durum()) == 2))
+            self.assertEqual(abone.son_durum()[1], (2, "2026-01-01 10:00:09", 7, None, None, None, 5, 0))
+        finally:
+            abone.kapat()
+
+    def test_takilan_abone_yayini_bekletmez(self):
+        self.yayinci.kapat()
+        yayinci = canli_yayin.Yayinci(self.yol, halka_boyutu=3, abone_kuyrugu=50)
+        self.assertTrue(yayinci.baslat())
+        takili = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        takili.connect(self.yol)  # Bağlanır ama hiç okumaz
+        abone = canli_yayin.Abone(self.yol, halka_boyutu=3)
+        try:
+            self.assertTrue(self._bekle(lambda: len(yayinci._aboneler) == 2))
+            ornek = {'guc': 1, 'not': 'x' * 2000}
+            en_uzun = 0
+            for i in range(2000):
+                baslangic = time.monotonic()
+                yayinci.yayinla(1, f"2026-01-01 10:{i // 60:02d}:{i % 60:02d}", ornek)
+                en_uzun = max(en_uzun, time.monotonic() - baslangic)
+            self.assertLess(en_uzun, 0.1)
+            # Takılan abone düşürülür, sağlıklı abone son örneğe ulaşır (gerekirse yeniden bağlanarak)
+            takili.settimeout(3.0)
+            while takili.recv(65536):
+                pass  # Yayıncı bağlantıyı kapatınca EOF
+            self.assertTrue(self._bekle(lambda: abone.gecmis(1)[-1:] and
+                                        abone.gecmis(1)[-1][0] == "2026-01-01 10:33:19", sure=5.0))
+        finally:
+            abone.kapat()
+            takili.close()
+            yayinci.kapat()
+
+    def test_yayinci_yokken_abone_bagli_degil(self):
+        self.yayinci.kapat()
+        abone = canli_yayin.Abone(self.yol)
+        try:
+            time.sleep(0.1)
+            self.assertFalse(abone.bagli)
+            self.assertEqual(abone.son_durum(), [])
+        finally:
+            abone.kapat()
+
+
+if __name__ == '__main__':
+    unittest.main()
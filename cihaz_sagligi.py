@@ -0,0 +1,109 @@
+"""
+Cihaz sağlık takibi (devre kesici)
+Üst üste yanıt vermeyen slave ID'ler bir süre sorgulanmaz; bekleme süresi her
+başarısız denemede katlanarak artar. Süre dolunca tek bir deneme okuması (yarı açık)
+yapılır: başarılıysa cihaz tekrar normal sorgulanır, değilse daha uzun beklenir.
+Böylece kapalı bir inverter her döngüde timeout süresi kadar gateway'i meşgul etmez.
+"""
+import random
+import time
+from datetime import datetime
+
+SAGLIKLI = 'saglikli'
+ACIK = 'acik'            # Devre açık: cihaz sorgulanmıyor
+YARI_ACIK = 'yari_acik'  # Bekleme bitti: bir deneme okuması yapılacak
+
+HATA_ESIGI = 3           # Bu kadar ardışık hatadan sonra devre açılır
+ILK_BEKLEME = 10.0       # saniye
+MAX_BEKLEME = 600.0      # saniye
+JITTER_ORANI = 0.1
+
+
+class CihazSagligi:
+    """
+    Slave ID başına devre kesici durumu.
+
+    izin_var_mi() okumadan önce, basari()/hata() okumadan sonra çağrılır.
+    Durumu değişen cihazlar degisenleri_al() ile alınıp veritabanına yazılır.
+    """
+
+    def __init__(self, saat=time.monotonic):
+        self._saat = saat
+        self._cihazlar = {}
+        self._degisenler = set()
+
+    def _kayit(self, slave_id):
+        kayit = self._cihazlar.get(slave_id)
+        if kayit is None:
+            kayit = self._cihazlar[slave_id] = {
+                'durum': SAGLIKLI, 'ardisik_hata': 0, 'acilma_sayisi': 0,
+                'sonraki_deneme': None, 'son_hata': None, 'son_basari': None,
+            }
+        return kayit
+
+    def izin_var_mi(self, slave_id, simdi=None):
+        """Cihaz şimdi sorgulanabilir mi? (açık devrede bekleme bittiyse yarı açığa geçer)"""
+        kayit = self._cihazlar.get(slave_id)
+        if kayit is None or kayit['durum'] == SAGLIKLI:
+            return True
+        simdi = self._saat() if simdi is None else simdi
+        if kayit['durum'] == ACIK and simdi >= kayit['sonraki_deneme']:
+            kayit['durum'] = YARI_ACIK
+            self._degisenler.add(slave_id)
+        return kayit['durum'] == YARI_ACIK
+
+    def basari(self, slave_id):
+        """Cihaz yanıt verdi; devreyi kapat. Cihaz tekrar çevrimiçi olduysa True döner."""
+        kayit = self._kayit(slave_id)
+        geri_geldi = kayit['durum'] != SAGLIKLI
+        if geri_geldi or kayit['ardisik_hata']:
+            self._degisenler.add(slave_id)
+        kayit.update(durum=SAGLIKLI, ardisik_hata=0, acilma_sayisi=0, sonraki_deneme=None,
+                     son_basari=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+        return geri_geldi
+
+    def hata(self, slave_id, neden=None, simdi=None):
+        """
+        Cihaz yanıt vermedi. Devre açıldıysa bekleme süresini (saniye), aksi halde None döndürür.
+        """
+        kayit = self._kayit(slave_id)
+        kayit['ardisik_hata'] += 1
+        kayit['son_hata'] = neden
+        self._degisenler.add(slave_id)
+        if kayit['durum'] != YARI_ACIK and kayit['ardisik_hata'] < HATA_ESIGI:
+            return None
+
+        # Eşik aşıldı veya deneme okuması başarısız: bekleme süresini katla
+        bekleme = min(MAX_BEKLEME, ILK_BEKLEME * 2 ** kayit['acilma_sayisi'])
+        bekleme *= random.uniform(1 - JITTER_ORANI, 1 + JITTER_ORANI)
+        simdi = self._saat() if simdi is None else simdi
+        kayit.update(durum=ACIK, sonraki_deneme=simdi + bekleme, acilma_sayisi=kayit['acilma_sayisi'] + 1)
+        return bekleme
+
+    def supheli_mi(self, slave_id):
+        """Son okuması başarısız olan veya deneme okumasındaki cihaz"""
+        kayit = self._cihazlar.get(slave_id)
+        return kayit is not None and (kayit['durum'] != SAGLIKLI or kayit['ardisik_hata'] > 0)
+
+    def durum(self, slave_id):
+        return self._cihazlar.get(slave_id, {}).get('durum', SAGLIKLI)
+
+    def degisenleri_al(self):
+        """
+        Son çağrıdan beri durumu değişen cihazlar.
+
+        Returns:
+            list: [(slave_id, durum, ardisik_hata, son_hata, son_basari, sonraki_deneme_sn), ...]
+                  sonraki_deneme_sn: açık devrede bir sonraki denemeye kalan saniye
+        """
+        simdi = self._saat()
+        degisenler = []
+        for slave_id in sorted(self._degisenler):
+            kayit = self._cihazlar[slave_id]
+            kalan = None
+            if kayit['durum'] == ACIK:
+                kalan = round(max(0.0, kayit['sonraki_deneme'] - simdi), 1)
+            degisenler.append((slave_id, kayit['durum'], kayit['ardisik_hata'], kayit['son_hata'],
+                               kayit['son_basari'], kalan))
+        self._degisenler.clear()
+        return degisenler
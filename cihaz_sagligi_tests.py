@@ -0,0 +1,56 @@
+import unittest
+
+import cihaz_sagligi
+
+
+class SahteSaat:
+    def __init__(self):
+        self.zaman = 0.0
+
+    def __call__(self):
+        return self.zaman
+
+
+class TestCihazSagligi(unittest.TestCase):
+    def setUp(self):
+        self.orijinal_jitter = cihaz_sagligi.JITTER_ORANI
+        cihaz_sagligi.JITTER_ORANI = 0
+        self.saat = SahteSaat()
+        self.saglik = cihaz_sagligi.CihazSagligi(saat=self.saat)
+
+    def tearDown(self):
+        cihaz_sagligi.JITTER_ORANI = self.orijinal_jitter
+
+    def test_esikten_sonra_devre_acilir(self):
+        self.assertIsNone(self.saglik.hata(3))
+        self.assertIsNone(self.saglik.hata(3))
+        self.assertTrue(self.saglik.izin_var_mi(3))
+        self.assertEqual(self.saglik.hata(3), cihaz_sagligi.ILK_BEKLEME)
+        self.assertFalse(self.saglik.izin_var_mi(3))
+        self.assertTrue(self.saglik.izin_var_mi(1))
+
+    def test_deneme_basarisizsa_bekleme_katlanir(self):
+        for _ in range(cihaz_sagligi.HATA_ESIGI):
+            self.saglik.hata(3)
+        self.saat.zaman += cihaz_sagligi.ILK_BEKLEME
+        self.assertTrue(self.saglik.izin_var_mi(3))
+        self.assertEqual(self.saglik.durum(3), cihaz_sagligi.YARI_ACIK)
+        self.assertEqual(self.saglik.hata(3), cihaz_sagligi.ILK_BEKLEME * 2)
+
+        self.saat.zaman += 1000
+        self.assertTrue(self.saglik.izin_var_mi(3))
+        self.assertTrue(self.saglik.basari(3))
+        self.assertEqual(self.saglik.durum(3), cihaz_sagligi.SAGLIKLI)
+        self.assertFalse(self.saglik.supheli_mi(3))
+
+    def test_degisenler_bir_kez_raporlanir(self):
+        self.saglik.basari(1)
+        for _ in range(cihaz_sagligi.HATA_ESIGI):
+            self.saglik.hata(2, "Yanıt yok")
+        degisenler = self.saglik.degisenleri_al()
+        self.assertEqual(degisenler, [(2, cihaz_sagligi.ACIK, 3, "Yanıt yok", None, cihaz_sagligi.ILK_BEKLEME)])
+        self.assertEqual(self.saglik.degisenleri_al(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,89 @@
 import time
+import json
+import queue
+import asyncio
 import logging
-from pymodbus.client import ModbusTcpClient
+import multiprocessing
+from pymodbus.client import AsyncModbusTcpClient
+from pymodbus.exceptions import ConnectionException
 from datetime import datetime
 import veritabani
 import utils
+import okuma_plani
+import zamanlayici
+import cihaz_sagligi
+import canli_yayin
+
+# Gateway istisna kodları: 0x0A yol yok, 0x0B hedef cihaz yanıt vermedi
+GATEWAY_YANITSIZ_KODLARI = (0x0A, 0x0B)
+
+def soket_hatasi_mi(client, hata):
+    """
+    Hata ortak gateway TCP bağlantısından mı kaynaklanıyor?
+    Sadece bu durumda bağlantı kapatılıp yeniden kurulur; tek cihazın timeout'u
+    veya istisna yanıtı diğer cihazların bağlantısını etkilemez.
+    """
+    if isinstance(hata, ConnectionException):
+        return True
+    if isinstance(hata, OSError) and not isinstance(hata, TimeoutError):
+        return True
+    return not client.connected
+
+def gecitleri_coz(ayarlar, slave_ids):
+    """
+    'gecitler' ayarını çalışan listesine çevirir.
+    Örnek: [{"ad": "G1", "ip": "10.35.14.10", "port": 502, "slave_ids": "1-40", "parca": 2}]
+    
+    parca > 1 ise geçidin cihazları o kadar çalışana (ayrı TCP bağlantılarına) bölünür.
+    Ayar boşsa target_ip / target_port / slave_ids tek geçit olarak kullanılır.
+    
+    Returns:
+        list: [{'ad', 'target_ip', 'target_port', 'slave_ids', 'eszamanli_istek'}, ...]
+    """
+    varsayilan = [{
+        'ad': 'varsayilan',
+        'target_ip': ayarlar.get('target_ip', '10.35.14.10'),
+        'target_port': int(ayarlar.get('target_port', 502)),
+        'slave_ids': slave_ids,
+        'eszamanli_istek': max(1, int(ayarlar.get('eszamanli_istek', 4))),
+    }]
+    metin = str(ayarlar.get('gecitler') or '').strip()
+    if not metin:
+        return varsayilan
+    
+    try:
+        gecitler = []
+        for sira, gecit in enumerate(json.loads(metin), start=1):
+            ad = str(gecit.get('ad', f"G{sira}"))
+            ids, hatalar = utils.parse_id_list(str(gecit.get('slave_ids', '')))
+            if hatalar:
+                logging.warning(f"Geçit {ad} ID parsing hataları: {', '.join(hatalar)}")
+            parca = max(1, min(int(gecit.get('parca', 1)), len(ids) or 1))
+            for i in range(parca):
+                gecitler.append({
+                    'ad': ad if parca == 1 else f"{ad}#{i + 1}",
+                    'target_ip': str(gecit['ip']),
+                    'target_port': int(gecit.get('port', 502)),
+                    'slave_ids': ids[i::parca],
+                    'eszamanli_istek': max(1, int(gecit.get('eszamanli_istek', varsayilan[0]['eszamanli_istek']))),
+                })
+        return gecitler
+    except (ValueError, TypeError, KeyError, AttributeError) as e:
+        logging.warning(f"gecitler ayarı okunamadı, tek geçit kullanılıyor: {e}")
+        return varsayilan
+
+def gecit_config(config, ad=None):
+    """Genel config'i tek geçidin adres/cihaz listesiyle daraltır (ad None: ilk geçit)"""
+    for gecit in config['gecitler']:
+        if ad is None or gecit['ad'] == ad:
+            return dict(config, gecit=gecit['ad'], target_ip=gecit['target_ip'], target_port=gecit['target_port'],
+                        slave_ids=gecit['slave_ids'], eszamanli_istek=gecit['eszamanli_istek'])
+    return None
 
 def load_config():
     """Veritabanından ayarları yükle"""
+    # Sürüm önce okunur; arada yazılan ayar bir sonraki kontrolde tekrar yüklenir
+    surum = veritabani.ayar_surumu()
     ayarlar = veritabani.tum_ayarlari_oku()
     
     # ID parsing için utils kullan (tire desteği dahil)
@@ -16,62 +93,36 @@ def load_config():
     if parse_errors:
         logging.warning(f"ID parsing hataları: {', '.join(parse_errors)}")
     
+    # Boş bırakılırsa cihazlarda toplam üretim sayacı yok sayılır
+    uretim_addr = str(ayarlar.get('uretim_addr', '73')).strip()
+    
     return {
+        'ayar_surumu': surum,
         'target_ip': ayarlar.get('target_ip', '10.35.14.10'),
         'target_port': int(ayarlar.get('target_port', 502)),
         'refresh_rate': float(ayarlar.get('refresh_rate', 2)),
         'slave_ids': slave_ids,
-        'start_addr': int(ayarlar.get('guc_addr', 70)),
+        'guc_addr': int(ayarlar.get('guc_addr', 70)),
+        'volt_addr': int(ayarlar.get('volt_addr', 71)),
+        'akim_addr': int(ayarlar.get('akim_addr', 72)),
+        'isi_addr': int(ayarlar.get('isi_addr', 74)),
+        'okuma_bosluk': int(ayarlar.get('okuma_bosluk', okuma_plani.VARSAYILAN_BOSLUK)),
+        'uretim_addr': int(uretim_addr) if uretim_addr else None,
+        'uretim_count': int(ayarlar.get('uretim_count', 1)),
+        'uretim_scale': float(ayarlar.get('uretim_scale', 1.0)),
         'guc_scale': float(ayarlar.get('guc_scale', 1.0)),
         'volt_scale': float(ayarlar.get('volt_scale', 0.1)),
         'akim_scale': float(ayarlar.get('akim_scale', 0.1)),
         'isi_scale': float(ayarlar.get('isi_scale', 1.0)),
         'veri_saklama_gun': int(ayarlar.get('veri_saklama_gun', 365)),
-        'alarm_registers': [
-            {'addr': 189, 'key': 'hata_kodu', 'count': 2},
-            {'addr': 193, 'key': 'hata_kodu_193', 'count': 1}
-        ]
+        'eszamanli_istek': max(1, int(ayarlar.get('eszamanli_istek', 4))),
+        'alarm_periyot': float(ayarlar.get('alarm_periyot', 10)),
+        'enerji_periyot': float(ayarlar.get('enerji_periyot', 60)),
+        'cihaz_periyotlari': zamanlayici.cihaz_periyotlarini_coz(ayarlar.get('cihaz_periyotlari', '')),
+        'gecitler': gecitleri_coz(ayarlar, slave_ids),
+        'alarm_registers': list(okuma_plani.VARSAYILAN_ALARM_REGISTERLERI)
     }
 
-def read_device(client, slave_id, config):
-    try:
-        if not client.connected: 
-            client.connect()
-            time.sleep(0.1)
-        
-        # Pymodbus 3.x: unit parametresi kullan (slave yerine)
-        rr = client.read_holding_registers(address=config['start_addr'], count=5, slave=slave_id)
-        if rr.isError(): 
-            return None
-
-        veriler = {
-            "guc": rr.registers[0] * config['guc_scale'],
-            "voltaj": rr.registers[1] * config['volt_scale'],
-            "akim": rr.registers[2] * config['akim_scale'],
-            "sicaklik": rr.registers[4] * config['isi_scale']  # Index 4 = Register 74
-        }
-
-        for reg in config['alarm_registers']:
-            try:
-                time.sleep(0.05)
-                r_hata = client.read_holding_registers(address=reg['addr'], count=reg.get('count', 2), slave=slave_id)
-                if not r_hata.isError():
-                    if reg.get('count', 2) == 2:
-                        veriler[reg['key']] = (r_hata.registers[0] << 16) | r_hata.registers[1]
-                    else:
-                        veriler[reg['key']] = r_hata.registers[0]
-                else:
-                    veriler[reg['key']] = 0
-            except:
-                veriler[reg['key']] = 0
-
-        return veriler
-
-    except Exception as e:
-        logging.error(f"ID {slave_id} Hata: {e}")
-        client.close()
-        return None
-
 def otomatik_veri_temizle(config):
     """
     Ayarlara göre eski verileri otomatik temizle
@@ -91,18 +142,111 @@ def otomatik_veri_temizle(config):
         print(f"\n⚠️ Otomatik temizlik hatası: {e}")
         return 0
 
-def start_collector():
-    veritabani.init_db()
-    print("=" * 60)
-    print("🚀 COLLECTOR BAŞLATILDI (Dinamik Ayar Modu)")
-    print("=" * 60)
+async def read_device_async(client, slave_id, config, bloklar=None):
+    """
+    Cihazın register bloklarını okur, okuma_plani ile çözülen sonuç sözlüğünü döndürür.
+    bloklar verilirse sadece o plan okunur (bkz. okuma_plani.grup_plani).
     
-    config = load_config()
-    client = ModbusTcpClient(config['target_ip'], port=config['target_port'], timeout=2.0)
+    Cihaz hiç yanıt vermezse (timeout veya gateway "cihaz yanıt vermedi" istisnası)
+    None döner. Gateway bağlantısı koptuysa istisna çağırana iletilir.
+    """
+    if bloklar is None:
+        bloklar = okuma_plani.config_plani(config, config['alarm_registers'])
+    try:
+        veriler = {}
+        yanit_alindi = False
+        for blok in bloklar:
+            try:
+                rr = await client.read_holding_registers(address=blok.adres, count=blok.adet, slave=slave_id)
+            except Exception as e:
+                if soket_hatasi_mi(client, e):
+                    raise
+                logging.error(f"ID {slave_id} yanıt vermedi: {e}")
+                rr = None
+            if rr is None or rr.isError():
+                if rr is not None and getattr(rr, 'exception_code', None) not in GATEWAY_YANITSIZ_KODLARI:
+                    yanit_alindi = True  # Cihaz canlı, sadece bu register'ları desteklemiyor
+                if blok.zorunlu:
+                    return None
+                okuma_plani.blok_sifirla(blok, veriler)
+                continue
+            yanit_alindi = True
+            okuma_plani.blok_coz(blok, rr.registers, veriler)
+
+        return veriler if yanit_alindi else None
+
+    except Exception as e:
+        if soket_hatasi_mi(client, e):
+            raise
+        logging.error(f"ID {slave_id} Hata: {e}")
+        return None
+
+async def gorevleri_oku(client, config, gorevler, saglik=None):
+    """
+    Zamanlayıcının vadesi gelen görevlerini eşzamanlı okur; gateway'e aynı anda en fazla
+    config['eszamanli_istek'] istek gider, döngü süresi en yavaş cihaza bağlı olur.
+    saglik verilirse her cihazın sonucu devre kesiciye işlenir.
+    
+    Args:
+        gorevler: [(slave_id, gruplar), ...] - bkz. Zamanlayici.hazir_gorevler
     
-    print(f"📡 IP: {config['target_ip']}:{config['target_port']}")
+    Returns:
+        list: [(slave_id, gruplar, veri dict veya None), ...]
+    """
+    if not client.connected:
+        await client.connect()
+        if not client.connected:
+            return [(dev_id, gruplar, None) for dev_id, gruplar in gorevler]
+
+    semafor = asyncio.Semaphore(config['eszamanli_istek'])
+    baglanti_koptu = []
+
+    async def _gorev_oku(dev_id, gruplar):
+        bloklar = okuma_plani.grup_plani(config, gruplar, config['alarm_registers'])
+        async with semafor:
+            try:
+                return dev_id, gruplar, await read_device_async(client, dev_id, config, bloklar)
+            except Exception as e:
+                logging.error(f"Gateway bağlantı hatası (ID {dev_id}): {e}")
+                baglanti_koptu.append(dev_id)
+                return dev_id, gruplar, None
+
+    sonuclar = await asyncio.gather(*(_gorev_oku(dev_id, gruplar) for dev_id, gruplar in gorevler))
+
+    if baglanti_koptu:
+        # Bağlantı bir sonraki görevde yeniden kurulur; bu partinin hataları cihazlara yazılmaz
+        print(f"\n🔄 Gateway bağlantısı koptu, yeniden bağlanılacak")
+        client.close()
+    elif saglik is not None:
+        for dev_id, _, veri in sonuclar:
+            if veri is not None:
+                if saglik.basari(dev_id):
+                    print(f"\n✅ ID {dev_id} tekrar yanıt veriyor")
+            else:
+                bekleme = saglik.hata(dev_id, "Yanıt yok")
+                if bekleme is not None:
+                    print(f"\n🔌 ID {dev_id} yanıt vermiyor, {bekleme:.0f} sn sorgulanmayacak")
+    return sonuclar
+
+async def _gorevi_iptal_et(gorev):
+    """Görevi iptal edip bitmesini bekler (kullandığı bağlantı kapatılmadan önce çağrılır)"""
+    if gorev is not None:
+        gorev.cancel()
+        await asyncio.gather(gorev, return_exceptions=True)
+
+def yeni_client(config):
+    # Tek tekrar: yanıt vermeyen cihazlar devre kesiciyle atlanır, gateway'i uzun süre meşgul etmez
+    return AsyncModbusTcpClient(config['target_ip'], port=config['target_port'], timeout=2.0, retries=1)
+
+def _baslik_yazdir(config, baslik):
+    print("=" * 60)
+    print(baslik)
+    print("=" * 60)
+    for gecit in config['gecitler']:
+        print(f"📡 Geçit {gecit['ad']}: {gecit['target_ip']}:{gecit['target_port']} "
+              f"- Slave IDs: {utils.format_id_list_display(gecit['slave_ids'])}")
     print(f"⏱️  Refresh: {config['refresh_rate']}s")
-    print(f"🔢 Slave IDs: {config['slave_ids']}")
+    print(f"🔀 Eşzamanlı İstek: {config['eszamanli_istek']}")
     print(f"📊 Çarpanlar: Güç={config['guc_scale']}, V={config['volt_scale']}, A={config['akim_scale']}, °C={config['isi_scale']}")
     
     if config['veri_saklama_gun'] == 0:
@@ -111,56 +255,301 @@ def start_collector():
         print(f"🗄️  Veri Saklama: {config['veri_saklama_gun']} Gün")
     
     print("=" * 60)
+
+async def collector_dongusu(gecit=None, kuyruk=None, dur=None):
+    """
+    Tek geçidin (gateway) cihazlarını okuyan ana döngü.
+    
+    gecit None ise ayarlardaki ilk geçit okunur ve örnekler bu süreçte yazılır
+    (tek süreç modu). kuyruk verilirse örnekler ve sağlık değişiklikleri kuyruğa
+    gönderilir; veritabanına tek yazıcı olan gozetmen() yazar.
+    dur (Event) set edilince döngü en geç bir tur sonra bağlantıları kapatıp çıkar.
+    """
+    if kuyruk is None:
+        veritabani.init_db()
+    
+    config = gecit_config(load_config(), gecit)
+    if config is None:
+        print(f"⚠️ Geçit {gecit} ayarlarda yok, çalışan durduruluyor")
+        return
+    etiket = f"[{config['gecit']}] "
+    client = yeni_client(config)
+    
+    if kuyruk is None:
+        _baslik_yazdir(config, "🚀 COLLECTOR BAŞLATILDI (Dinamik Ayar Modu)")
+    else:
+        print(f"🧵 {etiket}Çalışan başladı: {config['target_ip']}:{config['target_port']} "
+              f"({len(config['slave_ids'])} cihaz)")
     
-    ayar_kontrol_sayaci = 0
-    temizlik_sayaci = 0
-    TEMIZLIK_PERIYODU = 1800  # Her 30 dakikada bir temizlik yap (1800 döngü x 2sn = 3600sn = 60dk)
+    TEMIZLIK_PERIYODU = 3600        # saniye: saatte bir eski veri temizliği
+    GECIKME_RAPOR_PERIYODU = 60     # saniye: zamanlayıcı gecikme özeti
+    AYAR_KONTROL_ARALIGI = 1.0      # saniye: boşta en fazla bu kadar uyunur
+    
+    if kuyruk is None:
+        # İlk başlangıçta bir kere temizlik yap
+        otomatik_veri_temizle(config)
+        # Örnekler bellekte toplanıp ölçüm periyodu başına bir transaction ile yazılır (alarm varsa hemen)
+        tampon = veritabani.VeriTamponu(max_sure=config['refresh_rate'])
+        # Panel canlı veriyi buradan alır (kendisi Modbus okumaz)
+        yayinci = canli_yayin.Yayinci()
+        yayinci.baslat()
+    
+    def ornek_kaydet(dev_id, ornek):
+        zaman = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+        if kuyruk is None:
+            tampon.ekle(dev_id, ornek, zaman=zaman)
+            yayinci.yayinla(dev_id, zaman, ornek)
+        else:
+            kuyruk.put(('ornek', (dev_id, zaman, ornek)))
+    
+    def saglik_kaydet(degisenler):
+        if kuyruk is None:
+            veritabani.cihaz_sagligini_yaz(degisenler)
+        else:
+            kuyruk.put(('saglik', degisenler))
+    
+    # Her cihazın her register grubu kendi periyoduyla, son tarih sırasıyla okunur
+    plan = zamanlayici.Zamanlayici(config)
+    # Yanıt vermeyen cihazlar katlanarak artan sürelerle atlanır. Son okuması başarısız
+    # olan (şüpheli) cihazlar ayrı bir bağlantıdan arka planda okunur; timeout'ları
+    # sağlıklı cihazların okumalarını bekletmez. Deneme bağlantısında aynı anda tek görev
+    # çalışır (vadesi gelen şüpheliler birlikte, eszamanli_istek sınırıyla okunur).
+    saglik = cihaz_sagligi.CihazSagligi()
+    deneme_client = yeni_client(config)
+    supheli_gorev = None      # asyncio.Task veya None
+    supheli_cihazlar = set()  # supheli_gorev'in okuduğu cihazlar
+    son_temizlik = son_rapor = time.monotonic()
+    ebeveyn = multiprocessing.parent_process()
+    
+    try:
+        while True:
+            # Gözetmen durmamızı istediyse veya öldüyse (kuyruğu okuyan kalmadı) dur
+            if dur is not None and dur.is_set():
+                break
+            if ebeveyn is not None and not ebeveyn.is_alive():
+                break
+            
+            # Ayar sürümü değiştiyse yeniden yükle (sürüm kontrolü önbellekten, tablo okunmaz)
+            if veritabani.ayar_surumu() != config['ayar_surumu']:
+                yeni_config = gecit_config(load_config(), gecit)
+                if yeni_config is None:
+                    print(f"\n⚠️ {etiket}Geçit ayarlardan kaldırıldı, çalışan durduruluyor")
+                    break
+                if (yeni_config['target_ip'] != config['target_ip'] or 
+                    yeni_config['target_port'] != config['target_port']):
+                    print(f"\n🔄 {etiket}IP/Port değişti, bağlantı yenileniyor...")
+                    client.close()
+                    client = yeni_client(yeni_config)
+                    await _gorevi_iptal_et(supheli_gorev)
+                    supheli_gorev, supheli_cihazlar = None, set()
+                    deneme_client.close()
+                    deneme_client = yeni_client(yeni_config)
+                config = yeni_config
+                plan.yapilandir(config)
+                if kuyruk is None:
+                    tampon.max_sure = config['refresh_rate']
+                print(f"\n✅ {etiket}Ayarlar güncellendi (Refresh: {config['refresh_rate']}s)")
+            
+            simdi = time.monotonic()
+            
+            # Otomatik veri temizleme (saatte bir; çok süreçli modda gözetmen yapar)
+            if kuyruk is None and simdi - son_temizlik >= TEMIZLIK_PERIYODU:
+                otomatik_veri_temizle(config)
+                son_temizlik = simdi
+            
+            # Periyodunu kaçıran okumalar (gateway/cihazlar periyotlara yetişemiyor)
+            if simdi - son_rapor >= GECIKME_RAPOR_PERIYODU:
+                rapor = plan.gecikme_raporu()
+                if rapor['gecikmeler']:
+                    detay = ", ".join(f"{grup}: {sayi}" for grup, sayi in rapor['gecikmeler'].items())
+                    print(f"\n⏰ {etiket}Zamanlayıcı gecikmesi: {detay} (en fazla {rapor['max_gecikme']}s) "
+                          f"- periyotları büyütün, eşzamanlı istek sayısını artırın veya geçidi bölün")
+                son_rapor = simdi
+            
+            gorevler, supheliler = [], []
+            for dev_id, gruplar in plan.hazir_gorevler(simdi):
+                if not saglik.izin_var_mi(dev_id, simdi) or dev_id in supheli_cihazlar:
+                    continue
+                if not saglik.supheli_mi(dev_id):
+                    gorevler.append((dev_id, gruplar))
+                elif supheli_gorev is None:
+                    supheliler.append((dev_id, gruplar))
+                # Deneme görevi sürerken vadesi gelen diğer şüpheliler bu periyotta atlanır
+            if supheliler:
+                supheli_cihazlar = {dev_id for dev_id, _ in supheliler}
+                supheli_gorev = asyncio.create_task(gorevleri_oku(deneme_client, config, supheliler, saglik))
+            
+            # Vadesi gelen görevler (cihaz başına birleştirilmiş gruplar) eşzamanlı okunur
+            sonuclar = await gorevleri_oku(client, config, gorevler, saglik) if gorevler else []
+            if supheli_gorev is not None and supheli_gorev.done():
+                sonuclar.extend(supheli_gorev.result())
+                supheli_gorev, supheli_cihazlar = None, set()
+            
+            if not sonuclar:
+                if kuyruk is None:
+                    tampon.vadesi_geldiyse_bosalt()
+                bekleme = plan.sonraki_zaman()
+                bekleme = AYAR_KONTROL_ARALIGI if bekleme is None else bekleme - time.monotonic()
+                await asyncio.sleep(min(max(0, bekleme), AYAR_KONTROL_ARALIGI))
+                continue
+            
+            degisenler = saglik.degisenleri_al()
+            if degisenler:
+                saglik_kaydet(degisenler)
+            
+            for dev_id, gruplar, data in sonuclar:
+                ornek = plan.tamamlandi(dev_id, gruplar, data)
+                if ornek:
+                    ornek_kaydet(dev_id, ornek)
+                    h189 = ornek.get('hata_kodu', 0)
+                    h193 = ornek.get('hata_kodu_193', 0)
+                    if h189 == 0 and h193 == 0:
+                        durum = "TEMİZ"
+                    else:
+                        durum = f"⚠️ HATA (189:{h189}, 193:{h193})"
+                    print(f"📡 {etiket}ID {dev_id}... ✅ [OK] {durum}")
+                elif data is None:
+                    print(f"📡 {etiket}ID {dev_id}... ❌ [YOK] ({', '.join(sorted(gruplar))})")
+    finally:
+        await _gorevi_iptal_et(supheli_gorev)
+        if kuyruk is None:
+            tampon.bosalt()
+            yayinci.kapat()
+        client.close()
+        deneme_client.close()
+
+def gecit_calisani(gecit, kuyruk, dur):
+    """Gözetmenin her geçit için başlattığı süreç (spawn ile, bağımsız bağlantılarla)"""
+    logging.basicConfig(level=logging.ERROR)
+    try:
+        asyncio.run(collector_dongusu(gecit, kuyruk, dur))
+    except KeyboardInterrupt:
+        pass
+
+def gozetmen():
+    """
+    Çok geçitli/çok süreçli collector.
+    
+    Ayarlardaki her geçit (veya geçit parçası) için ayrı bir süreç cihazları okur;
+    örnekler tek bir kuyruktan bu süreçteki tek yazıcıya gelir ve toplu yazılır.
+    Topoloji değişince çalışanlar eklenir/durdurulur, ölen çalışan yeniden başlatılır.
+    
+    Çalışanlar kendi dur olaylarıyla durdurulur: kuyruğa yazmakta olan bir süreç
+    terminate() ile öldürülürse kuyruğun kilidi kilitli kalıp diğer çalışanları da
+    kilitleyebilir. terminate() sadece süresinde çıkmayan çalışan için son çaredir.
+    """
+    veritabani.init_db()
+    config = load_config()
+    _baslik_yazdir(config, f"🚀 COLLECTOR GÖZETMENİ BAŞLATILDI ({len(config['gecitler'])} çalışan)")
+    
+    TEMIZLIK_PERIYODU = 3600        # saniye
+    YENIDEN_BASLATMA_ARALIGI = 5.0  # saniye: çöken çalışan en erken bu kadar sonra başlatılır
+    MAX_PARTI = 5000                # kuyruktan tek seferde alınacak en fazla mesaj
+    DURMA_SURESI = 10.0             # saniye: durması istenen çalışana tanınan süre
+    
+    baglam = multiprocessing.get_context('spawn')
+    kuyruk = baglam.Queue()
+    calisanlar = {}      # {gecit adı: (Process, dur Event)}
+    duranlar = []        # [(gecit adı, Process, son monotonic)] - durması istenenler
+    son_baslatma = {}    # {gecit adı: monotonic}
+    tampon = veritabani.VeriTamponu(max_sure=config['refresh_rate'])
+    yayinci = canli_yayin.Yayinci()
+    yayinci.baslat()
+    
+    def mesajlari_al(bekleme):
+        # Kuyruktaki örnekleri al (boşsa en fazla bekleme sn bekle)
+        mesajlar = []
+        try:
+            mesajlar.append(kuyruk.get(timeout=bekleme))
+            while len(mesajlar) < MAX_PARTI:
+                mesajlar.append(kuyruk.get_nowait())
+        except queue.Empty:
+            pass
+        return mesajlar
+    
+    def mesajlari_isle(mesajlar):
+        for tip, yuk in mesajlar:
+            if tip == 'ornek':
+                dev_id, zaman, ornek = yuk
+                tampon.ekle(dev_id, ornek, zaman=zaman)
+                yayinci.yayinla(dev_id, zaman, ornek)
+            elif tip == 'saglik':
+                veritabani.cihaz_sagligini_yaz(yuk)
     
-    # İlk başlangıçta bir kere temizlik yap
     otomatik_veri_temizle(config)
+    son_temizlik = time.monotonic()
     
-    while True:
-        start_time = time.time()
-        
-        # Her 10 döngüde bir ayarları kontrol et
-        ayar_kontrol_sayaci += 1
-        if ayar_kontrol_sayaci >= 10:
-            yeni_config = load_config()
-            if (yeni_config['target_ip'] != config['target_ip'] or 
-                yeni_config['target_port'] != config['target_port']):
-                print("\n🔄 IP/Port değişti, bağlantı yenileniyor...")
-                client.close()
-                client = ModbusTcpClient(yeni_config['target_ip'], port=yeni_config['target_port'], timeout=2.0)
-            config = yeni_config
-            ayar_kontrol_sayaci = 0
-            print(f"\n✅ Ayarlar güncellendi (Refresh: {config['refresh_rate']}s)")
-        
-        # Otomatik veri temizleme (her 30 dakikada)
-        temizlik_sayaci += 1
-        if temizlik_sayaci >= TEMIZLIK_PERIYODU:
-            otomatik_veri_temizle(config)
-            temizlik_sayaci = 0
-        
-        # Veri toplama
-        for dev_id in config['slave_ids']:
-            print(f"📡 ID {dev_id}...", end=" ")
-            time.sleep(0.5)
-            data = read_device(client, dev_id, config)
-            if data:
-                veritabani.veri_ekle(dev_id, data)
-                h189 = data.get('hata_kodu', 0)
-                h193 = data.get('hata_kodu_193', 0)
-                if h189 == 0 and h193 == 0:
-                    durum = "TEMİZ"
-                else:
-                    durum = f"⚠️ HATA (189:{h189}, 193:{h193})"
-                print(f"✅ [OK] {durum}")
-            else:
-                print(f"❌ [YOK]")
-        
-        elapsed = time.time() - start_time
-        time.sleep(max(0, config['refresh_rate'] - elapsed))
+    try:
+        while True:
+            if veritabani.ayar_surumu() != config['ayar_surumu']:
+                config = load_config()
+                tampon.max_sure = config['refresh_rate']
+            
+            # Çalışanları topolojiyle eşle
+            simdi = time.monotonic()
+            adlar = [g['ad'] for g in config['gecitler']]
+            for ad in list(calisanlar):
+                if ad not in adlar:
+                    print(f"\n🛑 Geçit {ad} kaldırıldı, çalışan durduruluyor")
+                    surec, dur = calisanlar.pop(ad)
+                    dur.set()
+                    duranlar.append((ad, surec, simdi + DURMA_SURESI))
+            for kayit in list(duranlar):
+                ad, surec, son = kayit
+                if surec.is_alive() and simdi < son:
+                    continue
+                if surec.is_alive():
+                    print(f"\n⚠️ Geçit {ad} çalışanı {DURMA_SURESI:.0f} sn içinde durmadı, sonlandırılıyor")
+                    surec.terminate()
+                surec.join(timeout=1)
+                duranlar.remove(kayit)
+            for ad in adlar:
+                surec, _ = calisanlar.get(ad, (None, None))
+                if surec is not None and surec.is_alive():
+                    continue
+                if simdi - son_baslatma.get(ad, -YENIDEN_BASLATMA_ARALIGI) < YENIDEN_BASLATMA_ARALIGI:
+                    continue
+                if surec is not None:
+                    print(f"\n⚠️ Geçit {ad} çalışanı durdu (çıkış kodu {surec.exitcode}), yeniden başlatılıyor")
+                dur = baglam.Event()
+                surec = baglam.Process(target=gecit_calisani, args=(ad, kuyruk, dur), name=f"gecit-{ad}", daemon=True)
+                surec.start()
+                calisanlar[ad] = (surec, dur)
+                son_baslatma[ad] = simdi
+            
+            mesajlari_isle(mesajlari_al(1.0))
+            tampon.vadesi_geldiyse_bosalt()
+            
+            if time.monotonic() - son_temizlik >= TEMIZLIK_PERIYODU:
+                otomatik_veri_temizle(config)
+                son_temizlik = time.monotonic()
+    finally:
+        for _, dur in calisanlar.values():
+            dur.set()
+        surecler = [surec for surec, _ in calisanlar.values()] + [surec for _, surec, _ in duranlar]
+        # Çalışanlar çıkarken kuyruğa son gönderdiklerini boşaltabilsin diye kuyruk okunmaya devam eder
+        son = time.monotonic() + DURMA_SURESI
+        while any(surec.is_alive() for surec in surecler) and time.monotonic() < son:
+            mesajlari_isle(mesajlari_al(0.1))
+        for surec in surecler:
+            if surec.is_alive():
+                print(f"\n⚠️ {surec.name} süresinde durmadı, sonlandırılıyor")
+                surec.terminate()
+            surec.join(timeout=5)
+        # Çalışanların son gönderdikleri de yazılsın
+        mesajlar = mesajlari_al(0)
+        while mesajlar:
+            mesajlari_isle(mesajlar)
+            mesajlar = mesajlari_al(0)
+        tampon.bosalt()
+        yayinci.kapat()
+
+def start_collector():
+    gozetmen()
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.ERROR)
-    start_collector()
\ No newline at end of file
+    try:
+        start_collector()
+    except KeyboardInterrupt:
+        print("\n👋 Collector durduruldu")
@@ -0,0 +1,108 @@
+import asyncio
+import unittest
+
+from pymodbus.client import AsyncModbusTcpClient
+
+import cihaz_sagligi
+import collector
+import okuma_plani
+import sanal_inverter
+
+CONFIG = {
+    'guc_addr': 70, 'guc_scale': 1.0,
+    'volt_addr': 71, 'volt_scale': 0.1,
+    'akim_addr': 72, 'akim_scale': 0.1,
+    'isi_addr': 74, 'isi_scale': 1.0,
+    'uretim_addr': 73, 'uretim_count': 1, 'uretim_scale': 1.0,
+    'eszamanli_istek': 4,
+    'alarm_registers': list(okuma_plani.VARSAYILAN_ALARM_REGISTERLERI),
+}
+
+
+class TestGecitTopolojisi(unittest.TestCase):
+    def test_bos_ayar_tek_gecit(self):
+        gecitler = collector.gecitleri_coz({'target_ip': '10.0.0.5', 'target_port': '502'}, [1, 2, 3])
+        self.assertEqual(gecitler, [{'ad': 'varsayilan', 'target_ip': '10.0.0.5', 'target_port': 502,
+                                     'slave_ids': [1, 2, 3], 'eszamanli_istek': 4}])
+
+    def test_parcalara_bolunur(self):
+        ayarlar = {'gecitler': '[{"ad": "G1", "ip": "10.0.0.10", "slave_ids": "1-5", "parca": 2},'
+                               ' {"ip": "10.0.0.11", "port": 5020, "slave_ids": "9", "eszamanli_istek": 1}]'}
+        gecitler = collector.gecitleri_coz(ayarlar, [1])
+        self.assertEqual([(g['ad'], g['slave_ids']) for g in gecitler],
+                         [('G1#1', [1, 3, 5]), ('G1#2', [2, 4]), ('G2', [9])])
+        self.assertEqual((gecitler[2]['target_port'], gecitler[2]['eszamanli_istek']), (5020, 1))
+
+        config = collector.gecit_config({'gecitler': gecitler, 'slave_ids': [1]}, 'G1#2')
+        self.assertEqual((config['target_ip'], config['slave_ids']), ('10.0.0.10', [2, 4]))
+        self.assertIsNone(collector.gecit_config({'gecitler': gecitler}, 'yok'))
+
+    def test_bozuk_ayar_varsayilana_doner(self):
+        gecitler = collector.gecitleri_coz({'gecitler': '[{"ad": "G1"}]'}, [7])
+        self.assertEqual([g['ad'] for g in gecitler], ['varsayilan'])
+
+
+class TestCihazOkuma(unittest.TestCase):
+    PORT = 15120
+
+    def test_simulatorden_okuma(self):
+        async def calis():
+            # ID 2 yanıt vermez, ID 9 bu geçitte yok (gateway 0x0B döner)
+            ciftlik = sanal_inverter.Ciftlik([self.PORT], 2, ayarlar=sanal_inverter.ArizaAyarlari(yanitsiz=frozenset({2})))
+            ciftlik.adim()
+            sunucu = sanal_inverter.CiftlikSunucusu(ciftlik, self.PORT)
+            await sunucu.serve_forever(background=True)
+            client = AsyncModbusTcpClient("127.0.0.1", port=self.PORT, timeout=0.3, retries=0)
+            saglik = cihaz_sagligi.CihazSagligi()
+            try:
+                await client.connect()
+                tekil = [await collector.read_device_async(client, slave_id, CONFIG) for slave_id in (1, 2, 9)]
+                gorevler = [(slave_id, okuma_plani.GRUPLAR) for slave_id in (1, 2, 9)]
+                toplu = await collector.gorevleri_oku(client, CONFIG, gorevler, saglik)
+                return ciftlik, tekil, toplu, saglik, client.connected
+            finally:
+                client.close()
+                await sunucu.shutdown()
+
+        ciftlik, tekil, toplu, saglik, bagli = asyncio.run(calis())
+        guc, voltaj, akim, uretim, sicaklik = ciftlik.baglamlar[self.PORT][1].getValues(3, 70, 5)
+        self.assertEqual((tekil[0]['guc'], tekil[0]['voltaj'], tekil[0]['sicaklik'], tekil[0]['toplam_uretim_wh']),
+                         (guc * 1.0, voltaj * 0.1, sicaklik * 1.0, uretim * 1.0))
+        self.assertEqual(tekil[1:], [None, None])
+
+        # Cihaz hataları bağlantıyı kapatmaz, sağlık kaydına cihaz bazında yazılır
+        self.assertEqual([(slave_id, veri is not None) for slave_id, _, veri in toplu], [(1, True), (2, False), (9, False)])
+        self.assertTrue(bagli)
+        self.assertEqual([saglik.supheli_mi(slave_id) for slave_id in (1, 2, 9)], [False, True, True])
+
+    def test_soket_hatasi_cihazlara_yazilmaz(self):
+        async def calis():
+            # İlk istekte bağlantıyı kesip dinlemeyi bırakan gateway (yeniden bağlanma da başarısız)
+            async def kapat(okuyucu, yazici):
+                await okuyucu.read(64)
+                sunucu.close()
+                yazici.close()
+            sunucu = await asyncio.start_server(kapat, "127.0.0.1", self.PORT + 1)
+            client = AsyncModbusTcpClient("127.0.0.1", port=self.PORT + 1, timeout=0.3, retries=0)
+            saglik = cihaz_sagligi.CihazSagligi()
+            try:
+                await client.connect()
+                sonuclar = await collector.gorevleri_oku(client, CONFIG, [(1, ('olcum',)), (2, ('olcum',))], saglik)
+                bagli = client.connected
+                # Soket hatası None'a çevrilmez, çağırana iletilir
+                with self.assertRaises(collector.ConnectionException):
+                    await collector.read_device_async(client, 1, CONFIG)
+                return sonuclar, saglik, bagli
+            finally:
+                client.close()
+                sunucu.close()
+                await sunucu.wait_closed()
+
+        sonuclar, saglik, bagli = asyncio.run(calis())
+        self.assertEqual([veri for _, _, veri in sonuclar], [None, None])
+        self.assertFalse(bagli)
+        self.assertEqual(saglik.degisenleri_al(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
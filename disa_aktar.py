@@ -0,0 +1,244 @@
+"""
+Ham ölçüm verisini dışa aktarma (CSV / XLSX)
+Satırlar veritabani.olcum_akisi ile sabit boyutlu parçalar halinde okunur ve hemen
+yazılır; aylarca veri de (milyonlarca satır) sabit bellekle aktarılır.
+
+Streamlit'in download_button'ı dosyanın tamamını bellekte tuttuğu için indirme,
+panel sürecinde çalışan küçük bir HTTP sunucusundan yapılır:
+    http://<sunucu>:8502/disa_aktar?baslangic=2026-01-01&bitis=2026-03-31&ids=1-10&bicim=csv&anahtar=...
+CSV parça parça (chunked transfer) gönderilir; XLSX önce diskteki geçici dosyaya
+openpyxl write-only modunda yazılır, sonra parça parça okunup gönderilir.
+
+Sunucu varsayılan olarak sadece 127.0.0.1'i dinler; başka makinelerden indirme için
+DISA_AKTAR_ADRES (örn. 0.0.0.0) ayarlanır (docker-compose.yml bunu ayarlar ve 8502'yi
+yayınlar). Her istek, panel oturumunun ürettiği
+anahtarı taşımalıdır (bkz. oturum_anahtari); anahtarsız istek 403 alır.
+"""
+import csv
+import io
+import logging
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse, urlsplit
+
+from openpyxl import Workbook
+
+import veritabani
+import utils
+
+DISA_AKTAR_PORT = int(os.environ.get("DISA_AKTAR_PORT", 8502))
+DISA_AKTAR_ADRES = os.environ.get("DISA_AKTAR_ADRES", "127.0.0.1")
+
+ANAHTAR_SURESI = 12 * 3600  # saniye: kullanılmayan oturum anahtarı bu süre sonra geçersizleşir
+
+SUTUN_BASLIKLARI = ["ID", "Zaman", "Güç (W)", "Voltaj (V)", "Akım (A)", "Sıcaklık (°C)",
+                    "Hata Kodu 189", "Hata Kodu 193", "Toplam Üretim (Wh)"]
+
+XLSX_MAX_SATIR = 1048576  # Excel sayfa sınırı (başlık dahil); aşılınca yeni sayfa açılır
+
+GONDERME_PARCASI = 1024 * 1024  # XLSX dosyası bu boyutta parçalarla gönderilir
+
+
+def csv_parcalari(baslangic, bitis, slave_ids=None):
+    """
+    CSV içeriğini bytes parçaları olarak üreten generator (Excel için UTF-8 BOM'lu).
+    Her parça veritabanından okunan bir satır grubudur.
+    """
+    tampon = io.StringIO()
+    yazici = csv.writer(tampon)
+    yazici.writerow(SUTUN_BASLIKLARI)
+    yield tampon.getvalue().encode('utf-8-sig')
+    for satirlar in veritabani.olcum_akisi(baslangic, bitis, slave_ids):
+        tampon.seek(0)
+        tampon.truncate()
+        yazici.writerows(satirlar)
+        yield tampon.getvalue().encode('utf-8')
+
+
+def xlsx_yaz(hedef, baslangic, bitis, slave_ids=None):
+    """
+    Ölçümleri openpyxl write-only modunda XLSX olarak yazar (satırlar bellekte tutulmaz).
+
+    Args:
+        hedef: dosya yolu veya yazılabilir dosya nesnesi
+
+    Returns:
+        int: yazılan satır sayısı
+    """
+    kitap = Workbook(write_only=True)
+    sayfa, sayfa_satiri, sayfa_no, toplam = None, XLSX_MAX_SATIR, 0, 0
+    for satirlar in veritabani.olcum_akisi(baslangic, bitis, slave_ids):
+        for satir in satirlar:
+            if sayfa_satiri >= XLSX_MAX_SATIR:
+                sayfa_no += 1
+                sayfa = kitap.create_sheet(title="Ölçümler" if sayfa_no == 1 else f"Ölçümler {sayfa_no}")
+                sayfa.append(SUTUN_BASLIKLARI)
+                sayfa_satiri = 1
+            sayfa.append(satir)
+            sayfa_satiri += 1
+            toplam += 1
+    if sayfa is None:
+        kitap.create_sheet(title="Ölçümler").append(SUTUN_BASLIKLARI)
+    kitap.save(hedef)
+    return toplam
+
+
+def parametreleri_coz(sorgu):
+    """
+    URL sorgusunu (baslangic, bitis, slave_ids, bicim) değerlerine çevirir.
+    Tarih 'YYYY-MM-DD' ise gün başı / gün sonu olarak tamamlanır.
+
+    Raises:
+        ValueError: eksik veya geçersiz parametre
+    """
+    def tarih(ad, gun_sonu):
+        deger = (sorgu.get(ad) or [''])[0].strip()
+        if len(deger) == 10:
+            deger += " 23:59:59.999" if gun_sonu else " 00:00:00"
+        datetime.fromisoformat(deger)  # Geçersizse ValueError
+        return deger
+
+    baslangic, bitis = tarih('baslangic', False), tarih('bitis', True)
+    if bitis < baslangic:
+        raise ValueError("bitis, baslangic'tan önce olamaz")
+    slave_ids = None
+    ids = (sorgu.get('ids') or [''])[0].strip()
+    if ids:
+        slave_ids, hatalar = utils.parse_id_list(ids)
+        if hatalar:
+            raise ValueError(f"Geçersiz ID: {', '.join(hatalar)}")
+    bicim = (sorgu.get('bicim') or ['csv'])[0]
+    if bicim not in ('csv', 'xlsx'):
+        raise ValueError(f"Bilinmeyen biçim: {bicim}")
+    return baslangic, bitis, slave_ids, bicim
+
+
+def dosya_adi(baslangic, bitis, bicim):
+    return f"olcumler_{baslangic[:10]}_{bitis[:10]}.{bicim}"
+
+
+# {anahtar: son geçerlilik (monotonic)} - sunucu ve sayfa aynı panel sürecinde çalışır
+_anahtarlar = {}
+_anahtar_kilidi = threading.Lock()
+
+
+def oturum_anahtari(mevcut=None):
+    """
+    Panel oturumunun indirme anahtarını döndürür.
+    mevcut hâlâ geçerliyse süresi uzatılıp aynısı, değilse yeni anahtar döner.
+    """
+    simdi = time.monotonic()
+    with _anahtar_kilidi:
+        for anahtar, son in list(_anahtarlar.items()):
+            if son <= simdi:
+                del _anahtarlar[anahtar]
+        anahtar = mevcut if mevcut in _anahtarlar else secrets.token_urlsafe(16)
+        _anahtarlar[anahtar] = simdi + ANAHTAR_SURESI
+    return anahtar
+
+
+def anahtar_gecerli_mi(anahtar):
+    with _anahtar_kilidi:
+        son = _anahtarlar.get(anahtar or '')
+    return son is not None and son > time.monotonic()
+
+
+YEREL_ADRESLER = ("127.0.0.1", "localhost", "::1")
+
+
+def _sunucu_adi(host_basligi):
+    """HTTP Host başlığındaki sunucu adı ('panel:8501', '[fd00::5]:8501' gibi; IPv6 köşeli parantezli)"""
+    try:
+        return urlsplit("//" + (host_basligi or "")).hostname or "localhost"
+    except ValueError:
+        return "localhost"
+
+
+def tarayicidan_erisilir_mi(host_basligi, adres=DISA_AKTAR_ADRES):
+    """
+    Sunucu sadece yerel adresi dinlerken panel başka bir adresten (başka makine, Docker port
+    yönlendirmesi) açıldıysa indirme bağlantısı tarayıcıdan erişilemez; False döner.
+    """
+    return adres not in YEREL_ADRESLER or _sunucu_adi(host_basligi) in YEREL_ADRESLER
+
+
+def indirme_adresi(host_basligi, parametreler, anahtar):
+    """
+    Paneli açan tarayıcının kullandığı sunucu adına göre indirme URL'si.
+    host_basligi: HTTP Host başlığı ('panel:8501', '[fd00::5]:8501' gibi; IPv6 köşeli parantezli)
+    """
+    sunucu = _sunucu_adi(host_basligi)
+    if ":" in sunucu:
+        sunucu = f"[{sunucu}]"
+    return f"http://{sunucu}:{DISA_AKTAR_PORT}/disa_aktar?{urlencode(dict(parametreler, anahtar=anahtar))}"
+
+
+class _AktarmaIstegi(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/disa_aktar":
+            self.send_error(404)
+            return
+        sorgu = parse_qs(url.query)
+        if not anahtar_gecerli_mi((sorgu.get('anahtar') or [''])[0]):
+            self.send_error(403, explain="Geçersiz veya süresi dolmuş indirme anahtarı; sayfayı yenileyin")
+            return
+        try:
+            baslangic, bitis, slave_ids, bicim = parametreleri_coz(sorgu)
+        except ValueError as e:
+            self.send_error(400, explain=str(e))
+            return
+
+        ad = dosya_adi(baslangic, bitis, bicim)
+        try:
+            if bicim == 'csv':
+                self._basliklar("text/csv; charset=utf-8", ad, chunked=True)
+                for parca in csv_parcalari(baslangic, bitis, slave_ids):
+                    self.wfile.write(f"{len(parca):X}\r\n".encode() + parca + b"\r\n")
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                with tempfile.TemporaryFile(suffix=".xlsx") as gecici:
+                    xlsx_yaz(gecici, baslangic, bitis, slave_ids)
+                    boyut = gecici.tell()
+                    gecici.seek(0)
+                    self._basliklar("application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                                    ad, uzunluk=boyut)
+                    shutil.copyfileobj(gecici, self.wfile, GONDERME_PARCASI)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Kullanıcı indirmeyi iptal etti; generator kapanınca bağlantı da kapanır
+
+    def _basliklar(self, tur, ad, chunked=False, uzunluk=None):
+        self.send_response(200)
+        self.send_header("Content-Type", tur)
+        self.send_header("Content-Disposition", f'attachment; filename="{ad}"')
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(uzunluk))
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logging.info("disa_aktar: " + format, *args)
+
+
+def sunucuyu_baslat(port=DISA_AKTAR_PORT, adres=DISA_AKTAR_ADRES):
+    """
+    Dışa aktarma sunucusunu arka plan thread'inde başlatır.
+    Port kullanılıyorsa (başka panel süreci) None döner.
+    """
+    try:
+        sunucu = ThreadingHTTPServer((adres, port), _AktarmaIstegi)
+    except OSError as e:
+        logging.warning(f"Dışa aktarma sunucusu başlatılamadı (port {port}): {e}")
+        return None
+    sunucu.daemon_threads = True
+    threading.Thread(target=sunucu.serve_forever, name="disa-aktar", daemon=True).start()
+    return sunucu
@@ -0,0 +1,95 @@
+import csv
+import io
+import os
+import unittest
+import urllib.error
+import urllib.request
+
+from openpyxl import load_workbook
+
+import disa_aktar
+import veritabani
+
+TEST_DB = "test_disa_aktar.db"
+
+
+class TestDisaAktar(unittest.TestCase):
+    def setUp(self):
+        self.original_db = veritabani.DB_NAME
+        veritabani.DB_NAME = TEST_DB
+        veritabani.init_db()
+        veritabani.veri_ekle_toplu([
+            (slave_id, f"2026-04-{gun:02d} 12:00:00.000000",
+             {"guc": 100 * slave_id, "voltaj": 230.0, "akim": 1.5, "sicaklik": 40.0, "hata_kodu": 0, "hata_kodu_193": 0})
+            for gun in (1, 2, 3) for slave_id in (1, 2)])
+
+    def tearDown(self):
+        veritabani.baglantilari_kapat()
+        for yol in (TEST_DB, TEST_DB + "-wal", TEST_DB + "-shm"):
+            if os.path.exists(yol):
+                os.remove(yol)
+        veritabani.DB_NAME = self.original_db
+
+    def test_csv_parcalar_halinde_akar(self):
+        eski_boyut, veritabani.AKIS_PARCA_BOYUTU = veritabani.AKIS_PARCA_BOYUTU, 2
+        try:
+            baslangic, bitis, slave_ids, _ = disa_aktar.parametreleri_coz(
+                {'baslangic': ['2026-04-01'], 'bitis': ['2026-04-02'], 'ids': ['1-2']})
+            parcalar = list(disa_aktar.csv_parcalari(baslangic, bitis, slave_ids))
+        finally:
+            veritabani.AKIS_PARCA_BOYUTU = eski_boyut
+        self.assertEqual(len(parcalar), 3)  # Başlık + 2 satırlık iki parça
+        satirlar = list(csv.reader(io.StringIO(b"".join(parcalar).decode('utf-8-sig'))))
+        self.assertEqual(satirlar[0], disa_aktar.SUTUN_BASLIKLARI)
+        self.assertEqual([(s[0], s[1][:10], s[2]) for s in satirlar[1:]],
+                         [('1', '2026-04-01', '100.0'), ('1', '2026-04-02', '100.0'),
+                          ('2', '2026-04-01', '200.0'), ('2', '2026-04-02', '200.0')])
+
+    def test_xlsx_write_only(self):
+        hedef = io.BytesIO()
+        self.assertEqual(disa_aktar.xlsx_yaz(hedef, "2026-04-01 00:00:00", "2026-04-30 23:59:59"), 6)
+        sayfa = load_workbook(hedef, read_only=True).active
+        satirlar = list(sayfa.iter_rows(values_only=True))
+        self.assertEqual(len(satirlar), 7)
+        self.assertEqual(satirlar[1][:3], (1, '2026-04-01 12:00:00.000', 100))
+
+    def test_gecersiz_parametreler(self):
+        for sorgu in ({'baslangic': ['dün'], 'bitis': ['2026-04-02']},
+                      {'baslangic': ['2026-04-03'], 'bitis': ['2026-04-02']},
+                      {'baslangic': ['2026-04-01'], 'bitis': ['2026-04-02'], 'bicim': ['pdf']}):
+            with self.assertRaises(ValueError):
+                disa_aktar.parametreleri_coz(sorgu)
+
+    def test_sunucu_yerelde_dinler_ve_anahtar_ister(self):
+        sunucu = disa_aktar.sunucuyu_baslat(port=0)
+        self.addCleanup(sunucu.server_close)
+        self.addCleanup(sunucu.shutdown)
+        self.assertEqual(sunucu.server_address[0], '127.0.0.1')
+        parametreler = {'baslangic': '2026-04-01', 'bitis': '2026-04-01'}
+        adres = disa_aktar.indirme_adresi(f"127.0.0.1:{sunucu.server_address[1]}", parametreler, "yanlis")
+        adres = adres.replace(f":{disa_aktar.DISA_AKTAR_PORT}/", f":{sunucu.server_address[1]}/")
+        with self.assertRaises(urllib.error.HTTPError) as hata:
+            urllib.request.urlopen(adres, timeout=5)
+        self.assertEqual(hata.exception.code, 403)
+
+        anahtar = disa_aktar.oturum_anahtari()
+        self.assertEqual(disa_aktar.oturum_anahtari(anahtar), anahtar)
+        with urllib.request.urlopen(adres.replace("anahtar=yanlis", f"anahtar={anahtar}"), timeout=5) as yanit:
+            satirlar = list(csv.reader(io.StringIO(yanit.read().decode('utf-8-sig'))))
+        self.assertEqual(len(satirlar), 3)
+
+    def test_indirme_adresi_ipv6_host(self):
+        for host, beklenen in (("[fd00::5]:8501", "http://[fd00::5]:"), ("panel.local:8501", "http://panel.local:"),
+                               ("10.0.0.7", "http://10.0.0.7:"), (None, "http://localhost:"), ("[bozuk", "http://localhost:")):
+            adres = disa_aktar.indirme_adresi(host, {'bicim': 'csv'}, "a1")
+            self.assertEqual(adres, f"{beklenen}{disa_aktar.DISA_AKTAR_PORT}/disa_aktar?bicim=csv&anahtar=a1")
+
+    def test_yerel_sunucu_uzak_tarayicidan_erisilemez(self):
+        self.assertTrue(disa_aktar.tarayicidan_erisilir_mi("localhost:8501", adres="127.0.0.1"))
+        self.assertTrue(disa_aktar.tarayicidan_erisilir_mi("[::1]:8501", adres="127.0.0.1"))
+        self.assertFalse(disa_aktar.tarayicidan_erisilir_mi("10.0.0.7:8501", adres="127.0.0.1"))
+        self.assertTrue(disa_aktar.tarayicidan_erisilir_mi("10.0.0.7:8501", adres="0.0.0.0"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Modbus okuma planlayıcısı
+Register haritasını en az sayıda read_holding_registers isteğine indirger.
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+# Modbus PDU sınırı: tek istekte en fazla 125 holding register okunabilir
+PDU_MAX_REGISTER = 125
+
+# İki alan arasında okunmasına izin verilen boş register sayısı
+VARSAYILAN_BOSLUK = 16
+
+VARSAYILAN_ALARM_REGISTERLERI = (
+    {'addr': 189, 'key': 'hata_kodu', 'count': 2},
+    {'addr': 193, 'key': 'hata_kodu_193', 'count': 1},
+)
+
+# carpan None ise ham register değeri yazılır (hata kodları gibi)
+# varsayilan: opsiyonel alan okunamazsa yazılacak değer
+Alan = namedtuple('Alan', ['anahtar', 'adres', 'adet', 'carpan', 'zorunlu', 'varsayilan'], defaults=(0,))
+Blok = namedtuple('Blok', ['adres', 'adet', 'alanlar', 'zorunlu'])
+
+
+# Zamanlayıcının ayrı periyotlarla okuyabildiği register grupları
+GRUPLAR = ('olcum', 'alarm', 'enerji')
+
+
+def grup_alanlari(config, alarm_registers=VARSAYILAN_ALARM_REGISTERLERI):
+    """
+    Alanları register gruplarına ayırır: ölçüm (güç/voltaj/akım/sıcaklık),
+    alarm (hata kodları) ve enerji (toplam üretim sayacı).
+
+    Ölçüm alanları zorunludur (okunamazsa cihaz verisi yok sayılır),
+    alarm register'ları opsiyoneldir (okunamazsa 0 yazılır).
+    config['uretim_addr'] verilmişse toplam üretim sayacı da opsiyonel alan olarak
+    okunur; okunamazsa None yazılır (sayaç farkı hesaplanmaz).
+
+    Returns:
+        dict: {grup: Alan tuple'ı}; sayaç yoksa 'enerji' grubu boştur
+    """
+    gruplar = {
+        'olcum': (
+            Alan('guc', int(config['guc_addr']), 1, float(config['guc_scale']), True),
+            Alan('voltaj', int(config['volt_addr']), 1, float(config['volt_scale']), True),
+            Alan('akim', int(config['akim_addr']), 1, float(config['akim_scale']), True),
+            Alan('sicaklik', int(config['isi_addr']), 1, float(config['isi_scale']), True),
+        ),
+        'alarm': tuple(Alan(reg['key'], int(reg['addr']), int(reg.get('count', 2)), None, False)
+                       for reg in alarm_registers),
+        'enerji': (),
+    }
+    if config.get('uretim_addr') is not None:
+        gruplar['enerji'] = (Alan('toplam_uretim_wh', int(config['uretim_addr']), int(config.get('uretim_count', 1)),
+                                  float(config.get('uretim_scale', 1.0)), False, None),)
+    return gruplar
+
+
+def olcum_alanlari(config, alarm_registers=VARSAYILAN_ALARM_REGISTERLERI):
+    """
+    Ayarlardaki adres/çarpan değerlerinden okunacak tüm alanların listesi.
+
+    Returns:
+        tuple: Alan listesi (lru_cache anahtarı olarak kullanılabilir)
+    """
+    gruplar = grup_alanlari(config, alarm_registers)
+    return tuple(alan for grup in GRUPLAR for alan in gruplar[grup])
+
+
+@lru_cache(maxsize=32)
+def plan_derle(alanlar, bosluk=VARSAYILAN_BOSLUK, max_blok=PDU_MAX_REGISTER):
+    """
+    Alanları adrese göre sıralayıp bitişik/yakın olanları tek blokta birleştirir.
+
+    Bir alan, önceki bloğun sonuna en fazla `bosluk` register uzaklıktaysa ve
+    birleşik blok `max_blok` register'ı aşmıyorsa aynı bloğa eklenir.
+    Aynı alan listesi için plan önbellekten döner; ayarlar değişince yeniden derlenir.
+
+    Returns:
+        tuple: Blok listesi
+    """
+    bloklar = []
+    baslangic = bitis = None
+    blok_alanlari = []
+
+    def _blogu_kapat():
+        bloklar.append(Blok(baslangic, bitis - baslangic, tuple(blok_alanlari),
+                            any(a.zorunlu for a in blok_alanlari)))
+
+    for alan in sorted(alanlar, key=lambda a: (a.adres, a.adet)):
+        alan_bitis = alan.adres + alan.adet
+        if (blok_alanlari and alan.adres - bitis <= bosluk
+                and max(bitis, alan_bitis) - baslangic <= max_blok):
+            bitis = max(bitis, alan_bitis)
+            blok_alanlari.append(alan)
+            continue
+        if blok_alanlari:
+            _blogu_kapat()
+        baslangic, bitis, blok_alanlari = alan.adres, alan_bitis, [alan]
+
+    if blok_alanlari:
+        _blogu_kapat()
+    return tuple(bloklar)
+
+
+def config_plani(config, alarm_registers=VARSAYILAN_ALARM_REGISTERLERI):
+    """Ayar sözlüğü için (önbellekli) okuma planını döndür"""
+    return plan_derle(olcum_alanlari(config, alarm_registers),
+                      int(config.get('okuma_bosluk', VARSAYILAN_BOSLUK)))
+
+
+def grup_plani(config, gruplar, alarm_registers=VARSAYILAN_ALARM_REGISTERLERI):
+    """Sadece verilen grupların alanları için (önbellekli) okuma planı"""
+    alanlar = grup_alanlari(config, alarm_registers)
+    return plan_derle(tuple(alan for grup in GRUPLAR if grup in gruplar for alan in alanlar[grup]),
+                      int(config.get('okuma_bosluk', VARSAYILAN_BOSLUK)))
+
+
+def blok_coz(blok, registers, veriler):
+    """Bir bloğun register'larını alan değerlerine çevirip veriler dict'ine yazar"""
+    for alan in blok.alanlar:
+        ofset = alan.adres - blok.adres
+        if alan.adet == 2:
+            deger = (registers[ofset] << 16) | registers[ofset + 1]
+        else:
+            deger = registers[ofset]
+        veriler[alan.anahtar] = deger * alan.carpan if alan.carpan is not None else deger
+
+
+def blok_sifirla(blok, veriler):
+    """Okunamayan opsiyonel bloğun alanlarına varsayılan değerlerini (çoğunlukla 0) yazar"""
+    for alan in blok.alanlar:
+        veriler[alan.anahtar] = alan.varsayilan
@@ -0,0 +1,51 @@
+import unittest
+
+import okuma_plani
+
+CONFIG = {
+    'guc_addr': 70, 'guc_scale': 1.0,
+    'volt_addr': 71, 'volt_scale': 0.1,
+    'akim_addr': 72, 'akim_scale': 0.1,
+    'isi_addr': 74, 'isi_scale': 1.0,
+}
+
+
+class TestOkumaPlani(unittest.TestCase):
+    def test_varsayilan_harita_iki_blok(self):
+        plan = okuma_plani.config_plani(CONFIG)
+        self.assertEqual([(b.adres, b.adet) for b in plan], [(70, 5), (189, 5)])
+        self.assertTrue(plan[0].zorunlu)
+        self.assertFalse(plan[1].zorunlu)
+
+    def test_genis_bosluk_tek_blok(self):
+        plan = okuma_plani.config_plani(dict(CONFIG, okuma_bosluk=200))
+        self.assertEqual([(b.adres, b.adet) for b in plan], [(70, 124)])
+
+    def test_pdu_siniri_asilmaz(self):
+        config = dict(CONFIG, isi_addr=300, okuma_bosluk=500)
+        plan = okuma_plani.config_plani(config)
+        self.assertTrue(all(b.adet <= okuma_plani.PDU_MAX_REGISTER for b in plan))
+        self.assertEqual(len(plan), 2)
+
+    def test_sifir_bosluk_sadece_bitisik(self):
+        plan = okuma_plani.config_plani(dict(CONFIG, okuma_bosluk=0))
+        self.assertEqual([(b.adres, b.adet) for b in plan], [(70, 3), (74, 1), (189, 2), (193, 1)])
+
+    def test_plan_onbellekten_doner(self):
+        self.assertIs(okuma_plani.config_plani(CONFIG), okuma_plani.config_plani(dict(CONFIG)))
+
+    def test_blok_coz(self):
+        plan = okuma_plani.config_plani(CONFIG)
+        veriler = {}
+        okuma_plani.blok_coz(plan[0], [1500, 2300, 65, 9999, 40], veriler)
+        okuma_plani.blok_coz(plan[1], [1, 2, 0, 0, 7], veriler)
+        self.assertEqual(veriler['guc'], 1500)
+        self.assertAlmostEqual(veriler['voltaj'], 230.0)
+        self.assertAlmostEqual(veriler['akim'], 6.5)
+        self.assertEqual(veriler['sicaklik'], 40)
+        self.assertEqual(veriler['hata_kodu'], (1 << 16) | 2)
+        self.assertEqual(veriler['hata_kodu_193'], 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
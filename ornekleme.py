@@ -0,0 +1,82 @@
+"""
+Grafik için seyreltme (downsampling)
+Uzun zaman aralıklarındaki ölçümler sabit sayıda noktaya indirilir:
+- lttb: Largest-Triangle-Three-Buckets; her kovadan, bir önceki seçilen nokta ve bir
+  sonraki kovanın ortalamasıyla en büyük üçgeni kuran noktayı seçer (eğrinin şekli korunur).
+- min_maks: her kovadan en küçük ve en büyük değeri zaman sırasıyla tutar (tepe ve
+  çukurlar kaybolmaz, arıza anındaki ani düşüşler görünür kalır).
+x değerleri sayısal (epoch ms) ve sıralı olmalıdır; NaN içeren noktalar atılır.
+"""
+import numpy as np
+
+YONTEMLER = ('lttb', 'min_maks')
+
+
+def _temizle(x, y):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    gecerli = ~np.isnan(y)
+    if not gecerli.all():
+        x, y = x[gecerli], y[gecerli]
+    return x, y
+
+
+def lttb(x, y, nokta):
+    """
+    Returns:
+        tuple: (x, y) numpy dizileri, en fazla `nokta` eleman
+    """
+    x, y = _temizle(x, y)
+    n = len(x)
+    if nokta >= n or nokta < 3:
+        return x, y
+
+    # İlk ve son nokta sabit; aradaki n-2 nokta nokta-2 kovaya bölünür
+    sinirlar = np.append(np.linspace(1, n - 1, nokta - 1).astype(np.int64), n)
+    # Kova ortalamaları tek seferde; son kovanın "sonraki"si son noktadır
+    adet = np.diff(sinirlar)
+    ort_x = (np.add.reduceat(x, sinirlar[:-1]) / adet).tolist()
+    ort_y = (np.add.reduceat(y, sinirlar[:-1]) / adet).tolist()
+    sinirlar = sinirlar.tolist()
+    secilen = np.empty(nokta, dtype=np.int64)
+    secilen[0], secilen[-1] = 0, n - 1
+    ax, ay = float(x[0]), float(y[0])
+    for i in range(nokta - 2):
+        bas, bit = sinirlar[i], sinirlar[i + 1]
+        sonraki_x, sonraki_y = ort_x[i + 1], ort_y[i + 1]
+        alan = np.abs((ax - sonraki_x) * (y[bas:bit] - ay) - (ax - x[bas:bit]) * (sonraki_y - ay))
+        a = bas + int(alan.argmax())
+        secilen[i + 1] = a
+        ax, ay = float(x[a]), float(y[a])
+    return x[secilen], y[secilen]
+
+
+def min_maks(x, y, nokta):
+    """
+    Eşit sayıda noktalı nokta/2 kovanın her birinden min ve max (zaman sırasıyla).
+
+    Returns:
+        tuple: (x, y) numpy dizileri, en fazla `nokta` eleman
+    """
+    x, y = _temizle(x, y)
+    n = len(x)
+    if nokta >= n or nokta < 2:
+        return x, y
+
+    sinirlar = np.linspace(0, n, nokta // 2 + 1).astype(np.int64)
+    secilen = []
+    for bas, bit in zip(sinirlar[:-1], sinirlar[1:]):
+        if bit <= bas:
+            continue
+        en_kucuk = bas + int(y[bas:bit].argmin())
+        en_buyuk = bas + int(y[bas:bit].argmax())
+        secilen.extend(sorted({en_kucuk, en_buyuk}))
+    secilen = np.asarray(secilen, dtype=np.int64)
+    return x[secilen], y[secilen]
+
+
+def seyrelt(x, y, nokta, yontem='lttb'):
+    """yontem: 'lttb' veya 'min_maks'"""
+    if yontem not in YONTEMLER:
+        raise ValueError(f"Bilinmeyen seyreltme yöntemi: {yontem}")
+    return (lttb if yontem == 'lttb' else min_maks)(x, y, nokta)
@@ -0,0 +1,37 @@
+import unittest
+
+import numpy as np
+
+import ornekleme
+
+
+class TestOrnekleme(unittest.TestCase):
+    def setUp(self):
+        self.x = np.arange(10000, dtype=np.float64) * 1000
+        self.y = np.sin(self.x / 5e5) * 1000
+        self.y[4321] = 5000  # Tek noktalık tepe
+
+    def test_lttb_nokta_sayisi_ve_uclar(self):
+        x, y = ornekleme.lttb(self.x, self.y, 500)
+        self.assertEqual(len(x), 500)
+        self.assertEqual((x[0], x[-1]), (self.x[0], self.x[-1]))
+        self.assertTrue(np.all(np.diff(x) > 0))
+        self.assertIn(5000, y)
+
+    def test_min_maks_tepe_ve_cukurlari_korur(self):
+        x, y = ornekleme.min_maks(self.x, self.y, 200)
+        self.assertLessEqual(len(x), 200)
+        self.assertEqual(y.max(), 5000)
+        self.assertAlmostEqual(y.min(), self.y.min())
+        self.assertTrue(np.all(np.diff(x) > 0))
+
+    def test_az_nokta_ve_nan(self):
+        y = np.array([1.0, np.nan, 3.0])
+        x, y = ornekleme.seyrelt([0, 1, 2], y, 500)
+        self.assertEqual(x.tolist(), [0.0, 2.0])
+        with self.assertRaises(ValueError):
+            ornekleme.seyrelt([0], [0], 10, yontem='yok')
+
+
+if __name__ == '__main__':
+    unittest.main()
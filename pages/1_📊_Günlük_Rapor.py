@@ -31,27 +31,20 @@ with col_date:
 
 tarih_str = secilen_tarih.strftime('%Y-%m-%d')
 
-# Rapor Verilerini Hazırla
+# Rapor Verilerini Hazırla (tüm cihazlar tek sorguda; ölçümü olmayanlar dönmez)
 rapor_listesi = []
 
-for s_id in slave_ids:
-    # Veritabanı fonksiyonlarını kullanarak verileri hesapla
-    uretim = veritabani.gunluk_uretim_hesapla(tarih_str, slave_id=s_id)
-    istatistik = veritabani.tarih_araliginda_ortalamalar(tarih_str, tarih_str, slave_id=s_id)
-    hatalar = veritabani.hata_sayilarini_getir(tarih_str, tarih_str, slave_id=s_id)
-    
-    # Eğer o güne ait ölçüm varsa listeye ekle
-    if istatistik and istatistik.get('toplam_olcum', 0) > 0:
-        rapor_listesi.append({
-            "Cihaz ID": s_id,
-            "Üretim (kWh)": uretim['uretim_kwh'] if uretim else 0,
-            "Ort. Güç (W)": round(istatistik['ort_guc'], 2),
-            "Maks. Güç (W)": istatistik['max_guc'],
-            "Ort. Voltaj (V)": round(istatistik['ort_voltaj'], 1),
-            "Ort. Sıcaklık (°C)": round(istatistik['ort_sicaklik'], 1),
-            "Hata (189/193)": f"{hatalar['hata_189_sayisi']} / {hatalar['hata_193_sayisi']}" if hatalar else "0/0",
-            "Çalışma (Saat)": uretim['calisma_suresi_saat'] if uretim else 0
-        })
+for cihaz in veritabani.filo_raporu(tarih_str, tarih_str, slave_ids=slave_ids):
+    rapor_listesi.append({
+        "Cihaz ID": cihaz['slave_id'],
+        "Üretim (kWh)": cihaz['uretim_kwh'],
+        "Ort. Güç (W)": round(cihaz['ort_guc'], 2),
+        "Maks. Güç (W)": cihaz['max_guc'],
+        "Ort. Voltaj (V)": round(cihaz['ort_voltaj'], 1),
+        "Ort. Sıcaklık (°C)": round(cihaz['ort_sicaklik'], 1),
+        "Hata (189/193)": f"{cihaz['hata_189_sayisi']} / {cihaz['hata_193_sayisi']}",
+        "Çalışma (Saat)": cihaz['calisma_suresi_saat']
+    })
 
 # Tabloyu Göster
 if rapor_listesi:
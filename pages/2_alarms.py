@@ -1,9 +1,9 @@
 import streamlit as st
 import pandas as pd
-import time
+import altair as alt
 import sys
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Üst dizindeki modülleri (veritabani.py) görebilmesi için yol ayarı
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -22,103 +22,105 @@ with col2:
     if st.button("🔄 Şimdi Yenile"):
         st.rerun()
 
-# Son güncelleme zamanı
-st.caption(f"Son güncelleme: {datetime.now().strftime('%H:%M:%S')}")
 st.divider()
 
-# --- ALARM HARİTALARI ---
-FAULT_MAP_189 = {
-    0:  "DC Overcurrent Fault [1-1]",
-    1:  "DC Overcurrent Fault [1-2]",
-    2:  "DC Overcurrent Fault [2-1]",
-    3:  "DC Overcurrent Fault [2-2]",
-    4:  "DC Overcurrent Fault [3-1]",
-    5:  "DC Overcurrent Fault [3-2]",
-    6:  "DC Overcurrent Fault [4-1]",
-    7:  "DC Overcurrent Fault [4-2]",
-    8:  "DC Overcurrent Fault [5-1]",
-    9:  "DC Overcurrent Fault [5-2]",
-    10: "DC Overcurrent Fault [6-1]",
-    11: "DC Overcurrent Fault [6-2]",
-    12: "DC Overcurrent Fault [7-1]",
-    13: "DC Overcurrent Fault [7-2]",
-    14: "DC Overcurrent Fault [8-1]",
-    15: "DC Overcurrent Fault [8-2]",
-    16: "DC Overcurrent Fault [9-1]",
-    17: "DC Overcurrent Fault [9-2]",
-    18: "DC Overcurrent Fault [10-1]",
-    19: "DC Overcurrent Fault [10-2]",
-    20: "DC Overcurrent Fault [11-1]",
-    21: "DC Overcurrent Fault [11-2]",
-    22: "DC Overcurrent Fault [12-1]",
-    23: "DC Overcurrent Fault [12-2]"
-}
-
-FAULT_MAP_193 = {
-    0: "PV Overvoltage[1]",
-    1: "PV Overvoltage[2]",
-    2: "PV Overvoltage[3]",
-    3: "PV Overvoltage[4]",
-    4: "PV Overvoltage[5]",
-    5: "PV Overvoltage[6]",
-    6: "PV Overvoltage[7]",
-    7: "PV Overvoltage[8]",
-    8: "PV Overvoltage[9]",
-    9: "PV Overvoltage[10]",
-    10: "PV Overvoltage[11]",
-    11: "PV Overvoltage[12]"
-}
-
-def active_fault_checker(hata_kodu, fault_map):
-    active_faults = []
-    for bit_index in range(32): 
-        if (hata_kodu >> bit_index) & 1:
-            mesaj = fault_map.get(bit_index, f"Bilinmeyen Hata (Bit {bit_index})")
-            active_faults.append(mesaj)
-    return active_faults
-
-# --- VERİLERİ ÇEK VE GÖSTER ---
-summary_data = veritabani.tum_cihazlarin_son_durumu()
-
-if not summary_data:
-    st.info("Henüz veri yok.")
-else:
-    toplam_hata = 0
-    
-    # 2 Kolonlu Düzen
-    col1, col2 = st.columns(2)
+REGISTER_BASLIKLARI = {189: "Register 189", 193: "Register 193"}
+
+# Bölümler ayrı fragment'lerdir: otomatik yenileme sadece aktif arıza listesini çalıştırır,
+# geçmiş ve sözlük kendi filtreleri değişince (sayfanın geri kalanı çalışmadan) yenilenir
+
+# --- AKTİF ARIZALAR ---
+# Olaylar collector yazarken çözülür (bkz. veritabani.ariza_olaylari); burada bit çözülmez
+@st.fragment(run_every=10 if auto_refresh else None)
+def aktif_ariza_listesi():
+    # Son güncelleme zamanı
+    st.caption(f"Son güncelleme: {datetime.now().strftime('%H:%M:%S')}")
+    summary_data = veritabani.tum_cihazlarin_son_durumu()
+    aktifler = {}
+    for slave_id, register, bit, mesaj, seviye, baslangic in veritabani.aktif_arizalar():
+        aktifler.setdefault(slave_id, []).append((register, mesaj, seviye, baslangic))
+
+    if not summary_data and not aktifler:
+        st.info("Henüz veri yok.")
+    else:
+        toplam_hata = 0
     
-    for row in summary_data:
-        dev_id = row[0]
-        hata_189 = row[6] if len(row) > 6 else 0
-        hata_193 = row[7] if len(row) > 7 else 0
-        
-        device_has_error = (hata_189 > 0) or (hata_193 > 0)
-        
-        if device_has_error:
-            with st.expander(f"🔴 ID: {dev_id} - ARIZA TESPİT EDİLDİ", expanded=True):
-                # 189 Hataları
-                if hata_189 > 0:
-                    st.markdown("**Register 189 Hataları:**")
-                    for err in active_fault_checker(hata_189, FAULT_MAP_189):
-                        st.error(f"🛑 {err}")
-                        toplam_hata += 1
-                
-                # 193 Hataları
-                if hata_193 > 0:
-                    st.divider()
-                    st.markdown("**Register 193 Hataları:**")
-                    for err in active_fault_checker(hata_193, FAULT_MAP_193):
-                        st.warning(f"⚠️ {err}")
-                        toplam_hata += 1
-        else:
-            with st.expander(f"✅ ID: {dev_id} - Sistem Stabil", expanded=False):
-                st.write("Aktif arıza kaydı bulunmamaktadır.")
-
-    if toplam_hata == 0:
-        st.success("🎉 Harika! Sistemde şu an hiç aktif arıza yok.")
-
-# Otomatik yenileme
-if auto_refresh:
-    time.sleep(10)
-    st.rerun()
\ No newline at end of file
+        cihazlar = sorted({row[0] for row in summary_data} | set(aktifler))
+        for dev_id in cihazlar:
+            arizalar = aktifler.get(dev_id)
+            if arizalar:
+                with st.expander(f"🔴 ID: {dev_id} - ARIZA TESPİT EDİLDİ", expanded=True):
+                    for register in sorted({a[0] for a in arizalar}):
+                        st.markdown(f"**{REGISTER_BASLIKLARI.get(register, register)} Hataları:**")
+                        for _, mesaj, seviye, baslangic in (a for a in arizalar if a[0] == register):
+                            metin = f"{mesaj} (başlangıç: {baslangic[:19]})"
+                            if seviye == 'uyari':
+                                st.warning(f"⚠️ {metin}")
+                            else:
+                                st.error(f"🛑 {metin}")
+                            toplam_hata += 1
+            else:
+                with st.expander(f"✅ ID: {dev_id} - Sistem Stabil", expanded=False):
+                    st.write("Aktif arıza kaydı bulunmamaktadır.")
+
+        if toplam_hata == 0:
+            st.success("🎉 Harika! Sistemde şu an hiç aktif arıza yok.")
+
+aktif_ariza_listesi()
+
+# --- ARIZA GEÇMİŞİ ---
+st.divider()
+
+@st.fragment
+def ariza_zaman_cizelgesi():
+    st.subheader("🕒 Arıza Geçmişi")
+    col_tarih, col_id = st.columns([2, 1])
+    with col_tarih:
+        aralik = st.date_input("Tarih Aralığı", value=(datetime.now().date() - timedelta(days=7), datetime.now().date()))
+    with col_id:
+        secili_id = st.selectbox("Cihaz", ["Tümü"] + sorted({row[0] for row in veritabani.tum_cihazlarin_son_durumu()}))
+
+    tarihler = list(aralik) if isinstance(aralik, (tuple, list)) else [aralik]
+    olaylar = veritabani.ariza_gecmisi(str(tarihler[0]), str(tarihler[-1]),
+                                       slave_id=None if secili_id == "Tümü" else secili_id)
+    if not olaylar:
+        st.info("Seçilen aralıkta arıza kaydı yok.")
+    else:
+        df = pd.DataFrame(olaylar, columns=["Cihaz ID", "Register", "Bit", "Arıza", "Seviye", "Başlangıç", "Bitiş"])
+        df["Başlangıç"] = pd.to_datetime(df["Başlangıç"])
+        df["Bitiş"] = pd.to_datetime(df["Bitiş"])
+        df["Süre"] = ((df["Bitiş"].fillna(pd.Timestamp(datetime.now())) - df["Başlangıç"])
+                      .dt.total_seconds().round().astype(int).map(lambda sn: str(timedelta(seconds=sn))))
+        df["Durum"] = df["Bitiş"].isna().map({True: "🔴 Aktif", False: "✅ Bitti"})
+
+        # Zaman çizelgesi: cihaz başına satır, her arıza başlangıç-bitiş çubuğu (aktifler şimdiye kadar)
+        cizelge = df.assign(**{"Bitiş": df["Bitiş"].fillna(pd.Timestamp(datetime.now())),
+                               "Cihaz": "ID " + df["Cihaz ID"].astype(str)})
+        st.altair_chart(
+            alt.Chart(cizelge).mark_bar(minBandSize=3).encode(
+                x=alt.X("Başlangıç:T", title=None), x2="Bitiş:T", y=alt.Y("Cihaz:N", title=None),
+                color=alt.Color("Arıza:N", legend=alt.Legend(orient="bottom", columns=3)),
+                tooltip=["Cihaz", "Arıza", "Register", "Bit", "Başlangıç", "Bitiş", "Süre"]
+            ).properties(height=max(120, 40 * cizelge["Cihaz"].nunique())),
+            use_container_width=True)
+        st.dataframe(df[["Durum", "Cihaz ID", "Arıza", "Register", "Bit", "Başlangıç", "Bitiş", "Süre"]],
+                     use_container_width=True, hide_index=True)
+
+ariza_zaman_cizelgesi()
+
+# --- ARIZA KODU SÖZLÜĞÜ ---
+@st.fragment
+def ariza_kodu_sozlugu():
+    with st.expander("📖 Arıza Kodu Sözlüğü"):
+        st.caption("Yeni olaylar bu sözlükle çözülür; kayıtlı olayların mesajı değişmez. Seviye: hata / uyari")
+        sozluk = pd.DataFrame(veritabani.ariza_kodlarini_getir(), columns=["register", "bit", "mesaj", "seviye"])
+        duzenlenen = st.data_editor(sozluk, num_rows="dynamic", use_container_width=True, hide_index=True)
+        if st.button("💾 Sözlüğü Kaydet"):
+            kodlar = duzenlenen.dropna(subset=["register", "bit", "mesaj"])
+            kodlar = kodlar.assign(seviye=kodlar["seviye"].fillna("hata"))
+            if veritabani.ariza_kodlarini_yaz(kodlar.itertuples(index=False)):
+                st.success("✅ Sözlük kaydedildi")
+            else:
+                st.error("❌ Sözlük kaydedilemedi")
+
+ariza_kodu_sozlugu()
\ No newline at end of file
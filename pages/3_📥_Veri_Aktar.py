@@ -0,0 +1,66 @@
+import streamlit as st
+from datetime import datetime, timedelta
+import sys
+import os
+
+# Üst dizindeki modüllere erişim sağla
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import veritabani
+import utils
+import disa_aktar
+
+st.set_page_config(page_title="Veri Aktarma", page_icon="📥", layout="wide")
+
+st.title("📥 Ham Veri Dışa Aktarma")
+st.markdown("Seçilen tarih aralığındaki tüm ham ölçümleri CSV veya Excel (XLSX) olarak indirin.")
+
+# İndirme panel sürecindeki ayrı bir HTTP sunucusundan akış olarak yapılır (bkz. disa_aktar)
+@st.cache_resource
+def aktarma_sunucusu():
+    return disa_aktar.sunucuyu_baslat()
+
+sunucu = aktarma_sunucusu()
+
+ayarlar = veritabani.tum_ayarlari_oku()
+
+col_tarih, col_ids, col_bicim = st.columns([2, 2, 1])
+with col_tarih:
+    aralik = st.date_input("Tarih Aralığı", value=(datetime.now().date() - timedelta(days=30), datetime.now().date()))
+with col_ids:
+    id_input = st.text_input("Cihaz ID'leri (boş: tümü)", value=ayarlar.get('slave_ids', ''))
+with col_bicim:
+    bicim = st.radio("Biçim", ["csv", "xlsx"], format_func=str.upper, horizontal=True)
+
+# Aralığın ikinci ucu seçilene kadar date_input tek tarih döndürür
+tarihler = list(aralik) if isinstance(aralik, (tuple, list)) else [aralik]
+baslangic, bitis = str(tarihler[0]), str(tarihler[-1])
+
+slave_ids, id_errors = utils.parse_id_list(id_input) if id_input.strip() else (None, [])
+if id_errors:
+    st.warning(f"⚠️ Bazı ID'ler parse edilemedi: {', '.join(id_errors)}")
+
+if bicim == "xlsx":
+    st.caption(f"Excel sayfası en fazla {disa_aktar.XLSX_MAX_SATIR - 1:,} satır alır; fazlası yeni sayfalara yazılır. "
+               "Çok büyük aralıklar için CSV daha hızlıdır.")
+
+if sunucu is None:
+    st.info(f"ℹ️ Aktarma sunucusu bu süreçte başlatılamadı; port {disa_aktar.DISA_AKTAR_PORT} "
+            "başka bir panel sürecinde kullanılıyor olabilir.")
+
+host = st.context.headers.get("Host")
+if not disa_aktar.tarayicidan_erisilir_mi(host):
+    # Bağlantı bu tarayıcıdan açılamayacağı için hiç gösterilmez
+    st.warning(f"⚠️ Aktarma sunucusu sadece {disa_aktar.DISA_AKTAR_ADRES} adresini dinliyor; panel başka bir "
+               f"adresten açıldığı için indirme bağlantısı çalışmaz. DISA_AKTAR_ADRES ortam değişkenini "
+               f"(örn. 0.0.0.0) ayarlayıp {disa_aktar.DISA_AKTAR_PORT} portunu yayınlayın (Docker: docker-compose.yml).")
+else:
+    # Bağlantı, paneli açan tarayıcının kullandığı adresle aynı sunucuyu gösterir ve
+    # bu oturuma ait anahtarı taşır (anahtarsız istekler sunucuda reddedilir)
+    st.session_state['aktarma_anahtari'] = disa_aktar.oturum_anahtari(st.session_state.get('aktarma_anahtari'))
+    parametreler = {'baslangic': baslangic, 'bitis': bitis, 'bicim': bicim}
+    if slave_ids:
+        parametreler['ids'] = ",".join(map(str, slave_ids))
+    url = disa_aktar.indirme_adresi(host, parametreler, st.session_state['aktarma_anahtari'])
+
+    st.link_button(f"📥 {disa_aktar.dosya_adi(baslangic, bitis, bicim)} indir", url, type="primary")
+    st.caption("Veri sunucuda parça parça okunup gönderilir; aylarca veri de panel belleğini doldurmaz.")
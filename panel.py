@@ -1,10 +1,11 @@
 import streamlit as st
 import time
+import json
 import pandas as pd
-from datetime import datetime
-from pymodbus.client import ModbusTcpClient
+from datetime import datetime, timedelta
 import veritabani
 import utils 
+import canli_yayin
 
 # --- SAYFA AYARLARI ---
 st.set_page_config(
@@ -14,7 +15,7 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# DB Başlat
+# DB Başlat (göçler süreç başına bir kez uygulanır; sonraki çalıştırmalarda bellekte döner)
 veritabani.init_db()
 
 # --- CSS TASARIMI ---
@@ -36,105 +37,73 @@ st.markdown("""
 # parse_id_list artık utils.py'de
 
 @st.cache_resource
-def get_modbus_client(ip, port):
-    return ModbusTcpClient(ip, port=port, timeout=2) 
+def canli_abone():
+    """Süreç başına tek abone: tüm oturumlar collector'ın yayınını paylaşır"""
+    return canli_yayin.Abone()
 
-def read_device_with_retry(client, slave_id, config, max_retries=3):
+# Grafik pencereleri: None = canlı (son 100 örnek), sayı = son N saniye, 'ozel' = tarih aralığı
+GRAFIK_PENCERELERI = {
+    "Canlı (son 100 örnek)": None,
+    "Son 1 saat": 3600,
+    "Son 24 saat": 86400,
+    "Son 7 gün": 7 * 86400,
+    "Son 30 gün": 30 * 86400,
+    "Özel aralık": 'ozel',
+}
+GRAFIK_NOKTA_SAYISI = 500
+
+def grafik_araligi(pencere, ozel_aralik=None):
+    """Seçilen pencere için (baslangic, bitis) metinleri; bitiş dakikaya yuvarlanır (önbellek paylaşımı için)"""
+    if pencere == 'ozel':
+        # Aralığın ikinci ucu seçilene kadar date_input tek tarih döndürür
+        tarihler = list(ozel_aralik) if isinstance(ozel_aralik, (tuple, list)) else [ozel_aralik]
+        return f"{tarihler[0]} 00:00:00", f"{tarihler[-1]} 23:59:59"
+    bitis = datetime.now().replace(second=0, microsecond=0) + timedelta(minutes=1)
+    return (bitis - timedelta(seconds=pencere)).strftime('%Y-%m-%d %H:%M:%S'), bitis.strftime('%Y-%m-%d %H:%M:%S')
+
+CANLI_PENCERE = 100  # Canlı grafikte tutulan son örnek sayısı
+CANLI_SUTUNLAR = ["timestamp", "guc", "voltaj", "akim", "sicaklik", "hata_kodu", "hata_kodu_193"]
+
+def canli_pencere(abone, slave_id):
     """
-    Modbus cihazından veri okur, başarısız olursa retry yapar.
+    Oturumdaki canlı grafik tamponunu sadece imleçten sonraki yeni örneklerle günceller.
+    Cihaz veya kaynak (yayın / veritabanı) değişince tampon sıfırdan doldurulur.
     
-    Args:
-        client: Modbus client
-        slave_id: Cihaz ID'si
-        config: Adres konfigürasyonu
-        max_retries: Maksimum deneme sayısı
-        
     Returns:
-        tuple: (data dict veya None, error message veya None)
+        DataFrame: timestamp index'li son CANLI_PENCERE örnek
     """
-    last_error = None
+    # Yayının tamponunda bu cihaz yoksa (collector yeni başladı) veritabanından okunur
+    kaynak = 'yayin' if abone.bagli and abone.gecmis(slave_id, limit=1) else 'db'
+    tampon = st.session_state.get('canli_tampon')
+    if tampon is None or tampon['anahtar'] != (slave_id, kaynak):
+        tampon = st.session_state.canli_tampon = {
+            'anahtar': (slave_id, kaynak), 'imlec': None,
+            'df': pd.DataFrame(columns=CANLI_SUTUNLAR[1:], index=pd.DatetimeIndex([], name="timestamp"))}
     
-    for attempt in range(max_retries):
-        try:
-            # Bağlantı kontrolü
-            if not client.connected:
-                client.connect()
-                if not client.connected:
-                    last_error = "Bağlantı kurulamadı"
-                    if attempt < max_retries - 1:
-                        time.sleep(0.5)
-                        continue
-                    return None, last_error
-            
-            # 1. Standart Veriler
-            r_guc = client.read_holding_registers(address=config['guc_addr'], count=1, slave=slave_id)
-            if r_guc.isError():
-                last_error = f"Güç okunamadı (ID:{slave_id})"
-                if attempt < max_retries - 1:
-                    time.sleep(0.3)
-                    continue
-                return None, last_error
-            val_guc = r_guc.registers[0] * config['guc_scale']
-
-            r_volt = client.read_holding_registers(address=config['volt_addr'], count=1, slave=slave_id)
-            val_volt = 0 if r_volt.isError() else r_volt.registers[0] * config['volt_scale']
-
-            r_akim = client.read_holding_registers(address=config['akim_addr'], count=1, slave=slave_id)
-            val_akim = 0 if r_akim.isError() else r_akim.registers[0] * config['akim_scale']
-
-            r_isi = client.read_holding_registers(address=config['isi_addr'], count=1, slave=slave_id)
-            val_isi = 0 if r_isi.isError() else r_isi.registers[0] * config['isi_scale']
-
-            # 2. Hata Kodları
-            hata_kodu_189 = 0
-            try:
-                r_hata = client.read_holding_registers(address=189, count=2, slave=slave_id)
-                if not r_hata.isError():
-                    hata_kodu_189 = (r_hata.registers[0] << 16) | r_hata.registers[1]
-            except:
-                pass  # Hata kodları opsiyonel
-
-            hata_kodu_193 = 0
-            try:
-                time.sleep(0.02) 
-                r_hata2 = client.read_holding_registers(address=193, count=2, slave=slave_id)
-                if not r_hata2.isError():
-                    hata_kodu_193 = (r_hata2.registers[0] << 16) | r_hata2.registers[1]
-            except:
-                pass  # Hata kodları opsiyonel
-
-            # Başarılı okuma
-            return {
-                "slave_id": slave_id,
-                "guc": val_guc,
-                "voltaj": val_volt,
-                "akim": val_akim,
-                "sicaklik": val_isi,
-                "hata_kodu": hata_kodu_189,    
-                "hata_kodu_193": hata_kodu_193, 
-                "timestamp": datetime.now()
-            }, None
-
-        except ConnectionError as e:
-            last_error = f"Bağlantı hatası: {str(e)}"
-            if attempt < max_retries - 1:
-                time.sleep(0.5)
-                # Yeniden bağlanmayı dene
-                try:
-                    client.close()
-                    client.connect()
-                except:
-                    pass
-        except Exception as e:
-            last_error = f"Okuma hatası: {str(e)}"
-            if attempt < max_retries - 1:
-                time.sleep(0.3)
+    if kaynak == 'yayin':
+        yeni = abone.gecmis(slave_id, limit=CANLI_PENCERE, sonra=tampon['imlec'])
+        imlec = yeni[-1][0] if yeni else tampon['imlec']
+    else:
+        yeni, imlec = veritabani.yeni_verileri_getir(slave_id, tampon['imlec'], limit=CANLI_PENCERE)
     
-    return None, last_error
+    if yeni:
+        # Zaman sadece yeni satırlarda çözülür; tampon pencere boyutunda tutulur
+        df_yeni = pd.DataFrame(yeni, columns=CANLI_SUTUNLAR)
+        df_yeni["timestamp"] = pd.to_datetime(df_yeni["timestamp"], format='ISO8601')
+        df_yeni = df_yeni.set_index("timestamp")
+        df = df_yeni if tampon['df'].empty else pd.concat([tampon['df'], df_yeni])
+        tampon['df'] = df.iloc[-CANLI_PENCERE:]
+        tampon['imlec'] = imlec
+    return tampon['df']
 
-# Geriye dönük uyumluluk için
-def read_device(client, slave_id, config):
-    return read_device_with_retry(client, slave_id, config, max_retries=3)
+def cihaz_durumu_etiketi(saglik):
+    """cihaz_sagligi kaydını tablo için kısa bir etikete çevirir"""
+    if not saglik or saglik[0] == 'saglikli':
+        return "🟢 Çevrimiçi" if not saglik or not saglik[1] else f"🟡 {saglik[1]} hata"
+    if saglik[0] == 'yari_acik':
+        return "🟡 Deneniyor"
+    sonraki = saglik[4][11:] if saglik[4] else "?"
+    return f"🔴 Yanıt yok ({saglik[1]} hata, sonraki deneme {sonraki})"
 
 # --- STATE ---
 if 'monitoring' not in st.session_state: 
@@ -207,32 +176,50 @@ with st.sidebar:
         c_isi_adr = st.number_input("Isı Adresi", value=int(mevcut_ayarlar.get('isi_addr', 74)))
         c_isi_sc = st.number_input("Isı Çarpan", value=float(mevcut_ayarlar.get('isi_scale', 1.0)), step=0.1, format="%.2f")
     
-    config = {
-        'guc_addr': c_guc_adr, 'guc_scale': c_guc_sc,
-        'volt_addr': c_volt_adr, 'volt_scale': c_volt_sc,
-        'akim_addr': c_akim_adr, 'akim_scale': c_akim_sc,
-        'isi_addr': c_isi_adr, 'isi_scale': c_isi_sc,
-    }
-
+    st.markdown("---")
+    st.header("🔌 Geçit Topolojisi")
+    with st.expander("Çoklu Geçit / Süreç Ayarı"):
+        st.caption('Boş bırakılırsa yukarıdaki IP/Port ve ID listesi tek geçit olarak okunur. '
+                   'Örnek: [{"ad": "G1", "ip": "10.35.14.10", "port": 502, "slave_ids": "1-40", "parca": 2}]')
+        gecitler_input = st.text_area("Geçitler (JSON)", value=mevcut_ayarlar.get('gecitler', ''), height=120)
+        gecitler_gecerli = True
+        if gecitler_input.strip():
+            try:
+                gecitler_listesi = json.loads(gecitler_input)
+                gecitler_gecerli = isinstance(gecitler_listesi, list) and all(
+                    isinstance(g, dict) and 'ip' in g for g in gecitler_listesi)
+            except ValueError:
+                gecitler_gecerli = False
+            if not gecitler_gecerli:
+                st.warning("⚠️ Geçit listesi geçersiz (her geçit için en az 'ip' gerekli)")
+            else:
+                st.write(f"🔌 {len(gecitler_listesi)} geçit, {sum(int(g.get('parca', 1)) for g in gecitler_listesi)} çalışan süreç")
+    
     # AYARLARI KAYDET BUTONU
     st.markdown("---")
     if st.button("💾 AYARLARI KALICI OLARAK KAYDET", type="primary"):
-        # Tüm ayarları veritabanına yaz
-        veritabani.ayar_yaz('target_ip', target_ip)
-        veritabani.ayar_yaz('target_port', target_port)
-        veritabani.ayar_yaz('slave_ids', id_input)
-        veritabani.ayar_yaz('refresh_rate', refresh_rate)
-        veritabani.ayar_yaz('guc_addr', c_guc_adr)
-        veritabani.ayar_yaz('guc_scale', c_guc_sc)
-        veritabani.ayar_yaz('volt_addr', c_volt_adr)
-        veritabani.ayar_yaz('volt_scale', c_volt_sc)
-        veritabani.ayar_yaz('akim_addr', c_akim_adr)
-        veritabani.ayar_yaz('akim_scale', c_akim_sc)
-        veritabani.ayar_yaz('isi_addr', c_isi_adr)
-        veritabani.ayar_yaz('isi_scale', c_isi_sc)
+        # Tüm ayarlar tek transaction ile yazılır (collector yarım ayar görmez)
+        kaydedildi = veritabani.ayarlari_yaz({
+            'target_ip': target_ip,
+            'target_port': target_port,
+            'slave_ids': id_input,
+            'refresh_rate': refresh_rate,
+            'guc_addr': c_guc_adr,
+            'guc_scale': c_guc_sc,
+            'volt_addr': c_volt_adr,
+            'volt_scale': c_volt_sc,
+            'akim_addr': c_akim_adr,
+            'akim_scale': c_akim_sc,
+            'isi_addr': c_isi_adr,
+            'isi_scale': c_isi_sc,
+            'gecitler': gecitler_input.strip() if gecitler_gecerli else mevcut_ayarlar.get('gecitler', ''),
+        })
         
-        st.success("✅ Ayarlar kaydedildi! Collector 30 saniye içinde güncellenecek.")
-        st.rerun()
+        if kaydedildi:
+            st.success("✅ Ayarlar kaydedildi! Collector bir sonraki döngüde güncellenecek.")
+            st.rerun()
+        else:
+            st.error("❌ Ayarlar kaydedilemedi!")
 
     # Yenileme süresi ayarı
     st.markdown("---")
@@ -258,7 +245,7 @@ with st.sidebar:
     st.markdown("---")
     st.header("🎛️ Sistem Kontrolü")
     
-    if st.button("▶️ SİSTEMİ BAŞLAT"):
+    if st.button("▶️ CANLI İZLEMEYİ BAŞLAT"):
         st.session_state.monitoring = True
         st.rerun()
     if st.button("⏹️ DURDUR"):
@@ -274,83 +261,96 @@ with st.sidebar:
             st.rerun()
 
 # --- ANA EKRAN ---
+# Canlı tablo ve grafikler kendi aralıklarıyla yenilenen fragment'lerdir: otomatik yenileme
+# sadece o bölümü çalıştırır (yan menü, ayar okuma, CSS tekrar çalışmaz) ve oturum başına
+# sunucu thread'i uykuda beklemez. Yan menü sadece kullanıcı etkileşiminde çalışır.
 st.title("⚡ Güneş Enerjisi Santrali İzleme")
 
-# Hızlı Özet
-st.subheader("📋 Canlı Filo Durumu")
-table_spot = st.empty()
+# İzleme kapalıyken fragment'ler sadece etkileşimde yenilenir
+canli_aralik = st.session_state.refresh_interval if st.session_state.monitoring else None
+
+@st.fragment(run_every=canli_aralik)
+def filo_durumu():
+    # Canlı veri collector'ın yayınından gelir; yayın yoksa (collector kapalı) veritabanından okunur
+    abone = canli_abone()
+    if not st.session_state.monitoring:
+        st.info("Canlı izleme beklemede. Otomatik yenileme için BAŞLAT'a basın.")
+    elif abone.bagli:
+        st.success(f"✅ Canlı İzleme Aktif - Otomatik yenileme: {st.session_state.refresh_interval} saniye")
+    else:
+        st.warning("⚠️ Collector canlı yayınına bağlanılamadı, son kayıtlı veriler gösteriliyor. "
+                   "collector.py çalışıyor mu?")
+    
+    # Hızlı Özet
+    st.subheader("📋 Canlı Filo Durumu")
+    summary_data = abone.son_durum() if abone.bagli else None
+    if not summary_data:
+        summary_data = veritabani.tum_cihazlarin_son_durumu()
+    if summary_data:
+        df_sum = pd.DataFrame([row[:6] for row in summary_data], columns=["ID", "Son Zaman", "Güç (W)", "Voltaj (V)", "Akım (A)", "Isı (C)"])
+        df_sum["Son Zaman"] = pd.to_datetime(df_sum["Son Zaman"], format='ISO8601').dt.strftime('%H:%M:%S')
+        # Collector'ın devre kesici durumu (yanıt vermeyen cihazlar)
+        saglik = veritabani.cihaz_sagligini_getir()
+        df_sum["Bağlantı"] = [cihaz_durumu_etiketi(saglik.get(dev_id)) for dev_id in df_sum["ID"]]
+        st.dataframe(df_sum.set_index("ID"), use_container_width=True)
+
+filo_durumu()
 
 # Grafik Seçimi
 st.markdown("---")
-col_sel, col_info = st.columns([1, 3])
+col_sel, col_pencere, col_info = st.columns([1, 1, 2])
 with col_sel:
     selected_id = st.selectbox("📊 Detaylı Grafik İçin Cihaz Seç:", target_ids)
+with col_pencere:
+    secilen_pencere = st.selectbox("🕒 Zaman Aralığı", list(GRAFIK_PENCERELERI))
+    if GRAFIK_PENCERELERI[secilen_pencere] == 'ozel':
+        ozel_aralik = st.date_input("Tarih Aralığı", value=(datetime.now().date() - timedelta(days=7), datetime.now().date()))
+    grafik_yontemi = st.radio("Seyreltme", ["lttb", "min_maks"], horizontal=True,
+                              format_func=lambda y: "Eğri (LTTB)" if y == "lttb" else "Min/Max")
 with col_info:
     st.info("⚠️ Detaylı arıza kodlarını görmek için sol menüden **alarmlar** sayfasına gidin.")
 
-# Grafik Yer Tutucuları
-row1_c1, row1_c2 = st.columns(2)
-row2_c1, row2_c2 = st.columns(2)
-
-with row1_c1:
-    st.markdown(f"**☀️ ID:{int(selected_id)} - Güç**")
-    chart_guc = st.empty()
-with row1_c2:
-    st.markdown(f"**⚡ ID:{int(selected_id)} - Voltaj**")
-    chart_volt = st.empty()
-with row2_c1:
-    st.markdown(f"**📈 ID:{int(selected_id)} - Akım**")
-    chart_akim = st.empty()
-with row2_c2:
-    st.markdown(f"**🌡️ ID:{int(selected_id)} - Sıcaklık**")
-    chart_isi = st.empty()
-
-# --- DURUM ÇUBUĞU ---
-status_bar = st.empty()
-
-def ui_refresh():
-    # 1. TABLO GÜNCELLEME
-    summary_data = veritabani.tum_cihazlarin_son_durumu()
-    if summary_data:
-        df_sum = pd.DataFrame([row[:6] for row in summary_data], columns=["ID", "Son Zaman", "Güç (W)", "Voltaj (V)", "Akım (A)", "Isı (C)"])
-        df_sum["Son Zaman"] = pd.to_datetime(df_sum["Son Zaman"]).dt.strftime('%H:%M:%S')
-        table_spot.dataframe(df_sum.set_index("ID"), use_container_width=True)
-
-    # 2. GRAFİK GÜNCELLEME
-    detail_data = veritabani.son_verileri_getir(selected_id, limit=100)
-    if detail_data:
-        try:
-            df_det = pd.DataFrame(detail_data, columns=["timestamp", "guc", "voltaj", "akim", "sicaklik", "hata_kodu", "hata_kodu_193"])
-        except:
-            df_det = pd.DataFrame(detail_data, columns=["timestamp", "guc", "voltaj", "akim", "sicaklik", "hata_kodu"])
-            
-        df_det["timestamp"] = pd.to_datetime(df_det["timestamp"])
-        df_det = df_det.set_index("timestamp")
-        
-        chart_guc.line_chart(df_det["guc"], color="#FFD700")
-        chart_volt.line_chart(df_det["voltaj"], color="#29B6F6")
-        chart_akim.line_chart(df_det["akim"], color="#66BB6A")
-        chart_isi.line_chart(df_det["sicaklik"], color="#EF5350")
+# Canlı pencere panel aralığıyla, saat/gün pencereleri dakikada bir (aralık dakikaya
+# yuvarlanır), geçmiş tarih aralığı hiç yenilenmez
+pencere = GRAFIK_PENCERELERI[secilen_pencere]
+if canli_aralik is None or pencere == 'ozel':
+    grafik_aralik = None
+elif pencere is None:
+    grafik_aralik = canli_aralik
+else:
+    grafik_aralik = max(canli_aralik, 60)
 
-# --- ANA DÖNGÜ ---
-if st.session_state.monitoring:
-    client = get_modbus_client(target_ip, target_port)
-    status_bar.success(f"✅ Sistem Aktif - Otomatik yenileme: {st.session_state.refresh_interval} saniye")
-    
-    # Veri toplama
-    for dev_id in target_ids:
-        data, err = read_device(client, dev_id, config)
-        if data:
-            veritabani.veri_ekle(dev_id, data)
-        elif err:
-            status_bar.warning(f"⚠️ ID {dev_id} okunamadı: {err}")
+@st.fragment(run_every=grafik_aralik)
+def grafikler():
+    row1_c1, row1_c2 = st.columns(2)
+    row2_c1, row2_c2 = st.columns(2)
+    spotlar = {}
+    for alan, kolon, baslik in (("guc", row1_c1, "☀️ ID:{} - Güç"), ("voltaj", row1_c2, "⚡ ID:{} - Voltaj"),
+                                ("akim", row2_c1, "📈 ID:{} - Akım"), ("sicaklik", row2_c2, "🌡️ ID:{} - Sıcaklık")):
+        with kolon:
+            st.markdown(f"**{baslik.format(int(selected_id))}**")
+            spotlar[alan] = st.empty()
+    renkler = {"guc": "#FFD700", "voltaj": "#29B6F6", "akim": "#66BB6A", "sicaklik": "#EF5350"}
     
-    # UI güncelleme
-    ui_refresh()
+    if pencere is not None:
+        # Uzun aralıklar özet tablolarından, sabit sayıda seyreltilmiş noktayla çizilir
+        baslangic, bitis = grafik_araligi(pencere, ozel_aralik if pencere == 'ozel' else None)
+        grafik = veritabani.grafik_verisi(selected_id, baslangic, bitis,
+                                          nokta=GRAFIK_NOKTA_SAYISI, yontem=grafik_yontemi)
+        for alan, spot in spotlar.items():
+            seri = grafik['seriler'].get(alan)
+            if seri:
+                df_seri = pd.DataFrame(seri, columns=["timestamp", alan])
+                df_seri["timestamp"] = pd.to_datetime(df_seri["timestamp"])
+                spot.line_chart(df_seri.set_index("timestamp")[alan], color=renkler[alan])
+            else:
+                spot.info("Bu aralıkta veri yok.")
+        return
     
-    # Otomatik yenileme (kullanıcının seçtiği süre)
-    time.sleep(st.session_state.refresh_interval)
-    st.rerun()
-else:
-    ui_refresh()
-    status_bar.info("Sistem Beklemede. Grafikleri görmek için BAŞLAT'a basın.")
\ No newline at end of file
+    df_det = canli_pencere(canli_abone(), selected_id)
+    if not df_det.empty:
+        for alan, spot in spotlar.items():
+            spot.line_chart(df_det[alan], color=renkler[alan])
+
+if selected_id is not None:
+    grafikler()
@@ -0,0 +1,303 @@
+"""
+Collector uçtan uca performans testi
+Sanal inverter çiftliğini (sanal_inverter.py) ayrı bir süreçte başlatır ve collector
+döngüsünü (collector.collector_dongusu, tek geçit / tek süreç modu) geçici bir
+veritabanıyla belirli cihaz sayılarında sabit süre çalıştırır. Her cihaz sayısı için:
+
+- cihaz/sn: veritabanına yazılan örnek sayısı / süre (hedef: cihaz sayısı / periyot)
+- okuma gecikmesi: cihaz başına read_device_async süresi (p50 / p95 / p99 / max, ms)
+- periyot aşımı: zamanlayıcıda bütün bir periyot geç kalan görevlerin oranı
+- DB yazma gecikmesi: veri_ekle_toplu çağrısı başına süre (p50 / p95 / p99 / max, ms)
+
+Ölçümler collector ve veritabani fonksiyonları sarılarak alınır; kodun kendisi değişmez.
+Sonuçlar JSON olarak kaydedilebilir; --karsilastir ile önceki bir sonuca göre gerileme
+varsa çıkış kodu 1 olur (CI'da veya değişiklik öncesi/sonrası karşılaştırmada).
+
+Kullanım:
+    python performans_testi.py                                   # 10, 50, 240 cihaz, 20'şer sn
+    python performans_testi.py --cihazlar 10,50 --sure 10 --json sonuc.json
+    python performans_testi.py --karsilastir onceki.json --tolerans 0.2
+
+Not: Modbus slave ID'leri 1-247 ve veritabanı cihazları slave ID ile ayırdığı için tek
+geçitte en fazla 247 cihaz ölçülebilir.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+import canli_yayin
+import collector
+import veritabani
+import zamanlayici
+
+VARSAYILAN_CIHAZLAR = (10, 50, 240)
+VARSAYILAN_SURE = 20.0      # saniye: her cihaz sayısı için ölçüm süresi
+VARSAYILAN_PERIYOT = 1.0    # saniye: refresh_rate (cihaz başına hedef okuma aralığı)
+VARSAYILAN_GECIKME = '0.002-0.01'  # simülatörün yanıt gecikmesi (sn)
+VARSAYILAN_TOLERANS = 0.2   # karşılaştırmada izin verilen kötüleşme oranı
+SIMULATOR_HAZIR_ZAMAN_ASIMI = 15.0
+YUZDELIKLER = (50, 95, 99)
+
+
+def yuzdelikler(degerler):
+    """Süre listesi (sn) -> {'p50', 'p95', 'p99', 'max', 'ortalama'} (ms); boşsa None değerler"""
+    if not len(degerler):
+        return dict({f"p{p}": None for p in YUZDELIKLER}, max=None, ortalama=None)
+    ms = np.asarray(degerler, dtype=np.float64) * 1000
+    sonuc = {f"p{p}": round(float(deger), 3) for p, deger in zip(YUZDELIKLER, np.percentile(ms, YUZDELIKLER))}
+    sonuc['max'] = round(float(ms.max()), 3)
+    sonuc['ortalama'] = round(float(ms.mean()), 3)
+    return sonuc
+
+
+class _Olcumler:
+    """Tek bir çalıştırmanın ham ölçümleri"""
+
+    def __init__(self):
+        self.okuma_sureleri = []
+        self.okuma_hatasi = 0
+        self.yazma_sureleri = []
+        self.yazilan = 0
+        self.gorev = 0
+        self.periyot_asimi = 0
+        self.max_gecikme = 0.0
+
+
+@contextlib.contextmanager
+def _olcum_kancalari(olcumler):
+    """collector okuma, zamanlayıcı ve toplu yazma fonksiyonlarını süre ölçen sarmalayıcılarla değiştirir"""
+    asil_okuma = collector.read_device_async
+    asil_yazma = veritabani.veri_ekle_toplu
+    asil_zamanlayici = zamanlayici.Zamanlayici
+
+    async def olculen_okuma(*args, **kwargs):
+        baslangic = time.perf_counter()
+        sonuc = await asil_okuma(*args, **kwargs)
+        olcumler.okuma_sureleri.append(time.perf_counter() - baslangic)
+        if sonuc is None:
+            olcumler.okuma_hatasi += 1
+        return sonuc
+
+    def olculen_yazma(kayitlar):
+        baslangic = time.perf_counter()
+        sonuc = asil_yazma(kayitlar)
+        olcumler.yazma_sureleri.append(time.perf_counter() - baslangic)
+        olcumler.yazilan += sonuc or 0
+        return sonuc
+
+    class OlculenZamanlayici(asil_zamanlayici):
+        def hazir_gorevler(self, simdi=None):
+            onceki = sum(self.gecikmeler.values())
+            gorevler = super().hazir_gorevler(simdi)
+            olcumler.gorev += sum(len(gruplar) for _, gruplar in gorevler)
+            olcumler.periyot_asimi += sum(self.gecikmeler.values()) - onceki
+            olcumler.max_gecikme = max(olcumler.max_gecikme, self.max_gecikme)
+            return gorevler
+
+    collector.read_device_async = olculen_okuma
+    veritabani.veri_ekle_toplu = olculen_yazma
+    zamanlayici.Zamanlayici = OlculenZamanlayici
+    try:
+        yield
+    finally:
+        collector.read_device_async = asil_okuma
+        veritabani.veri_ekle_toplu = asil_yazma
+        zamanlayici.Zamanlayici = asil_zamanlayici
+
+
+def _bos_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sok:
+        sok.bind(("127.0.0.1", 0))
+        return sok.getsockname()[1]
+
+
+@contextlib.contextmanager
+def simulator(port, cihaz_sayisi, gecikme=VARSAYILAN_GECIKME, ek_argumanlar=()):
+    """sanal_inverter.py'yi ayrı süreçte başlatır, port dinlemeye başlayınca döner"""
+    komut = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "sanal_inverter.py"),
+             "--portlar", str(port), "--cihaz", str(cihaz_sayisi), "--gecikme", str(gecikme),
+             "--tohum", "1", "--sessiz", *ek_argumanlar]
+    surec = subprocess.Popen(komut, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        son = time.monotonic() + SIMULATOR_HAZIR_ZAMAN_ASIMI
+        while True:
+            if surec.poll() is not None:
+                raise RuntimeError(f"Simülatör başlatılamadı (çıkış kodu {surec.returncode})")
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > son:
+                    raise RuntimeError(f"Simülatör {SIMULATOR_HAZIR_ZAMAN_ASIMI:.0f} sn içinde hazır olmadı")
+                time.sleep(0.1)
+        yield surec
+    finally:
+        surec.terminate()
+        try:
+            surec.wait(5)
+        except subprocess.TimeoutExpired:
+            surec.kill()
+
+
+def olc(cihaz_sayisi, sure=VARSAYILAN_SURE, periyot=VARSAYILAN_PERIYOT, gecikme=VARSAYILAN_GECIKME,
+        eszamanli_istek=4, simulator_argumanlari=()):
+    """
+    Bir cihaz sayısı için simülatörü ve collector döngüsünü `sure` saniye çalıştırır.
+
+    Returns:
+        dict: tek satırlık sonuç (bkz. modül açıklaması)
+    """
+    olcumler = _Olcumler()
+    port = _bos_port()
+    eski_db, eski_soket = veritabani.DB_NAME, canli_yayin.SOKET_YOLU
+    with tempfile.TemporaryDirectory(prefix="performans_") as klasor, \
+            simulator(port, cihaz_sayisi, gecikme, simulator_argumanlari):
+        veritabani.DB_NAME = os.path.join(klasor, "performans.db")
+        canli_yayin.SOKET_YOLU = os.path.join(klasor, "canli.sock")
+
+        async def calistir():
+            try:
+                await asyncio.wait_for(collector.collector_dongusu(), sure)
+            except asyncio.TimeoutError:
+                pass
+
+        try:
+            # Collector ve şema göçü çıktıları ekrana (ve --json - çıktısına) karışmaz
+            with open(os.devnull, "w") as bos, contextlib.redirect_stdout(bos), _olcum_kancalari(olcumler):
+                veritabani.init_db()
+                veritabani.ayarlari_yaz({
+                    'target_ip': '127.0.0.1', 'target_port': port, 'slave_ids': f"1-{cihaz_sayisi}",
+                    'gecitler': '', 'refresh_rate': periyot, 'eszamanli_istek': eszamanli_istek,
+                })
+                baslangic = time.perf_counter()
+                asyncio.run(calistir())
+                gecen = time.perf_counter() - baslangic
+        finally:
+            veritabani.baglantilari_kapat()
+            veritabani.DB_NAME, canli_yayin.SOKET_YOLU = eski_db, eski_soket
+
+    return {
+        'cihaz': cihaz_sayisi,
+        'sure_sn': round(gecen, 3),
+        'ornek': olcumler.yazilan,
+        'cihaz_per_sn': round(olcumler.yazilan / gecen, 2),
+        'hedef_per_sn': round(cihaz_sayisi / periyot, 2),
+        'okuma': len(olcumler.okuma_sureleri),
+        'okuma_hatasi': olcumler.okuma_hatasi,
+        'okuma_ms': yuzdelikler(olcumler.okuma_sureleri),
+        'gorev': olcumler.gorev,
+        'periyot_asimi_orani': round(olcumler.periyot_asimi / olcumler.gorev, 4) if olcumler.gorev else None,
+        'max_zamanlayici_gecikmesi_sn': round(olcumler.max_gecikme, 3),
+        'db_yazma': len(olcumler.yazma_sureleri),
+        'db_yazma_ms': yuzdelikler(olcumler.yazma_sureleri),
+    }
+
+
+def karsilastir(onceki, simdiki, tolerans=VARSAYILAN_TOLERANS):
+    """
+    Aynı cihaz sayısındaki sonuçları karşılaştırır.
+
+    Returns:
+        list: gerileme mesajları (boşsa gerileme yok)
+    """
+    onceki_satirlar = {satir['cihaz']: satir for satir in onceki.get('sonuclar', [])}
+    geriler = []
+    for satir in simdiki.get('sonuclar', []):
+        eski = onceki_satirlar.get(satir['cihaz'])
+        if eski is None:
+            continue
+        etiket = f"{satir['cihaz']} cihaz"
+        if satir['cihaz_per_sn'] < eski['cihaz_per_sn'] * (1 - tolerans):
+            geriler.append(f"{etiket}: cihaz/sn {eski['cihaz_per_sn']} -> {satir['cihaz_per_sn']}")
+        for alan in ('okuma_ms', 'db_yazma_ms'):
+            eski_p95, yeni_p95 = eski[alan].get('p95'), satir[alan].get('p95')
+            if eski_p95 is not None and yeni_p95 is not None and yeni_p95 > eski_p95 * (1 + tolerans):
+                geriler.append(f"{etiket}: {alan} p95 {eski_p95} -> {yeni_p95}")
+        eski_asim, yeni_asim = eski.get('periyot_asimi_orani') or 0, satir.get('periyot_asimi_orani') or 0
+        if yeni_asim > eski_asim + tolerans / 10:
+            geriler.append(f"{etiket}: periyot aşımı {eski_asim:.2%} -> {yeni_asim:.2%}")
+    return geriler
+
+
+def tablo_yazdir(sonuclar):
+    print(f"{'Cihaz':>6} {'cihaz/sn':>9} {'hedef':>7} {'okuma p50/p95/p99 ms':>24} {'hata':>5} "
+          f"{'aşım':>7} {'DB yazma p50/p95/p99 ms':>26}")
+    for satir in sonuclar:
+        okuma, yazma = satir['okuma_ms'], satir['db_yazma_ms']
+        asim = satir['periyot_asimi_orani']
+        print(f"{satir['cihaz']:>6} {satir['cihaz_per_sn']:>9.1f} {satir['hedef_per_sn']:>7.1f} "
+              f"{_ms(okuma):>24} {satir['okuma_hatasi']:>5} {'-' if asim is None else f'{asim:.1%}':>7} "
+              f"{_ms(yazma):>26}")
+
+
+def _ms(yuzdelik):
+    if yuzdelik['p50'] is None:
+        return "-"
+    return f"{yuzdelik['p50']:.2f}/{yuzdelik['p95']:.2f}/{yuzdelik['p99']:.2f}"
+
+
+def main(argumanlar=None):
+    ayristirici = argparse.ArgumentParser(description="Collector uçtan uca performans testi")
+    ayristirici.add_argument('--cihazlar', default=','.join(map(str, VARSAYILAN_CIHAZLAR)),
+                             help="Ölçülecek cihaz sayıları (örn. 10,50,240)")
+    ayristirici.add_argument('--sure', type=float, default=VARSAYILAN_SURE, help="Cihaz sayısı başına süre (sn)")
+    ayristirici.add_argument('--periyot', type=float, default=VARSAYILAN_PERIYOT, help="refresh_rate (sn)")
+    ayristirici.add_argument('--eszamanli-istek', type=int, default=4)
+    ayristirici.add_argument('--gecikme', default=VARSAYILAN_GECIKME, help="Simülatör yanıt gecikmesi (sn)")
+    ayristirici.add_argument('--simulator', default='',
+                             help="Simülatöre eklenecek argümanlar (örn. \"--zaman-asimi 0.01 --alarm 0.001\")")
+    ayristirici.add_argument('--json', help="Sonuçların yazılacağı dosya ('-': standart çıktı)")
+    ayristirici.add_argument('--karsilastir', help="Önceki JSON sonuç; gerileme varsa çıkış kodu 1")
+    ayristirici.add_argument('--tolerans', type=float, default=VARSAYILAN_TOLERANS)
+    args = ayristirici.parse_args(argumanlar)
+
+    cihazlar = [int(deger) for deger in args.cihazlar.split(',') if deger.strip()]
+    rapor = {
+        'zaman': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ayarlar': {'sure': args.sure, 'periyot': args.periyot, 'eszamanli_istek': args.eszamanli_istek,
+                    'gecikme': args.gecikme, 'simulator': args.simulator},
+        'sonuclar': [],
+    }
+    for cihaz_sayisi in cihazlar:
+        print(f"⏱️  {cihaz_sayisi} cihaz, {args.sure:g} sn...", file=sys.stderr)
+        rapor['sonuclar'].append(olc(cihaz_sayisi, args.sure, args.periyot, args.gecikme,
+                                     args.eszamanli_istek, args.simulator.split()))
+
+    if args.json == '-':
+        print(json.dumps(rapor, ensure_ascii=False, indent=2))
+    else:
+        tablo_yazdir(rapor['sonuclar'])
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(rapor, f, ensure_ascii=False, indent=2)
+            print(f"💾 {args.json}")
+
+    if args.karsilastir:
+        with open(args.karsilastir, encoding='utf-8') as f:
+            geriler = karsilastir(json.load(f), rapor, args.tolerans)
+        for mesaj in geriler:
+            print(f"⚠️ Gerileme: {mesaj}", file=sys.stderr)
+        if geriler:
+            return 1
+        print(f"✅ {args.karsilastir} ile karşılaştırıldı, gerileme yok", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    # Okunamayan cihaz logları sayaçlarda toplanır; ekranı doldurmasın
+    logging.basicConfig(level=logging.CRITICAL)
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import unittest
+
+import performans_testi
+
+
+class TestPerformansTesti(unittest.TestCase):
+    def test_yuzdelikler(self):
+        sonuc = performans_testi.yuzdelikler([i / 1000 for i in range(1, 101)])
+        self.assertEqual((sonuc['p50'], sonuc['max']), (50.5, 100.0))
+        self.assertIsNone(performans_testi.yuzdelikler([])['p95'])
+
+    def test_gerileme_bulunur(self):
+        def rapor(cihaz_per_sn, okuma_p95, asim):
+            return {'sonuclar': [{'cihaz': 10, 'cihaz_per_sn': cihaz_per_sn, 'periyot_asimi_orani': asim,
+                                  'okuma_ms': {'p95': okuma_p95}, 'db_yazma_ms': {'p95': None}}]}
+        onceki = rapor(10.0, 20.0, 0.0)
+        self.assertEqual(performans_testi.karsilastir(onceki, rapor(9.0, 23.0, 0.01)), [])
+        geriler = performans_testi.karsilastir(onceki, rapor(7.0, 30.0, 0.2))
+        self.assertEqual(len(geriler), 3)
+
+    def test_uctan_uca(self):
+        sonuc = performans_testi.olc(5, sure=2.5, periyot=0.5, gecikme='0')
+        self.assertGreater(sonuc['ornek'], 0)
+        self.assertEqual(sonuc['okuma_hatasi'], 0)
+        self.assertIsNotNone(sonuc['okuma_ms']['p99'])
+        self.assertIsNotNone(sonuc['db_yazma_ms']['p50'])
+
+
+if __name__ == '__main__':
+    unittest.main()
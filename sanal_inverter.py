@@ -1,144 +1,378 @@
+"""
+Sanal inverter çiftliği (Modbus TCP simülatörü)
+Collector'ı gerçek sahaya çıkmadan filo ölçeğinde denemek için: birden fazla porta
+(her biri ayrı bir gateway gibi) port başına N slave yerleştirir. Slave ID'leri portlar
+boyunca artarak devam eder (veritabanı cihazları slave ID ile ayırır; toplam en fazla 247).
+
+- Güneş profili tüm çiftlik için NumPy dizileriyle tek seferde hesaplanır; her cihazın
+  kendi kapasitesi, faz kayması (yön/gölge farkı) ve bulut etkisi vardır.
+- Her istek için yapılandırılabilir yanıt gecikmesi, zaman aşımı (yanıt hiç gönderilmez)
+  ve Modbus istisna kodu üretilebilir; --yanitsiz ile verilen ID'ler hiç yanıt vermez.
+- 189-190 (32 bit) ve 193 register'larına arıza bitleri yazılır; 189 arızası süresince
+  cihaz üretimi durur.
+
+Kullanım:
+    python sanal_inverter.py                                  # tek port (5020), tek cihaz (ID 1)
+    python sanal_inverter.py --portlar 5020-5023 --cihaz 40 --gecikme 0.02-0.15 \\
+        --zaman-asimi 0.01 --istisna 0.01 --alarm 0.002 --yanitsiz 7,12
+"""
+import argparse
 import asyncio
+import json
 import logging
-import math
 import random
+import time
+from collections import Counter, namedtuple
 from datetime import datetime
+
+import numpy as np
 from pymodbus.datastore import ModbusSequentialDataBlock, ModbusSlaveContext, ModbusServerContext
-from pymodbus.server import StartAsyncTcpServer
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.server import ModbusTcpServer
+from pymodbus.server.requesthandler import ServerRequestHandler
+
+import utils
 
 # --- AYARLAR ---
 TEST_IP = "127.0.0.1"
 TEST_PORT = 5020
 
 # Simülasyon Parametreleri
-MAX_GUC_KAPASITESI = 3000  # 3000 Watt (3kW) panel
+MAX_GUC_KAPASITESI = 3000  # 3000 Watt (3kW) panel (cihazlar bunun %70-%130'u arasında dağılır)
 TOPLAM_URETIM_WH = 12500   # Sayac 12.5 kWh'den baslasin
+REGISTER_SAYISI = 200      # Cihaz başına hafıza (hata kodları için yeterli)
+
+# Gerçek hayattaki 6 dakika (360 saniye) = Sanal 24 saat (1440 dakika)
+DONGU_SURESI_SN = 360
+GUN_DOGUSU = 240   # 04:00
+GUN_BATIMI = 1200  # 20:00
+
+# Arıza register'ları ve üretilebilecek bitler (veritabani.VARSAYILAN_ARIZA_KODLARI ile aynı)
+ARIZA_BITLERI = {189: 24, 193: 12}
+
+# Modbus istisna kodları: 0x04 cihaz arızası, 0x06 meşgul, 0x0A yol yok, 0x0B hedef yanıt vermedi
+VARSAYILAN_ISTISNA_KODLARI = (0x04, 0x06, 0x0B)
+
+# gecikme_min/max: her yanıttan önce beklenen süre aralığı (sn)
+# zaman_asimi / istisna: istek başına olasılık (yanıt hiç gönderilmez / istisna yanıtı)
+# alarm: cihaz başına saniyelik yeni arıza olasılığı; alarm_suresi ortalama arıza süresi (sn)
+# seri_hat: True ise port başına istekler sırayla cevaplanır (RS485 hattı arkasındaki gateway gibi)
+# yanitsiz: hiç yanıt vermeyen slave ID'leri
+ArizaAyarlari = namedtuple(
+    'ArizaAyarlari',
+    ['gecikme_min', 'gecikme_max', 'zaman_asimi', 'istisna', 'istisna_kodlari',
+     'alarm', 'alarm_suresi', 'seri_hat', 'yanitsiz'],
+    defaults=(0.0, 0.0, 0.0, 0.0, VARSAYILAN_ISTISNA_KODLARI, 0.0, 30.0, False, frozenset()))
+
+
+class Ciftlik:
+    """
+    Tüm sanal cihazların durumu. Cihaz i'nin değerleri dizilerin i. elemanındadır;
+    baglamlar[port][slave_id] o cihazın Modbus hafızasıdır.
+    """
+
+    def __init__(self, portlar=(TEST_PORT,), cihaz_sayisi=1, ilk_id=1, ayarlar=None, tohum=None):
+        portlar = list(portlar)
+        if ilk_id < 1 or ilk_id + len(portlar) * cihaz_sayisi - 1 > 247:
+            raise ValueError("Slave ID'leri 1-247 aralığında olmalı (port sayısı x cihaz sayısı)")
+        self.ayarlar = ayarlar or ArizaAyarlari()
+        self.cihazlar = [(port, ilk_id + sira * cihaz_sayisi + i)
+                         for sira, port in enumerate(portlar) for i in range(cihaz_sayisi)]
+        self.baglamlar = {port: {} for port in portlar}
+        self._hafizalar = []
+        for port, slave_id in self.cihazlar:
+            baglam = ModbusSlaveContext(hr=ModbusSequentialDataBlock(0, [0] * REGISTER_SAYISI))
+            self.baglamlar[port][slave_id] = baglam
+            self._hafizalar.append(baglam)
+
+        n = len(self.cihazlar)
+        self._np = np.random.default_rng(tohum)
+        self._rastgele = random.Random(tohum)
+        self.kapasite = MAX_GUC_KAPASITESI * self._np.uniform(0.7, 1.3, n)
+        self.faz = self._np.uniform(-20, 20, n)  # sanal dakika
+        self.toplam_uretim = TOPLAM_URETIM_WH + self._np.uniform(0, 5000, n)
+        self.ariza_189 = np.zeros(n, dtype=np.int64)
+        self.ariza_193 = np.zeros(n, dtype=np.int64)
+        self.ariza_bitis = np.zeros(n)
+        self.sayaclar = Counter()
+        self._son_adim = None
+
+    def profil_uret(self, simdi=None):
+        """
+        Bütün cihazların anlık değerlerini hesaplar (sayaçlar ve arızalar da ilerler).
+
+        Returns:
+            dict: {'guc', 'voltaj', 'akim_x10', 'toplam_uretim', 'sicaklik', 'ariza_189', 'ariza_193'}
+                  n elemanlı int dizileri, ayrıca 'sanal_saat' ('SS:DD')
+        """
+        simdi = simdi or datetime.now()
+        zaman = simdi.timestamp()
+        gecen = 1.0 if self._son_adim is None else min(max(zaman - self._son_adim, 0.0), 60.0)
+        self._son_adim = zaman
+        n = len(self.cihazlar)
+
+        # Gerçekte 1 saniye geçince simülasyonda 4 dakika geçer
+        dongu_saniyesi = (simdi.minute * 60 + simdi.second) % DONGU_SURESI_SN
+        sanal_zaman = dongu_saniyesi * 4
+        cihaz_zamani = (sanal_zaman + self.faz) % 1440
+        gunduz = (cihaz_zamani > GUN_DOGUSU) & (cihaz_zamani < GUN_BATIMI)
+        gunes = np.where(gunduz, np.sin(np.pi * (cihaz_zamani - GUN_DOGUSU) / (GUN_BATIMI - GUN_DOGUSU)), 0.0)
+        bulut = self._np.uniform(0.9, 1.0, n)  # Ara sira gunes kapansin - %10 dalgalanma
+
+        self._arizalari_ilerlet(zaman, gecen)
+        guc = (self.kapasite * gunes * bulut).astype(np.int64)
+        guc[self.ariza_189 != 0] = 0  # Arıza süresince inverter üretmez
+
+        voltaj = self._np.uniform(218, 235, n).astype(np.int64)
+        akim_x10 = (guc / voltaj * 10).astype(np.int64)
+        # Gece soğusun (15C), Gündüz ısınsın (Maks 55C)
+        sicaklik = np.where(guc > 0, 25 + (guc / self.kapasite * 30).astype(np.int64), 15)
+        # Hızlı döngü olduğu için üretimi biraz abartarak ekleyelim ki sayaç dönsün
+        self.toplam_uretim += guc / 1000 * gecen
+
+        return {
+            'guc': guc, 'voltaj': voltaj, 'akim_x10': akim_x10,
+            'toplam_uretim': self.toplam_uretim.astype(np.int64) % 65536,  # 16 bit sayaç gibi başa döner
+            'sicaklik': sicaklik, 'ariza_189': self.ariza_189.copy(), 'ariza_193': self.ariza_193.copy(),
+            'sanal_saat': f"{sanal_zaman // 60:02}:{sanal_zaman % 60:02}",
+        }
+
+    def _arizalari_ilerlet(self, zaman, gecen):
+        """Süresi dolan arızaları temizler, olasılığa göre yenilerini başlatır (her cihazda en fazla bir arıza)"""
+        biten = (self.ariza_bitis > 0) & (self.ariza_bitis <= zaman)
+        self.ariza_189[biten] = 0
+        self.ariza_193[biten] = 0
+        self.ariza_bitis[biten] = 0
+        if self.ayarlar.alarm <= 0:
+            return
+        olasilik = 1 - (1 - min(self.ayarlar.alarm, 1.0)) ** gecen
+        yeni = np.flatnonzero((self.ariza_bitis == 0) & (self._np.random(len(self.cihazlar)) < olasilik))
+        if not len(yeni):
+            return
+        register_189 = self._np.random(len(yeni)) < 0.5
+        i189, i193 = yeni[register_189], yeni[~register_189]
+        self.ariza_189[i189] = np.left_shift(1, self._np.integers(0, ARIZA_BITLERI[189], len(i189)))
+        self.ariza_193[i193] = np.left_shift(1, self._np.integers(0, ARIZA_BITLERI[193], len(i193)))
+        self.ariza_bitis[yeni] = zaman + self._np.exponential(self.ayarlar.alarm_suresi, len(yeni)) + 1
+        self.sayaclar['alarm'] += len(yeni)
+
+    def yaz(self, degerler):
+        """Hesaplanan değerleri cihazların holding register'larına yazar"""
+        # Register 70-74: Güç (W), Voltaj (V), Akım (A x10), Toplam Üretim (Wh), Sıcaklık (°C)
+        olcumler = np.stack([degerler['guc'], degerler['voltaj'], degerler['akim_x10'],
+                             degerler['toplam_uretim'], degerler['sicaklik']], axis=1).tolist()
+        # Register 189-190: Hata Kodu 1 (32 bit), 193: Hata Kodu 2 (tek yazma: 189-194)
+        arizalar = np.stack([degerler['ariza_189'] >> 16, degerler['ariza_189'] & 0xFFFF,
+                             np.zeros_like(degerler['ariza_193']), np.zeros_like(degerler['ariza_193']),
+                             degerler['ariza_193'], np.zeros_like(degerler['ariza_193'])], axis=1).tolist()
+        for baglam, olcum, ariza in zip(self._hafizalar, olcumler, arizalar):
+            baglam.setValues(3, 70, olcum)
+            baglam.setValues(3, 189, ariza)
+
+    def adim(self, simdi=None):
+        degerler = self.profil_uret(simdi)
+        self.yaz(degerler)
+        return degerler
+
+    def yanit_karari(self, slave_id):
+        """
+        Bir isteğe nasıl yanıt verileceği.
+
+        Returns:
+            tuple: (gecikme_sn, karar) - karar None (normal yanıt), 'zaman_asimi' veya istisna kodu
+        """
+        ayarlar, rastgele = self.ayarlar, self._rastgele
+        self.sayaclar['istek'] += 1
+        gecikme = ayarlar.gecikme_min
+        if ayarlar.gecikme_max > ayarlar.gecikme_min:
+            gecikme = rastgele.uniform(ayarlar.gecikme_min, ayarlar.gecikme_max)
+        if slave_id in ayarlar.yanitsiz or (ayarlar.zaman_asimi and rastgele.random() < ayarlar.zaman_asimi):
+            self.sayaclar['zaman_asimi'] += 1
+            return gecikme, 'zaman_asimi'
+        if ayarlar.istisna and rastgele.random() < ayarlar.istisna:
+            self.sayaclar['istisna'] += 1
+            return gecikme, rastgele.choice(ayarlar.istisna_kodlari)
+        return gecikme, None
+
+
+class _IstekIsleyici(ServerRequestHandler):
+    """
+    Bağlantı başına istek işleyici. pymodbus'un varsayılan işleyicisi tek bir "son istek"
+    tuttuğu için aynı bağlantıdan art arda gelen istekler gecikme sırasında birbirinin
+    üzerine yazılır; burada her istek kendi görevinde ayrı ayrı cevaplanır.
+    """
+
+    def callback_data(self, data, addr=None):
+        kullanilan = 0
+        while kullanilan < len(data):
+            try:
+                adim, istek = self.framer.processIncomingFrame(data[kullanilan:])
+            except ModbusIOException:
+                self.server_send(ExceptionResponse(40, exception_code=ExceptionResponse.ILLEGAL_FUNCTION), addr)
+                return len(data)
+            if not adim:
+                break
+            kullanilan += adim
+            if istek is not None:
+                gorev = self.loop.create_task(self._yanitla(istek, addr))
+                self.server.gorevler.add(gorev)
+                gorev.add_done_callback(self.server.gorevler.discard)
+        return kullanilan
+
+    async def _yanitla(self, istek, addr):
+        sunucu = self.server
+        baglam = sunucu.ciftlik.baglamlar[sunucu.port].get(istek.dev_id)
+        if sunucu.hat_kilidi is not None:
+            async with sunucu.hat_kilidi:
+                yanit = await self._yanit_uret(istek, baglam)
+        else:
+            yanit = await self._yanit_uret(istek, baglam)
+        if yanit is None or not self.transport:
+            return  # Zaman aşımı: istemci yanıtı beklerken süresi dolar
+        yanit.transaction_id = istek.transaction_id
+        yanit.dev_id = istek.dev_id
+        self.server_send(yanit, addr)
+
+    async def _yanit_uret(self, istek, baglam):
+        if baglam is None:
+            # Gateway'in arkasında olmayan ID: gerçek geçitler gibi "hedef yanıt vermedi"
+            return ExceptionResponse(istek.function_code, ExceptionResponse.GATEWAY_NO_RESPONSE)
+        gecikme, karar = self.server.ciftlik.yanit_karari(istek.dev_id)
+        if gecikme > 0:
+            await asyncio.sleep(gecikme)
+        if karar == 'zaman_asimi':
+            return None
+        if karar is not None:
+            return ExceptionResponse(istek.function_code, karar)
+        try:
+            return await istek.update_datastore(baglam)
+        except Exception as e:  # pragma: no cover - pymodbus'un kendi işleyicisiyle aynı davranış
+            logging.error(f"İstek işlenemedi: {e}")
+            return ExceptionResponse(istek.function_code, ExceptionResponse.SLAVE_FAILURE)
+
+
+class CiftlikSunucusu(ModbusTcpServer):
+    """Tek port: çiftliğin o porttaki cihazlarını sunan Modbus TCP sunucusu"""
+
+    def __init__(self, ciftlik, port, adres=TEST_IP):
+        super().__init__(ModbusServerContext(slaves=ciftlik.baglamlar[port], single=False),
+                         address=(adres, port))
+        self.ciftlik = ciftlik
+        self.port = port
+        self.hat_kilidi = asyncio.Lock() if ciftlik.ayarlar.seri_hat else None
+        self.gorevler = set()
+
+    def callback_new_connection(self):
+        return _IstekIsleyici(self, None, None, None)
 
-# --- FIZIKSEL SIMULASYON MANTIGI ---
-def veri_uret():
-    global TOPLAM_URETIM_WH
-    
-    simdi = datetime.now()
-    
-    # --- YENİ ZAMAN ALGORİTMASI (6 DAKİKALIK DÖNGÜ) ---
-    # Hedef: Gerçek hayattaki 6 dakika (360 saniye) = Sanal 24 saat (1440 dakika)
-    DONGU_SURESI_SN = 360 
-    
-    # Şu anki zamanı saniye cinsinden alıp 360'a göre modunu alıyoruz.
-    # Bu bize 0 ile 359 arasında sürekli dönen bir sayaç verir.
-    toplam_saniye = simdi.minute * 60 + simdi.second
-    dongu_saniyesi = toplam_saniye % DONGU_SURESI_SN
-    
-    # Gerçek saniyeyi sanal dakikaya çevir (Oran: 1440 / 360 = 4)
-    # Yani gerçekte 1 saniye geçince, simülasyonda 4 dakika geçecek.
-    sanal_zaman = dongu_saniyesi * 4 
-    
-    # --- UZUN GÜNDÜZ AYARLARI ---
-    # Güneş 04:00 (240. dk) doğsun, 20:00 (1200. dk) batsın.
-    # Gündüz süresi 16 saat, Gece süresi 8 saat olur.
-    GUN_DOGUSU = 240  # 04:00
-    GUN_BATIMI = 1200 # 20:00
-    
-    gunes_faktoru = 0
-    
-    # Eğer sanal saat gündüz aralığındaysa
-    if GUN_DOGUSU < sanal_zaman < GUN_BATIMI:
-        # Sinüs dalgası oluştur (0'dan başla, 1'e çık, 0'a in)
-        radyan = math.pi * (sanal_zaman - GUN_DOGUSU) / (GUN_BATIMI - GUN_DOGUSU)
-        gunes_faktoru = math.sin(radyan)
-    
-    # Bulut etkisi (Ara sira gunes kapansin - %10 dalgalanma)
-    bulut = random.uniform(0.9, 1.0) 
-    
-    # --- DEGERLERI HESAPLA ---
-    
-    # GUC (Watt): Kapasite x Gunes x Bulut
-    anlik_guc_w = int(MAX_GUC_KAPASITESI * gunes_faktoru * bulut)
-    
-    # VOLTAJ (V): 220V etrafinda hafif oynar
-    voltaj = int(random.uniform(218, 235))
-    
-    # AKIM (A): Guc / Voltaj (P=V*I)
-    if voltaj > 0:
-        akim_x10 = int((anlik_guc_w / voltaj) * 10) 
-    else:
-        akim_x10 = 0
-        
-    # SICAKLIK (C): 
-    # Gece soğusun (15C), Gündüz ısınsın (Maks 55C)
-    if anlik_guc_w > 0:
-        sicaklik = 25 + int((anlik_guc_w / MAX_GUC_KAPASITESI) * 30)
-    else:
-        sicaklik = 15 # Gece ortam sıcaklığı
-    
-    # TOPLAM URETIM (Watt-Saat)
-    # Hızlı döngü olduğu için üretimi biraz abartarak ekleyelim ki sayaç dönsün
-    TOPLAM_URETIM_WH += anlik_guc_w / 1000 
-    
-    # Sanal Saati Hesapla (Ekrana yazdırmak için)
-    sanal_saat = int(sanal_zaman // 60)
-    sanal_dakika = int(sanal_zaman % 60)
-    
-    # Listeye sanal saati de ekleyelim (Log için)
-    return [voltaj, akim_x10, anlik_guc_w, int(TOPLAM_URETIM_WH), sicaklik, f"{sanal_saat:02}:{sanal_dakika:02}"]
 
 # --- MODBUS SUNUCU GOREVI ---
-async def veri_guncelleyici(context):
-    """Bu fonksiyon her saniye arkaplanda calisip inverter hafizasini gunceller"""
+async def veri_guncelleyici(ciftlik, sessiz=False):
+    """Her saniye arkaplanda calisip tüm cihazların hafizasini gunceller"""
+    onceki = Counter()
     while True:
-        veriler = veri_uret()
-        
-        # Inverter hafizasina (Holding Register) yaz
-        slave_id = 1
-        
-        # Modbus'a yazilacak sayisal veriler (Son eleman string oldugu icin onu almiyoruz)
-        modbus_verisi = veriler[:5]  # [voltaj, akim_x10, guc, toplam_uretim, sicaklik]
-        
-        store = context[slave_id]
-        
-        # Panel ayarlarına uygun register adresleri:
-        # Register 70: Güç (W)
-        # Register 71: Voltaj (V)
-        # Register 72: Akım (A x10)
-        # Register 73: Toplam Üretim (Wh)
-        # Register 74: Sıcaklık (°C)
-        store.setValues(3, 70, [modbus_verisi[2]])  # Güç
-        store.setValues(3, 71, [modbus_verisi[0]])  # Voltaj
-        store.setValues(3, 72, [modbus_verisi[1]])  # Akım
-        store.setValues(3, 73, [modbus_verisi[3]])  # Toplam Üretim
-        store.setValues(3, 74, [modbus_verisi[4]])  # Sıcaklık
-        
-        # Hata register'ları (2 register'lık 32-bit değer)
-        # Register 189-190: Hata Kodu 1 (0 = hata yok)
-        # Register 193-194: Hata Kodu 2 (0 = hata yok)
-        store.setValues(3, 189, [0, 0])  # Hata yok
-        store.setValues(3, 193, [0, 0])  # Hata yok
-        
-        # Log basalim (Sanal saati de gösterelim)
-        print(f"🕒 {veriler[5]} | ☀️  Guc: {veriler[2]} W | 🌡️  Isi: {veriler[4]} C | ⚡ {veriler[0]} V")
-        
+        baslangic = time.perf_counter()
+        degerler = ciftlik.adim()
+        sure_ms = (time.perf_counter() - baslangic) * 1000
+        if not sessiz:
+            sayac = ciftlik.sayaclar
+            aktif_ariza = int(np.count_nonzero(degerler['ariza_189'] | degerler['ariza_193']))
+            print(f"🕒 {degerler['sanal_saat']} | ☀️  Guc: {int(degerler['guc'].sum())} W "
+                  f"| 🌡️  Isi: {int(degerler['sicaklik'].max())} C | ⚡ {int(degerler['voltaj'][0])} V "
+                  f"| 📨 {sayac['istek'] - onceki['istek']} istek/sn "
+                  f"⏳ {sayac['zaman_asimi'] - onceki['zaman_asimi']} ⛔ {sayac['istisna'] - onceki['istisna']} "
+                  f"| 🚨 {aktif_ariza} arıza | {len(ciftlik.cihazlar)} cihaz {sure_ms:.1f} ms")
+            onceki = sayac.copy()
         await asyncio.sleep(1)
 
-async def sunucuyu_calistir():
-    # Hafiza olustur (200 register - hata kodları için yeterli)
-    store = ModbusSlaveContext(
-        hr=ModbusSequentialDataBlock(0, [0]*200)
-    )
-    context = ModbusServerContext(slaves=store, single=True)
 
-    print(f"✅ AKILLI INVERTER DEVREDE ({TEST_IP}:{TEST_PORT})")
+async def sunucuyu_calistir(ciftlik, adres=TEST_IP, sessiz=False):
+    sunucular = [CiftlikSunucusu(ciftlik, port, adres) for port in ciftlik.baglamlar]
+    ayarlar = ciftlik.ayarlar
+
+    print(f"✅ SANAL INVERTER ÇİFTLİĞİ DEVREDE: {len(sunucular)} port, {len(ciftlik.cihazlar)} cihaz ({adres})")
     print("⏳ DÖNGÜ: 6 Dakika (16 Saat Gündüz / 8 Saat Gece)")
+    if ayarlar.gecikme_max or ayarlar.zaman_asimi or ayarlar.istisna or ayarlar.alarm or ayarlar.yanitsiz:
+        print(f"🧪 Gecikme {ayarlar.gecikme_min:g}-{max(ayarlar.gecikme_max, ayarlar.gecikme_min):g} sn, "
+              f"zaman aşımı %{ayarlar.zaman_asimi * 100:g}, istisna %{ayarlar.istisna * 100:g} "
+              f"{[hex(kod) for kod in ayarlar.istisna_kodlari]}, alarm {ayarlar.alarm:g}/sn, "
+              f"yanıtsız {sorted(ayarlar.yanitsiz) or '-'}{', seri hat' if ayarlar.seri_hat else ''}")
+    if len(sunucular) > 1:
+        # Collector ayarlarına yapıştırılabilecek 'gecitler' değeri
+        gecitler = [{"ad": f"S{port}", "ip": adres, "port": port, "slave_ids": f"{min(ids)}-{max(ids)}"}
+                    for port, ids in ciftlik.baglamlar.items()]
+        print(f"🔧 gecitler: {json.dumps(gecitler)}")
     print("-" * 50)
 
     # Arka plan gorevini baslat (Veri uretimi)
-    task = asyncio.create_task(veri_guncelleyici(context))
-    
-    # Serveri baslat (Pymodbus 3.8.6 API)
-    await StartAsyncTcpServer(context=context, address=(TEST_IP, TEST_PORT))
+    ciftlik.adim()
+    guncelleyici = asyncio.create_task(veri_guncelleyici(ciftlik, sessiz))
+    try:
+        await asyncio.gather(*(sunucu.serve_forever() for sunucu in sunucular))
+    finally:
+        guncelleyici.cancel()
+
+
+def _liste_coz(metin, tip=int):
+    """'5020-5023,5030' gibi listeleri çözer"""
+    degerler = []
+    for parca in str(metin).split(','):
+        parca = parca.strip()
+        if not parca:
+            continue
+        if '-' in parca:
+            bas, bit = (tip(deger) for deger in parca.split('-', 1))
+            degerler.extend(range(bas, bit + 1))
+        else:
+            degerler.append(tip(parca))
+    return degerler
+
+
+def _aralik_coz(metin):
+    """'0.05' veya '0.02-0.2' -> (min, max)"""
+    parcalar = [float(deger) for deger in str(metin).split('-', 1)]
+    return parcalar[0], parcalar[-1]
+
+
+def argumanlari_coz(argumanlar=None):
+    ayristirici = argparse.ArgumentParser(description="Sanal inverter çiftliği (Modbus TCP)")
+    ayristirici.add_argument('--ip', default=TEST_IP)
+    ayristirici.add_argument('--portlar', default=str(TEST_PORT), help="Örn. 5020 veya 5020-5023")
+    ayristirici.add_argument('--cihaz', type=int, default=1, help="Port başına slave sayısı")
+    ayristirici.add_argument('--ilk-id', type=int, default=1)
+    ayristirici.add_argument('--gecikme', default='0', help="Yanıt gecikmesi sn (örn. 0.05 veya 0.02-0.2)")
+    ayristirici.add_argument('--zaman-asimi', type=float, default=0.0, help="İstek başına yanıtsız kalma olasılığı")
+    ayristirici.add_argument('--istisna', type=float, default=0.0, help="İstek başına istisna yanıtı olasılığı")
+    ayristirici.add_argument('--istisna-kodlari', default=','.join(str(kod) for kod in VARSAYILAN_ISTISNA_KODLARI))
+    ayristirici.add_argument('--alarm', type=float, default=0.0, help="Cihaz başına saniyelik yeni arıza olasılığı")
+    ayristirici.add_argument('--alarm-suresi', type=float, default=30.0, help="Ortalama arıza süresi (sn)")
+    ayristirici.add_argument('--yanitsiz', default='', help="Hiç yanıt vermeyen ID'ler (örn. 7,12-14)")
+    ayristirici.add_argument('--seri-hat', action='store_true', help="Port başına istekleri sırayla cevapla (RS485)")
+    ayristirici.add_argument('--tohum', type=int, default=None)
+    ayristirici.add_argument('--sessiz', action='store_true', help="Saniyelik durum satırını yazma")
+    args = ayristirici.parse_args(argumanlar)
+
+    yanitsiz, hatalar = utils.parse_id_list(args.yanitsiz) if args.yanitsiz.strip() else ([], [])
+    if hatalar:
+        ayristirici.error(f"Geçersiz --yanitsiz: {', '.join(hatalar)}")
+    gecikme_min, gecikme_max = _aralik_coz(args.gecikme)
+    ayarlar = ArizaAyarlari(
+        gecikme_min=gecikme_min, gecikme_max=gecikme_max,
+        zaman_asimi=args.zaman_asimi, istisna=args.istisna,
+        istisna_kodlari=tuple(_liste_coz(args.istisna_kodlari, lambda deger: int(deger, 0))),
+        alarm=args.alarm, alarm_suresi=args.alarm_suresi,
+        seri_hat=args.seri_hat, yanitsiz=frozenset(yanitsiz))
+    return args, ayarlar
+
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.ERROR)
+    # pymodbus her istisna yanıtını ERROR olarak loglar; üretilenler durum satırında sayılır
+    logging.getLogger("pymodbus").setLevel(logging.CRITICAL)
+    args, ayarlar = argumanlari_coz()
+    ciftlik = Ciftlik(_liste_coz(args.portlar), args.cihaz, args.ilk_id, ayarlar, args.tohum)
     try:
-        asyncio.run(sunucuyu_calistir())
+        asyncio.run(sunucuyu_calistir(ciftlik, args.ip, args.sessiz))
     except KeyboardInterrupt:
-        print("\nKapatildi.")
\ No newline at end of file
+        print("\nKapatildi.")
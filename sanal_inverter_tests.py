@@ -0,0 +1,65 @@
+import asyncio
+import unittest
+from datetime import datetime
+
+from pymodbus.client import AsyncModbusTcpClient
+
+import sanal_inverter
+
+
+class TestCiftlik(unittest.TestCase):
+    def test_profil_ve_ariza_registerleri(self):
+        ayarlar = sanal_inverter.ArizaAyarlari(alarm=1.0)
+        ciftlik = sanal_inverter.Ciftlik([15100, 15101], 3, ilk_id=5, ayarlar=ayarlar, tohum=3)
+        self.assertEqual([slave_id for _, slave_id in ciftlik.cihazlar], [5, 6, 7, 8, 9, 10])
+
+        degerler = ciftlik.adim(datetime(2026, 1, 1, 12, 2, 0))  # Sanal saat 08:00, gündüz
+        self.assertEqual(len(degerler['guc']), 6)
+        # alarm=1.0: her cihazda tam bir arıza biti, 189 arızası olanlar üretmez
+        for i, (port, slave_id) in enumerate(ciftlik.cihazlar):
+            a189, a193 = int(degerler['ariza_189'][i]), int(degerler['ariza_193'][i])
+            self.assertEqual(bin(a189).count('1') + bin(a193).count('1'), 1)
+            self.assertEqual(degerler['guc'][i] == 0, a189 != 0)
+            registerler = ciftlik.baglamlar[port][slave_id].getValues(3, 189, 5)
+            self.assertEqual(((registerler[0] << 16) | registerler[1], registerler[4]), (a189, a193))
+
+        with self.assertRaises(ValueError):
+            sanal_inverter.Ciftlik([1, 2], 124)
+
+
+class TestArizaEnjeksiyonu(unittest.TestCase):
+    def _oku(self, ayarlar, slave_ids):
+        async def calis():
+            ciftlik = sanal_inverter.Ciftlik([15110], 2, ayarlar=ayarlar, tohum=1)
+            ciftlik.adim()
+            sunucu = sanal_inverter.CiftlikSunucusu(ciftlik, 15110)
+            await sunucu.serve_forever(background=True)
+            client = AsyncModbusTcpClient("127.0.0.1", port=15110, timeout=0.3, retries=0)
+            await client.connect()
+            sonuclar = []
+            try:
+                for slave_id in slave_ids:
+                    try:
+                        rr = await client.read_holding_registers(address=70, count=5, slave=slave_id)
+                        sonuclar.append(rr.exception_code if rr.isError() else rr.registers)
+                    except Exception:
+                        sonuclar.append('zaman_asimi')
+            finally:
+                client.close()
+                await sunucu.shutdown()
+            return ciftlik, sonuclar
+        return asyncio.run(calis())
+
+    def test_yanitlar(self):
+        ayarlar = sanal_inverter.ArizaAyarlari(yanitsiz=frozenset({2}))
+        ciftlik, sonuclar = self._oku(ayarlar, [1, 2, 9])
+        self.assertEqual(sonuclar[0], ciftlik.baglamlar[15110][1].getValues(3, 70, 5))
+        self.assertEqual(sonuclar[1], 'zaman_asimi')
+        self.assertEqual(sonuclar[2], 0x0B)  # Gateway'de olmayan ID
+
+        _, sonuclar = self._oku(sanal_inverter.ArizaAyarlari(istisna=1.0, istisna_kodlari=(0x06,)), [1])
+        self.assertEqual(sonuclar, [0x06])
+
+
+if __name__ == '__main__':
+    unittest.main()
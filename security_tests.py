@@ -15,9 +15,11 @@ class TestSecurity(unittest.TestCase):
         veritabani.veri_ekle(1, {"guc":100, "voltaj":220, "akim":5, "sicaklik":40, "hata_kodu":0, "hata_kodu_193":0})
 
     def tearDown(self):
-        # Cleanup
-        if os.path.exists("test_security.db"):
-            os.remove("test_security.db")
+        # Cleanup (release pooled connections before deleting the files)
+        veritabani.baglantilari_kapat()
+        for yol in ("test_security.db", "test_security.db-wal", "test_security.db-shm"):
+            if os.path.exists(yol):
+                os.remove(yol)
         veritabani.DB_NAME = self.original_db
 
     def test_sql_injection_son_verileri_getir(self):
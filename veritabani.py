@@ -1,7 +1,19 @@
 import sqlite3
 import os
+import time
+import atexit
+import threading
+import weakref
+import functools
+import inspect
+import collections
 from datetime import datetime, timedelta
 
+import numpy as np
+
+import ornekleme
+import arsiv
+
 # --- VERİTABANI YOL AYARLARI ---
 # Docker içinde miyiz kontrolü (/app/data genellikle Docker volume yoludur)
 if os.path.exists("/app/data"):
@@ -12,205 +24,1515 @@ else:
         os.makedirs("data")
     DB_NAME = os.path.join("data", "solar_log.db")
 
-def init_db():
-    # Debug için yol bilgisini yazdıralım
-    print(f"📂 Veritabanı Bağlanıyor: {DB_NAME}")
+# --- BAĞLANTI KATMANI ---
+# Her thread kendi bağlantısını tekrar kullanır; pragmalar bağlantı açılırken bir kez ayarlanır.
+# WAL modunda okuyucular (panel) collector'ın yazmalarını, yazıcı da okuyucuları bloklamaz.
+BAGLANTI_PRAGMALARI = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",   # 256 MB
+    "PRAGMA cache_size=-16000",     # ~16 MB
+    "PRAGMA busy_timeout=5000",
+)
+
+_yerel = threading.local()
+_tum_baglantilar = []
+_tum_baglantilar_kilidi = threading.Lock()
+_havuz_nesli = 0  # baglantilari_kapat() her çağrıldığında artar, eski bağlantılar geçersiz olur
+
+def _dosya_kimligi():
+    try:
+        durum = os.stat(DB_NAME)
+        return (durum.st_dev, durum.st_ino)
+    except OSError:
+        return None
+
+def _baglanti_ac(salt_okunur):
+    if salt_okunur:
+        yol = os.path.abspath(DB_NAME).replace('\\', '/')
+        conn = sqlite3.connect(f"file:{yol}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(DB_NAME, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+    for pragma in BAGLANTI_PRAGMALARI:
+        conn.execute(pragma)
+    return conn
+
+def baglanti(salt_okunur=False):
+    """
+    Bu thread için havuzdaki bağlantıyı döndür (yoksa aç).
     
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    salt_okunur=True ise ayrı bir read-only bağlantı verilir (panel sayfaları için).
+    Veritabanı dosyası silinip yeniden oluşturulduysa bağlantı yenilenir.
+    Bağlantılar kapatılmamalıdır; yazma işlemleri `with conn:` ile commit edilir.
+    """
+    havuz = getattr(_yerel, 'baglantilar', None)
+    if havuz is None:
+        havuz = _yerel.baglantilar = {}
+    anahtar = (DB_NAME, salt_okunur)
+    kimlik = _dosya_kimligi()
+
+    kayit = havuz.get(anahtar)
+    if kayit is not None:
+        conn, eski_kimlik, nesil = kayit
+        if kimlik is not None and kimlik == eski_kimlik and nesil == _havuz_nesli:
+            return conn
+        del havuz[anahtar]
+        _baglantiyi_kapat(conn)
+
+    try:
+        conn = _baglanti_ac(salt_okunur)
+    except sqlite3.OperationalError:
+        if not salt_okunur:
+            raise
+        # Dosya henüz yoksa okuma için de yazma bağlantısı kullan
+        return baglanti(salt_okunur=False)
+
+    havuz[anahtar] = (conn, _dosya_kimligi(), _havuz_nesli)
+    with _tum_baglantilar_kilidi:
+        _tum_baglantilar.append((conn, salt_okunur))
+    return conn
+
+def _baglantiyi_kapat(conn):
+    with _tum_baglantilar_kilidi:
+        _tum_baglantilar[:] = [k for k in _tum_baglantilar if k[0] is not conn]
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+def baglantilari_kapat():
+    """
+    Tüm thread'lerin açık bağlantılarını kapat.
+    Read-only bağlantılar önce kapatılır; son kapanan yazma bağlantısı
+    WAL checkpoint yapıp -wal/-shm dosyalarını temizleyebilsin.
+    """
+    global _havuz_nesli
+    with _tum_baglantilar_kilidi:
+        _havuz_nesli += 1
+        baglantilar = sorted(_tum_baglantilar, key=lambda k: not k[1])
+        _tum_baglantilar.clear()
+    for conn, _ in baglantilar:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _yerel.baglantilar = {}
+
+atexit.register(baglantilari_kapat)
+
+# --- PAYLAŞILAN SORGU ÖNBELLEĞİ ---
+# Panel sayfalarının okuma fonksiyonları süreç genelinde tek bir önbellek kullanır; aynı
+# sorguyu soran tüm oturumlar (Streamlit'te her oturum ayrı thread) aynı sonucu paylaşır.
+# Sonuç, veritabanı değişmediği sürece geçerlidir: ayrı bir read-only bağlantının
+# PRAGMA data_version değeri başka bir bağlantı commit ettiğinde artar (süre tabanlı TTL yok).
+# Aynı anahtarı aynı anda isteyen oturumlardan sadece biri sorguyu çalıştırır.
+# Dönen sonuçlar paylaşıldığı için çağıran tarafından değiştirilmemelidir.
+
+ONBELLEK_BOYUTU = 256  # En fazla bu kadar sonuç tutulur (en eski kullanılan atılır)
+
+_onbellek = collections.OrderedDict()  # {anahtar: (veri_surumu, sonuc)}
+_onbellek_kilidi = threading.Lock()
+_hesaplama_kilitleri = {}
+_surum_baglantisi = None  # (conn, DB_NAME, dosya kimliği, havuz nesli)
+
+def veri_surumu():
+    """
+    Veritabanının değişiklik sürümü (herhangi bir bağlantı commit ettikçe değişir).
+    Veritabanı açılamıyorsa None döner.
+    """
+    global _surum_baglantisi
+    kimlik = _dosya_kimligi()
+    if kimlik is None:
+        return None
+    with _onbellek_kilidi:
+        kayit = _surum_baglantisi
+        if kayit is None or kayit[1:] != (DB_NAME, kimlik, _havuz_nesli):
+            if kayit is not None:
+                _baglantiyi_kapat(kayit[0])
+            try:
+                conn = _baglanti_ac(salt_okunur=True)
+            except sqlite3.Error:
+                _surum_baglantisi = None
+                return None
+            with _tum_baglantilar_kilidi:
+                _tum_baglantilar.append((conn, True))
+            kayit = _surum_baglantisi = (conn, DB_NAME, kimlik, _havuz_nesli)
+        try:
+            return kayit[1:] + (kayit[0].execute("PRAGMA data_version").fetchone()[0],)
+        except sqlite3.Error:
+            _surum_baglantisi = None
+            return None
+
+def _anahtar_parcasi(deger):
+    if isinstance(deger, (list, set, frozenset)):
+        return tuple(deger)
+    return deger
+
+def paylasilan_onbellek(fonk):
+    """Okuma fonksiyonunun sonucunu veri sürümü değişene kadar tüm thread'lerle paylaş"""
+    @functools.wraps(fonk)
+    def sarmalayici(*args, **kwargs):
+        surum = veri_surumu()
+        if surum is None:
+            return fonk(*args, **kwargs)
+        anahtar = (fonk.__name__, tuple(map(_anahtar_parcasi, args)),
+                   tuple(sorted((k, _anahtar_parcasi(v)) for k, v in kwargs.items())))
+        with _onbellek_kilidi:
+            kayit = _onbellek.get(anahtar)
+            if kayit is not None and kayit[0] == surum:
+                _onbellek.move_to_end(anahtar)
+                return kayit[1]
+            kilit = _hesaplama_kilitleri.setdefault(anahtar, threading.Lock())
+        
+        with kilit:
+            # Beklerken başka bir oturum aynı sürüm için hesaplamış olabilir
+            with _onbellek_kilidi:
+                kayit = _onbellek.get(anahtar)
+                if kayit is not None and kayit[0] == surum:
+                    return kayit[1]
+            sonuc = fonk(*args, **kwargs)
+            with _onbellek_kilidi:
+                _onbellek[anahtar] = (surum, sonuc)
+                _onbellek.move_to_end(anahtar)
+                while len(_onbellek) > ONBELLEK_BOYUTU:
+                    eski, _ = _onbellek.popitem(last=False)
+                    _hesaplama_kilitleri.pop(eski, None)
+        return sonuc
+    return sarmalayici
+
+def onbellek_istatistikleri():
+    """Önbellekteki sonuç sayısı (izleme/test için)"""
+    with _onbellek_kilidi:
+        return {'kayit': len(_onbellek), 'kapasite': ONBELLEK_BOYUTU}
+
+# --- ÖLÇÜM BÖLÜMLERİ (PARTITION) ---
+# Ölçümler aylık tablolarda tutulur: olcumler_YYYYMM. Hangi tablonun hangi zaman
+# aralığını kapsadığı olcum_bolumleri kataloğundadır. "olcumler" tüm bölümleri
+# birleştiren bir görünümdür; saklama süresi dolan bölüm DELETE + VACUUM yerine
+# tek DROP TABLE ile silinir.
+#
+# Bölümler kompakt şemadadır: zaman yerel saatin epoch milisaniyesi (INTEGER),
+# ölçüm değerleri DEGER_OLCEGI ile çarpılmış tamsayılardır. Tablolar (slave_id, zaman)
+# birincil anahtarı üzerinde kümelenmiş WITHOUT ROWID tablolardır; her insert ayrı
+# rowid ve ikincil index ağaçları yerine tek B-tree'ye yazar. "olcumler" görünümü
+# ve okuma fonksiyonları değerleri eski metin/ondalık biçimine çevirerek döndürür.
+OLCUM_SUTUNLARI = "slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193, toplam_uretim_wh"
+OLCEKLI_SUTUNLAR = ('guc', 'voltaj', 'akim', 'sicaklik', 'toplam_uretim_wh')
+DEGER_OLCEGI = 1000  # 0.001 çözünürlük (register çarpanları en fazla 0.001)
+_EPOCH = datetime(1970, 1, 1)
+_MS = timedelta(milliseconds=1)
+_SUTUN_ADLARI = [ad.strip() for ad in OLCUM_SUTUNLARI.split(",")]
+
+# Kompakt bölüm sütunlarını eski biçime çeviren SELECT listesi
+COZULMUS_SUTUNLAR = ", ".join(
+    "strftime('%Y-%m-%d %H:%M:%f', zaman / 1000.0, 'unixepoch') AS zaman" if ad == 'zaman'
+    else f"{ad} * 1.0 / {DEGER_OLCEGI} AS {ad}" if ad in OLCEKLI_SUTUNLAR
+    else ad
+    for ad in _SUTUN_ADLARI)
+
+# Eski biçimdeki (metin zaman, REAL değer) sütunları kompakt şemaya çeviren SELECT listesi
+KODLANMIS_SUTUNLAR = ", ".join(
+    "CAST(ROUND((julianday(zaman) - 2440587.5) * 86400000) AS INTEGER)" if ad == 'zaman'
+    else f"CAST(ROUND({ad} * {DEGER_OLCEGI}) AS INTEGER)" if ad in OLCEKLI_SUTUNLAR
+    else ad
+    for ad in _SUTUN_ADLARI)
+
+_bolumler_hazir = set()  # (DB_NAME, tablo) - bu süreçte varlığı doğrulanmış bölümler
+
+def _zaman_ms(zaman_str):
+    """'2026-10-17 12:00:00.123456' -> yerel saatin epoch milisaniyesi"""
+    return (datetime.fromisoformat(str(zaman_str)) - _EPOCH) // _MS
+
+def _olcekle(deger):
+    return None if deger is None else int(round(deger * DEGER_OLCEGI))
+
+def _kompakt_satir(satir):
+    """_olcum_satiri çıktısını bölüm tablosuna yazılacak tamsayı satırına çevirir"""
+    slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193, sayac = satir
+    return (slave_id, _zaman_ms(zaman), _olcekle(guc), _olcekle(voltaj), _olcekle(akim),
+            _olcekle(sicaklik), hata_kodu, hata_kodu_193, _olcekle(sayac))
+
+def _bolum_adi(zaman_str):
+    """'2026-10-17 12:00:00' -> 'olcumler_202610'"""
+    return f"olcumler_{int(zaman_str[0:4]):04d}{int(zaman_str[5:7]):02d}"
+
+def _ay_sinirlari(zaman_str):
+    yil, ay = int(zaman_str[0:4]), int(zaman_str[5:7])
+    sonraki_yil, sonraki_ay = (yil + 1, 1) if ay == 12 else (yil, ay + 1)
+    return (f"{yil:04d}-{ay:02d}-01 00:00:00", f"{sonraki_yil:04d}-{sonraki_ay:02d}-01 00:00:00")
+
+def _gorunumu_yenile(cursor):
+    """olcumler görünümünü katalogdaki bölümlerden yeniden oluştur"""
+    tablolar = [row[0] for row in cursor.execute("SELECT tablo FROM olcum_bolumleri ORDER BY baslangic")]
+    cursor.execute("DROP VIEW IF EXISTS olcumler")
+    if tablolar:
+        birlesim = " UNION ALL ".join(f"SELECT {COZULMUS_SUTUNLAR} FROM {t}" for t in tablolar)
+    else:
+        bos_sutunlar = ", ".join(f"NULL AS {ad}" for ad in _SUTUN_ADLARI)
+        birlesim = f"SELECT {bos_sutunlar} WHERE 0"
+    cursor.execute(f"CREATE VIEW olcumler AS {birlesim}")
+
+def _bolum_tablosu_olustur(cursor, tablo):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {tablo} (
+            slave_id INTEGER NOT NULL,
+            zaman INTEGER NOT NULL,
+            guc INTEGER,
+            voltaj INTEGER,
+            akim INTEGER,
+            sicaklik INTEGER,
+            hata_kodu INTEGER DEFAULT 0,
+            hata_kodu_193 INTEGER DEFAULT 0,
+            toplam_uretim_wh INTEGER,
+            PRIMARY KEY (slave_id, zaman)
+        ) WITHOUT ROWID
+    """)
+
+def _bolum_hazirla(cursor, zaman_str):
+    """Verilen zamanın ait olduğu aylık bölümü (yoksa) oluşturup adını döndür"""
+    tablo = _bolum_adi(zaman_str)
+    if (DB_NAME, tablo) in _bolumler_hazir:
+        return tablo
+    var_mi = cursor.execute("SELECT 1 FROM olcum_bolumleri WHERE tablo = ?", (tablo,)).fetchone()
+    if not var_mi:
+        _bolum_tablosu_olustur(cursor, tablo)
+        baslangic, bitis = _ay_sinirlari(zaman_str)
+        cursor.execute(
+            "INSERT INTO olcum_bolumleri (tablo, baslangic, bitis, kayit_sayisi) VALUES (?, ?, ?, 0)",
+            (tablo, baslangic, bitis))
+        _gorunumu_yenile(cursor)
+    _bolumler_hazir.add((DB_NAME, tablo))
+    return tablo
+
+def _eski_tabloyu_bolumle(cursor):
+    """Tek parça olcumler tablosundaki kayıtları aylık bölümlere kopyalayıp eski tabloyu kaldırır"""
+    aylar = [row[0] for row in cursor.execute(
+        "SELECT DISTINCT substr(zaman, 1, 7) FROM olcumler WHERE zaman IS NOT NULL")]
+    cursor.execute("ALTER TABLE olcumler RENAME TO olcumler_eski")
+    for ay in aylar:
+        baslangic, bitis = _ay_sinirlari(ay)
+        tablo = _bolum_hazirla(cursor, baslangic)
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO {tablo} ({OLCUM_SUTUNLARI})
+            SELECT {KODLANMIS_SUTUNLAR} FROM olcumler_eski WHERE zaman >= ? AND zaman < ?
+        """, (baslangic, bitis))
+        cursor.execute("UPDATE olcum_bolumleri SET kayit_sayisi = kayit_sayisi + ? WHERE tablo = ?",
+                       (cursor.rowcount, tablo))
+    cursor.execute("DROP TABLE olcumler_eski")
+    print(f"🗂️ Ölçümler {len(aylar)} aylık bölüme taşındı")
+
+def _bolumu_kompakt_yap(cursor, tablo):
+    """Eski (rowid + metin zaman + REAL) şemadaki bölümü kompakt şemaya yerinde çevirir"""
+    if 'toplam_uretim_wh' not in [row[1] for row in cursor.execute(f"PRAGMA table_info({tablo})")]:
+        cursor.execute(f"ALTER TABLE {tablo} ADD COLUMN toplam_uretim_wh REAL")
+    cursor.execute(f"ALTER TABLE {tablo} RENAME TO {tablo}_eski")
+    _bolum_tablosu_olustur(cursor, tablo)
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO {tablo} ({OLCUM_SUTUNLARI})
+        SELECT {KODLANMIS_SUTUNLAR} FROM {tablo}_eski WHERE zaman IS NOT NULL
+    """)
+    cursor.execute(f"DROP TABLE {tablo}_eski")
+    cursor.execute(f"UPDATE olcum_bolumleri SET kayit_sayisi = (SELECT COUNT(*) FROM {tablo}) WHERE tablo = ?",
+                   (tablo,))
+
+def _bolum_sorgusu(cursor, sutunlar, baslangic_str=None, bitis_str=None, kosul="1", parametreler=()):
+    """
+    Sadece [baslangic_str, bitis_str] aralığına değen bölümleri okuyan
+    UNION ALL alt sorgusu üretir.
     
-    # 1. Ölçümler Tablosu
+    kosul kompakt sütunlar (ms zaman) üzerinde çalışır; sutunlar çözülmüş
+    (metin zaman, ondalık değer) sütunlardan seçilir.
+    
+    Returns:
+        tuple: (sql, parametreler)
+    """
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS olcumler (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            slave_id INTEGER, 
+        SELECT tablo FROM olcum_bolumleri
+        WHERE (? IS NULL OR bitis > ?) AND (? IS NULL OR baslangic <= ?)
+        ORDER BY baslangic
+    """, (baslangic_str, baslangic_str, bitis_str, bitis_str))
+    tablolar = [row[0] for row in cursor.fetchall()]
+    if not tablolar:
+        return f"SELECT {sutunlar} FROM olcumler WHERE 0", ()
+    sql = " UNION ALL ".join(
+        f"SELECT {sutunlar} FROM (SELECT {COZULMUS_SUTUNLAR} FROM {t} WHERE {kosul})" for t in tablolar)
+    return sql, tuple(parametreler) * len(tablolar)
+
+def _aralik_sorgusu(cursor, sutunlar, baslangic_str, bitis_str, slave_id=None):
+    """Tarih aralığı (ve opsiyonel cihaz) filtresiyle bölüm alt sorgusu"""
+    kosul = "zaman BETWEEN ? AND ?"
+    parametreler = (_zaman_ms(baslangic_str), _zaman_ms(bitis_str))
+    if slave_id:
+        kosul += " AND slave_id = ?"
+        parametreler += (slave_id,)
+    return _bolum_sorgusu(cursor, sutunlar, baslangic_str, bitis_str, kosul, parametreler)
+
+# --- ÖZET (ROLLUP) TABLOLARI ---
+# Her örnek yazılırken aynı transaction içinde dakika/saat/gün kovalarına eklenir.
+# Kova anahtarı zaman metninin önekidir: gün 'YYYY-MM-DD', saat 'YYYY-MM-DD HH',
+# dakika 'YYYY-MM-DD HH:MM'. Raporlar ham ölçümler yerine bu tablolardan okunur.
+OZET_TABLOLARI = (
+    ('ozet_gun', 10),
+    ('ozet_saat', 13),
+    ('ozet_dakika', 16),
+)
+OZET_ALANLARI = ('guc', 'voltaj', 'akim', 'sicaklik')
+
+# Enerji: her örnek, aynı cihazın bir önceki örneğinden bu yana üretilen Wh'i kovasına ekler.
+# İki örnekte de toplam üretim sayacı (register 73) varsa ve geri gitmediyse sayaç farkı,
+# yoksa gerçek zaman damgalarıyla trapez integrali (P1+P2)/2 * dt kullanılır.
+# Bu süreden uzun boşluklar kesinti sayılır, trapez ile doldurulmaz (panelin en uzun
+# toplama aralığı 1 saattir).
+ENTEGRASYON_MAX_ARALIK_SN = 3900
+
+def _ozet_tablosu_olustur(cursor, tablo):
+    alan_sutunlari = ",\n".join(
+        f"            {alan}_toplam REAL, {alan}_min REAL, {alan}_max REAL" for alan in OZET_ALANLARI)
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {tablo} (
+            slave_id INTEGER NOT NULL,
+            kova TEXT NOT NULL,
+            sayi INTEGER NOT NULL,
+{alan_sutunlari},
+            hata_189_sayisi INTEGER DEFAULT 0,
+            hata_193_sayisi INTEGER DEFAULT 0,
+            enerji_wh REAL DEFAULT 0,
+            sure_sn REAL DEFAULT 0,
+            sayac_sayisi INTEGER DEFAULT 0,
+            PRIMARY KEY (slave_id, kova)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{tablo}_kova ON {tablo}(kova)")
+
+def _enerji_hesapla(onceki, satir):
+    """
+    onceki ve satir: (slave_id, zaman, guc, ..., toplam_uretim_wh) ölçüm satırları
+    
+    Returns:
+        tuple: (enerji_wh, sure_sn, sayac_kullanildi)
+    """
+    if onceki is None:
+        return 0.0, 0.0, 0
+    dt = (datetime.fromisoformat(satir[1]) - datetime.fromisoformat(onceki[1])).total_seconds()
+    sure = dt if 0 < dt <= ENTEGRASYON_MAX_ARALIK_SN else 0.0
+    sayac, onceki_sayac = satir[8], onceki[8]
+    if dt > 0 and sayac is not None and onceki_sayac is not None and sayac >= onceki_sayac:
+        return sayac - onceki_sayac, sure, 1
+    if sure:
+        return (satir[2] + onceki[2]) / 2.0 * sure / 3600.0, sure, 0
+    return 0.0, 0.0, 0
+
+def _ozet_guncelle(cursor, satirlar, onceki_satirlar):
+    """
+    Yazılan ölçüm satırlarını (bkz. _olcum_satiri) özet kovalarına ekler.
+    onceki_satirlar: {slave_id: partiden önceki son ölçüm satırı} (enerji için)
+    """
+    enerjiler = []
+    onceki = dict(onceki_satirlar)
+    for satir in sorted(satirlar, key=lambda r: (r[0], r[1])):
+        enerjiler.append((satir, _enerji_hesapla(onceki.get(satir[0]), satir)))
+        onceki[satir[0]] = satir
+
+    for tablo, uzunluk in OZET_TABLOLARI:
+        kovalar = {}
+        for satir, (enerji, sure, sayac) in enerjiler:
+            slave_id, zaman, degerler, hk_189, hk_193 = satir[0], satir[1], satir[2:6], satir[6], satir[7]
+            anahtar = (slave_id, zaman[:uzunluk])
+            kova = kovalar.get(anahtar)
+            if kova is None:
+                kova = kovalar[anahtar] = [0, [0.0] * 4, list(degerler), list(degerler), 0, 0, 0.0, 0.0, 0]
+            kova[0] += 1
+            for i, deger in enumerate(degerler):
+                kova[1][i] += deger
+                kova[2][i] = min(kova[2][i], deger)
+                kova[3][i] = max(kova[3][i], deger)
+            kova[4] += 1 if hk_189 else 0
+            kova[5] += 1 if hk_193 else 0
+            kova[6] += enerji
+            kova[7] += sure
+            kova[8] += sayac
+
+        sutunlar = ", ".join(f"{a}_toplam, {a}_min, {a}_max" for a in OZET_ALANLARI)
+        guncelleme = ", ".join(
+            f"{a}_toplam = {a}_toplam + excluded.{a}_toplam, "
+            f"{a}_min = MIN({a}_min, excluded.{a}_min), "
+            f"{a}_max = MAX({a}_max, excluded.{a}_max)" for a in OZET_ALANLARI)
+        cursor.executemany(f"""
+            INSERT INTO {tablo} (slave_id, kova, sayi, {sutunlar}, hata_189_sayisi, hata_193_sayisi,
+                                 enerji_wh, sure_sn, sayac_sayisi)
+            VALUES ({", ".join("?" * (3 + 3 * len(OZET_ALANLARI) + 5))})
+            ON CONFLICT(slave_id, kova) DO UPDATE SET
+                sayi = sayi + excluded.sayi, {guncelleme},
+                hata_189_sayisi = hata_189_sayisi + excluded.hata_189_sayisi,
+                hata_193_sayisi = hata_193_sayisi + excluded.hata_193_sayisi,
+                enerji_wh = enerji_wh + excluded.enerji_wh,
+                sure_sn = sure_sn + excluded.sure_sn,
+                sayac_sayisi = sayac_sayisi + excluded.sayac_sayisi
+        """, [
+            (slave_id, kova_adi, kova[0],
+             *[v for i in range(len(OZET_ALANLARI)) for v in (kova[1][i], kova[2][i], kova[3][i])],
+             kova[4], kova[5], kova[6], kova[7], kova[8])
+            for (slave_id, kova_adi), kova in kovalar.items()
+        ])
+
+def _ozet_doldur(cursor, tablo, uzunluk):
+    """Özet tablosunu mevcut ham ölçümlerden (enerji dahil) yeniden doldurur"""
+    sutunlar = ", ".join(f"{a}_toplam, {a}_min, {a}_max" for a in OZET_ALANLARI)
+    hesaplar = ", ".join(f"SUM({a}), MIN({a}), MAX({a})" for a in OZET_ALANLARI)
+    sayac_gecerli = ("dt > 0 AND toplam_uretim_wh IS NOT NULL AND onceki_sayac IS NOT NULL "
+                     "AND toplam_uretim_wh >= onceki_sayac")
+    aralik_gecerli = f"dt > 0 AND dt <= {ENTEGRASYON_MAX_ARALIK_SN}"
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO {tablo} (slave_id, kova, sayi, {sutunlar}, hata_189_sayisi, hata_193_sayisi,
+                                        enerji_wh, sure_sn, sayac_sayisi)
+        SELECT slave_id, substr(zaman, 1, {uzunluk}), COUNT(*), {hesaplar},
+               SUM(CASE WHEN hata_kodu > 0 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN hata_kodu_193 > 0 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN {sayac_gecerli} THEN toplam_uretim_wh - onceki_sayac
+                        WHEN {aralik_gecerli} THEN (guc + onceki_guc) / 2.0 * dt / 3600.0
+                        ELSE 0 END),
+               SUM(CASE WHEN {aralik_gecerli} THEN dt ELSE 0 END),
+               SUM(CASE WHEN {sayac_gecerli} THEN 1 ELSE 0 END)
+        FROM (
+            SELECT *, (julianday(zaman) - julianday(onceki_zaman)) * 86400.0 AS dt
+            FROM (
+                SELECT {OLCUM_SUTUNLARI},
+                       LAG(zaman) OVER w AS onceki_zaman,
+                       LAG(guc) OVER w AS onceki_guc,
+                       LAG(toplam_uretim_wh) OVER w AS onceki_sayac
+                FROM olcumler WHERE zaman IS NOT NULL
+                WINDOW w AS (PARTITION BY slave_id ORDER BY zaman)
+            )
+        )
+        GROUP BY slave_id, substr(zaman, 1, {uzunluk})
+    """)
+
+def _ozet_kaynagi(baslangic_str, bitis_str):
+    """
+    [baslangic_str, bitis_str) aralığını tam kapsayan en kaba özet tablosunu seçer.
+    
+    Returns:
+        tuple: (tablo, kova_baslangic, kova_bitis) veya hizalı tablo yoksa None
+    """
+    for tablo, uzunluk in OZET_TABLOLARI:
+        sifir = "0000-00-00 00:00:00"[uzunluk:]
+        if baslangic_str[uzunluk:19] == sifir and bitis_str[uzunluk:19] == sifir:
+            return tablo, baslangic_str[:uzunluk], bitis_str[:uzunluk]
+    return None
+
+def _gun_araligi(baslangic, bitis):
+    """'YYYY-MM-DD' tarihlerini [baslangic 00:00, bitis+1 00:00) aralığına çevirir"""
+    bitis_ertesi = datetime.strptime(str(bitis), '%Y-%m-%d') + timedelta(days=1)
+    return f"{baslangic} 00:00:00", bitis_ertesi.strftime('%Y-%m-%d %H:%M:%S')
+
+def _ozet_sorgusu(baslangic, bitis, slave_id=None):
+    """Gün aralığı için özet tablosu FROM/WHERE parçası ve parametreleri"""
+    tablo, kova_bas, kova_bit = _ozet_kaynagi(*_gun_araligi(baslangic, bitis))
+    kosul = "kova >= ? AND kova < ?"
+    parametreler = (kova_bas, kova_bit)
+    if slave_id:
+        kosul += " AND slave_id = ?"
+        parametreler += (slave_id,)
+    return f"{tablo} WHERE {kosul}", parametreler
+
+# --- ŞEMA GÖÇLERİ ---
+# Şema, sürümü schema_version tablosuna kaydedilen sıralı göç adımlarıyla kurulur.
+# init_db eksik adımları bir kez uygular; aynı süreçteki sonraki çağrılar bellekte biter.
+# Her adım, sürüm satırıyla birlikte kendi IMMEDIATE transaction'ında commit edilir
+# (aynı anda başlayan collector ve panel bir adımı iki kez çalıştırmaz). Adımlar
+# idempotenttir; bu sistemden önce kurulmuş veritabanları da baştan geçer.
+# Büyük veride uzun sürecek adımlar generator olarak yazılır: her yield'de commit edilip
+# yazma kilidi bırakılır (collector araya girebilir). Yarıda kalan adım tekrar
+# çalıştırıldığında biten parçaları atlar. Adım True döndürürse sonunda VACUUM yapılır.
+#
+# Yeni şema değişikliği = GOCLER'in sonuna yeni adım (mevcut adımlar değiştirilmez).
+# Sütun eklemek için _sutun_ekle (ALTER TABLE ADD COLUMN tabloyu yeniden yazmaz),
+# her bölümde index/dönüşüm için _bolumlerde kullanılır.
+
+def _sutun_ekle(cursor, tablo, sutun, tanim):
+    """Sütun yoksa ekler. Varsayılan değer sabit olmalı (SQLite tabloyu yeniden yazmaz)."""
+    if sutun in [row[1] for row in cursor.execute(f"PRAGMA table_info({tablo})")]:
+        return False
+    cursor.execute(f"ALTER TABLE {tablo} ADD COLUMN {sutun} {tanim}")
+    return True
+
+def _bolumlerde(cursor, islem):
+    """
+    islem(cursor, tablo) fonksiyonunu her ölçüm bölümünde çalıştıran göç generator'ı.
+    İşlenen her bölümden sonra commit edilir; islem, bölüm zaten işlenmişse hiçbir şey
+    yapmadan False döndürmeli.
+    
+    Returns:
+        list: işlenen bölümler (yield from ile alınır)
+    """
+    islenenler = []
+    for (tablo,) in cursor.execute("SELECT tablo FROM olcum_bolumleri ORDER BY baslangic").fetchall():
+        if islem(cursor, tablo):
+            islenenler.append(tablo)
+            yield tablo
+    return islenenler
+
+def _tablo_var_mi(cursor, tablo):
+    return cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tablo,)).fetchone() is not None
+
+def _goc_temel_tablolar(cursor):
+    # Ölçümler: aylık bölüm tabloları + bölüm kataloğu + "olcumler" görünümü
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS olcum_bolumleri (
+            tablo TEXT PRIMARY KEY,
+            baslangic TEXT NOT NULL,
+            bitis TEXT NOT NULL,
+            kayit_sayisi INTEGER DEFAULT 0
+        )
+    """)
+
+    # Ayarlar Tablosu
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ayarlar (
+            anahtar TEXT PRIMARY KEY,
+            deger TEXT,
+            aciklama TEXT,
+            guncelleme_zamani TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # Eski ayarlar tablosunda olmayan kolonlar
+    _sutun_ekle(cursor, "ayarlar", "aciklama", "TEXT")
+    _sutun_ekle(cursor, "ayarlar", "guncelleme_zamani", "TIMESTAMP")
+
+    # Ayar sürüm sayacı (ayarlari_yaz her değişiklikte artırır)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ayar_surumu (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            surum INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO ayar_surumu (id, surum) VALUES (1, 0)")
+
+def _goc_bolumlu_olcumler(cursor):
+    # Tek parça eski olcumler tablosu varsa aylık bölümlere taşı (tek transaction)
+    eski_tablo = _tablo_var_mi(cursor, 'olcumler')
+    if eski_tablo:
+        _sutun_ekle(cursor, "olcumler", "hata_kodu_193", "INTEGER DEFAULT 0")
+        _sutun_ekle(cursor, "olcumler", "toplam_uretim_wh", "REAL")
+        _eski_tabloyu_bolumle(cursor)
+        yield 'olcumler'
+
+    # Eski şemadaki (id + metin zaman) bölümleri kompakt şemaya çevir (bölüm başına commit)
+    def kompakt_yap(cursor, tablo):
+        if 'id' not in [row[1] for row in cursor.execute(f"PRAGMA table_info({tablo})")]:
+            return False
+        cursor.execute("DROP VIEW IF EXISTS olcumler")
+        _bolumu_kompakt_yap(cursor, tablo)
+        _gorunumu_yenile(cursor)
+        return True
+    eski_bolumler = yield from _bolumlerde(cursor, kompakt_yap)
+    if eski_bolumler:
+        print(f"🗜️ {len(eski_bolumler)} ölçüm bölümü kompakt şemaya çevrildi")
+
+    # Şema dönüşümünden boşalan sayfaları dosyadan at
+    return bool(eski_tablo or eski_bolumler)
+
+def _goc_ozet_tablolari(cursor):
+    # Özet tabloları (yeni oluşturuluyorsa mevcut ölçümlerden doldur); tablo başına commit
+    for tablo, uzunluk in OZET_TABLOLARI:
+        yeni = not _tablo_var_mi(cursor, tablo)
+        _ozet_tablosu_olustur(cursor, tablo)
+        # Enerji kolonları yoksa ekleyip özeti ham veriden yeniden hesapla
+        if _sutun_ekle(cursor, tablo, "enerji_wh", "REAL DEFAULT 0"):
+            _sutun_ekle(cursor, tablo, "sure_sn", "REAL DEFAULT 0")
+            _sutun_ekle(cursor, tablo, "sayac_sayisi", "INTEGER DEFAULT 0")
+            cursor.execute(f"DELETE FROM {tablo}")
+            yeni = True
+        if yeni and cursor.execute("SELECT COUNT(*) FROM olcum_bolumleri").fetchone()[0]:
+            _ozet_doldur(cursor, tablo, uzunluk)
+        yield tablo
+
+def _goc_son_durum(cursor):
+    # Cihaz başına son örnek (filo durumu için GROUP BY taraması yerine)
+    yeni = not _tablo_var_mi(cursor, 'son_durum')
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS son_durum (
+            slave_id INTEGER PRIMARY KEY,
             zaman TIMESTAMP,
             guc REAL,
             voltaj REAL,
             akim REAL,
             sicaklik REAL,
             hata_kodu INTEGER DEFAULT 0,
-            hata_kodu_193 INTEGER DEFAULT 0
+            hata_kodu_193 INTEGER DEFAULT 0,
+            toplam_uretim_wh REAL
         )
     """)
-    
-    # Index oluştur (sorgu performansı için)
+    _sutun_ekle(cursor, "son_durum", "toplam_uretim_wh", "REAL")
+    if yeni and cursor.execute("SELECT COUNT(*) FROM olcum_bolumleri").fetchone()[0]:
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO son_durum ({OLCUM_SUTUNLARI})
+            SELECT {OLCUM_SUTUNLARI} FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY slave_id ORDER BY zaman DESC) AS sira
+                FROM olcumler WHERE zaman IS NOT NULL
+            ) WHERE sira = 1
+        """)
+
+def _goc_cihaz_sagligi(cursor):
+    # Collector'ın cihaz sağlık durumu (devre kesici), panelde gösterilir
     cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_slave_zaman 
-        ON olcumler(slave_id, zaman DESC)
+        CREATE TABLE IF NOT EXISTS cihaz_sagligi (
+            slave_id INTEGER PRIMARY KEY,
+            durum TEXT NOT NULL,
+            ardisik_hata INTEGER DEFAULT 0,
+            son_hata TEXT,
+            son_basari TIMESTAMP,
+            sonraki_deneme TIMESTAMP,
+            guncelleme_zamani TIMESTAMP
+        )
     """)
-    
+
+def _goc_arsiv_durumu(cursor):
+    # Parquet arşivine taşınmış verinin üst sınırı (bu zamandan eski ölçümler arşivde)
     cursor.execute("""
-        CREATE INDEX IF NOT EXISTS idx_zaman 
-        ON olcumler(zaman DESC)
+        CREATE TABLE IF NOT EXISTS arsiv_durumu (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            sinir_ms INTEGER
+        )
     """)
+    cursor.execute("INSERT OR IGNORE INTO arsiv_durumu (id, sinir_ms) VALUES (1, NULL)")
 
-    # 2. Ayarlar Tablosu
+def _goc_ariza_olaylari(cursor):
+    # Arıza kodu sözlüğü (register bit -> mesaj) ve başlangıç/bitiş aralıkları
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS ayarlar (
-            anahtar TEXT PRIMARY KEY,
-            deger TEXT,
-            aciklama TEXT,
-            guncelleme_zamani TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        CREATE TABLE IF NOT EXISTS ariza_kodlari (
+            register INTEGER NOT NULL,
+            bit INTEGER NOT NULL,
+            mesaj TEXT NOT NULL,
+            seviye TEXT NOT NULL DEFAULT 'hata',
+            PRIMARY KEY (register, bit)
+        ) WITHOUT ROWID
+    """)
+    cursor.executemany("INSERT OR IGNORE INTO ariza_kodlari (register, bit, mesaj, seviye) VALUES (?, ?, ?, ?)",
+                       VARSAYILAN_ARIZA_KODLARI)
+    _goc_ariza_kodu_surumu(cursor)  # Aşağıdaki doldurma çözme tablosunu kullanır
+    yeni = not _tablo_var_mi(cursor, 'ariza_olaylari')
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ariza_olaylari (
+            id INTEGER PRIMARY KEY,
+            slave_id INTEGER NOT NULL,
+            register INTEGER NOT NULL,
+            bit INTEGER NOT NULL,
+            mesaj TEXT,
+            seviye TEXT,
+            baslangic TIMESTAMP NOT NULL,
+            bitis TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ariza_olaylari_baslangic ON ariza_olaylari(baslangic)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ariza_olaylari_cihaz ON ariza_olaylari(slave_id, baslangic)")
+    # Bir arızanın aynı anda tek açık kaydı olur (aktif arızalar da bu index'ten okunur)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_ariza_olaylari_aktif
+        ON ariza_olaylari(slave_id, register, bit) WHERE bitis IS NULL
+    """)
+    if yeni:
+        # Geçmiş ölçümler taranmaz; son durumdaki aktif arızalar açık olay olarak başlar
+        _ariza_olaylarini_guncelle(cursor, [
+            (row[0], row[1], None, None, None, None, row[2], row[3], None)
+            for row in cursor.execute("SELECT slave_id, zaman, hata_kodu, hata_kodu_193 FROM son_durum")
+        ], {})
+
+def _goc_bolum_cihazlari(cursor):
+    # Bölüm x cihaz kayıt sayacı ve zaman aralığı (istatistikler için görünüm taraması yerine);
+    # mevcut bölümler bir kez taranır, bölüm başına commit
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bolum_cihazlari (
+            tablo TEXT NOT NULL,
+            slave_id INTEGER NOT NULL,
+            kayit_sayisi INTEGER NOT NULL DEFAULT 0,
+            ilk_ms INTEGER,
+            son_ms INTEGER,
+            PRIMARY KEY (tablo, slave_id)
+        ) WITHOUT ROWID
+    """)
+    def say(cursor, tablo):
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO bolum_cihazlari (tablo, slave_id, kayit_sayisi, ilk_ms, son_ms)
+            SELECT ?, slave_id, COUNT(*), MIN(zaman), MAX(zaman) FROM {tablo} GROUP BY slave_id
+        """, (tablo,))
+        return True
+    yield from _bolumlerde(cursor, say)
+
+def _goc_ariza_kodu_surumu(cursor):
+    # Arıza sözlüğünün kendi sürüm sayacı (sözlük değişikliği ayar sürümünü, dolayısıyla
+    # collector yapılandırmasını etkilemez)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ariza_kodu_surumu (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            surum INTEGER NOT NULL
         )
     """)
+    cursor.execute("INSERT OR IGNORE INTO ariza_kodu_surumu (id, surum) VALUES (1, 0)")
+
+def _goc_isi_adresi(cursor):
+    # Eski varsayılan isi_addr=73 aslında toplam üretim sayacını gösteriyordu
+    # (collector sıcaklığı her zaman 74'ten okuyordu), ayarlardan okunmaya başlandığı için düzelt
+    cursor.execute("UPDATE ayarlar SET deger = '74' WHERE anahtar = 'isi_addr' AND deger = '73'")
+
+# (sürüm, ad, adım) - sıra ve numaralar değiştirilmez, yeni adımlar sona eklenir
+GOCLER = (
+    (1, 'temel_tablolar', _goc_temel_tablolar),
+    (2, 'bolumlu_kompakt_olcumler', _goc_bolumlu_olcumler),
+    (3, 'ozet_tablolari', _goc_ozet_tablolari),
+    (4, 'son_durum', _goc_son_durum),
+    (5, 'cihaz_sagligi', _goc_cihaz_sagligi),
+    (6, 'arsiv_durumu', _goc_arsiv_durumu),
+    (7, 'ariza_olaylari', _goc_ariza_olaylari),
+    (8, 'bolum_cihazlari', _goc_bolum_cihazlari),
+    (9, 'ariza_kodu_surumu', _goc_ariza_kodu_surumu),
+    (10, 'isi_adresi_duzeltmesi', _goc_isi_adresi),
+)
+
+VARSAYILAN_AYARLAR = (
+    ('refresh_rate', '2', 'Veri çekme sıklığı (saniye)'),
+    ('guc_scale', '1.0', 'Güç çarpanı'),
+    ('volt_scale', '0.1', 'Voltaj çarpanı'),
+    ('akim_scale', '0.1', 'Akım çarpanı'),
+    ('isi_scale', '1.0', 'Sıcaklık çarpanı'),
+    ('guc_addr', '70', 'Güç register adresi'),
+    ('volt_addr', '71', 'Voltaj register adresi'),
+    ('akim_addr', '72', 'Akım register adresi'),
+    ('isi_addr', '74', 'Sıcaklık register adresi'),
+    ('target_ip', '10.35.14.10', 'Modbus IP adresi'),
+    ('target_port', '502', 'Modbus Port'),
+    ('slave_ids', '1,2,3', 'İnverter ID listesi'),
+    ('veri_saklama_gun', '365', 'Veri saklama süresi (gün) - 0: Sınırsız'),
+    ('eszamanli_istek', '4', 'Gateway başına eşzamanlı Modbus istek sayısı'),
+    ('okuma_bosluk', '16', 'Tek istekte birleştirilecek register boşluk toleransı'),
+    ('uretim_addr', '73', 'Toplam üretim sayacı register adresi (Wh) - boş: sayaç yok'),
+    ('uretim_count', '1', 'Toplam üretim sayacı register sayısı (1: 16-bit, 2: 32-bit)'),
+    ('uretim_scale', '1.0', 'Toplam üretim sayacı çarpanı (Wh)'),
+    ('alarm_periyot', '10', 'Alarm register okuma periyodu (saniye)'),
+    ('enerji_periyot', '60', 'Toplam üretim sayacı okuma periyodu (saniye)'),
+    ('cihaz_periyotlari', '', 'Cihaz bazlı periyotlar (JSON, örn: {"5": {"olcum": 10}})'),
+    ('gecitler', '', 'Geçit topolojisi (JSON liste) - boş: target_ip/target_port/slave_ids'),
+)
 
-    # MIGRATION: Eski ayarlar tablosuna yeni kolonlar ekle
+def sema_surumu(cursor=None):
+    """Veritabanına uygulanmış son göç sürümü (göç tablosu yoksa 0)"""
+    cursor = cursor or baglanti(salt_okunur=True).cursor()
     try:
-        ayarlar_sutunlar = [row[1] for row in cursor.execute("PRAGMA table_info(ayarlar)")]
-        if 'aciklama' not in ayarlar_sutunlar:
-            cursor.execute("ALTER TABLE ayarlar ADD COLUMN aciklama TEXT")
-        if 'guncelleme_zamani' not in ayarlar_sutunlar:
-            cursor.execute("ALTER TABLE ayarlar ADD COLUMN guncelleme_zamani TIMESTAMP DEFAULT CURRENT_TIMESTAMP")
-    except:
-        pass
+        return cursor.execute("SELECT COALESCE(MAX(surum), 0) FROM schema_version").fetchone()[0]
+    except sqlite3.OperationalError:
+        return 0
 
-    # 3. Varsayılan Ayarları Ekle
-    varsayilan_ayarlar = [
-        ('refresh_rate', '2', 'Veri çekme sıklığı (saniye)'),
-        ('guc_scale', '1.0', 'Güç çarpanı'),
-        ('volt_scale', '0.1', 'Voltaj çarpanı'),
-        ('akim_scale', '0.1', 'Akım çarpanı'),
-        ('isi_scale', '1.0', 'Sıcaklık çarpanı'),
-        ('guc_addr', '70', 'Güç register adresi'),
-        ('volt_addr', '71', 'Voltaj register adresi'),
-        ('akim_addr', '72', 'Akım register adresi'),
-        ('isi_addr', '73', 'Sıcaklık register adresi'),
-        ('target_ip', '10.35.14.10', 'Modbus IP adresi'),
-        ('target_port', '502', 'Modbus Port'),
-        ('slave_ids', '1,2,3', 'İnverter ID listesi'),
-        ('veri_saklama_gun', '365', 'Veri saklama süresi (gün) - 0: Sınırsız')
-    ]
-    
-    for anahtar, deger, aciklama in varsayilan_ayarlar:
-        try:
-            cursor.execute("""
-                INSERT OR IGNORE INTO ayarlar (anahtar, deger, aciklama)
-                VALUES (?, ?, ?)
-            """, (anahtar, deger, aciklama))
-        except:
-            cursor.execute("""
-                INSERT OR IGNORE INTO ayarlar (anahtar, deger)
-                VALUES (?, ?)
-            """, (anahtar, deger))
+def _gocleri_uygula(conn):
+    """
+    Eksik göç adımlarını sırayla uygular.
     
-    # MIGRATION: hata_kodu_193 kolonu yoksa ekle
-    try:
-        mevcut_sutunlar = [row[1] for row in cursor.execute("PRAGMA table_info(olcumler)")]
-        if 'hata_kodu_193' not in mevcut_sutunlar:
-            cursor.execute("ALTER TABLE olcumler ADD COLUMN hata_kodu_193 INTEGER DEFAULT 0")
-    except:
-        pass
+    Returns:
+        bool: VACUUM gerekiyorsa True
+    """
+    if sema_surumu(conn.cursor()) >= GOCLER[-1][0]:
+        return False
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            surum INTEGER PRIMARY KEY,
+            ad TEXT NOT NULL,
+            uygulama_zamani TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    vacuum = False
+    for surum, ad, adim in GOCLER:
+        # Sürüm, yazma kilidi alındıktan sonra tekrar kontrol edilir (başka süreç uygulamış olabilir)
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            if cursor.execute("SELECT 1 FROM schema_version WHERE surum = ?", (surum,)).fetchone():
+                conn.commit()
+                continue
+            baslangic = time.monotonic()
+            sonuc = adim(cursor)
+            if inspect.isgenerator(sonuc):
+                while True:
+                    try:
+                        next(sonuc)
+                    except StopIteration as bitti:
+                        sonuc = bitti.value
+                        break
+                    conn.commit()
+                    cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("INSERT INTO schema_version (surum, ad) VALUES (?, ?)", (surum, ad))
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        vacuum = vacuum or bool(sonuc)
+        print(f"🧱 Şema göçü {surum} ({ad}) uygulandı ({time.monotonic() - baslangic:.1f} sn)")
+    return vacuum
+
+def _varsayilan_ayarlari_ekle(cursor):
+    """Veritabanında olmayan varsayılan ayarları ekler (hepsi varsa yazma yapılmaz)"""
+    mevcut = {row[0] for row in cursor.execute("SELECT anahtar FROM ayarlar")}
+    eksikler = [ayar for ayar in VARSAYILAN_AYARLAR if ayar[0] not in mevcut]
+    if eksikler:
+        cursor.executemany("INSERT OR IGNORE INTO ayarlar (anahtar, deger, aciklama) VALUES (?, ?, ?)", eksikler)
+        cursor.execute("UPDATE ayar_surumu SET surum = surum + 1 WHERE id = 1")
+
+_hazir_veritabanlari = set()  # (DB_NAME, dosya kimliği, havuz nesli) - bu süreçte hazırlanmış
+_hazirlik_kilidi = threading.Lock()
+
+def init_db():
+    """
+    Veritabanını kullanıma hazırlar: eksik şema göçleri, yeni varsayılan ayarlar ve bu
+    ayın bölümü. Süreç başına bir kez çalışır; aynı dosya için sonraki çağrılar (panelin
+    her yeniden çalıştırması dahil) veritabanına gitmeden döner. Dosya yeniden
+    oluşturulduysa veya baglantilari_kapat() çağrıldıysa tekrar kontrol edilir.
+    """
+    if (DB_NAME, _dosya_kimligi(), _havuz_nesli) in _hazir_veritabanlari:
+        return
+    with _hazirlik_kilidi:
+        if (DB_NAME, _dosya_kimligi(), _havuz_nesli) in _hazir_veritabanlari:
+            return
+        # Debug için yol bilgisini yazdıralım
+        print(f"📂 Veritabanı Bağlanıyor: {DB_NAME}")
+        
+        conn = baglanti()
+        vacuum = _gocleri_uygula(conn)
+        
+        with conn:
+            cursor = conn.cursor()
+            _varsayilan_ayarlari_ekle(cursor)
+            # Bu ayın bölümü her zaman var (görünüm boş kalmasın)
+            _bolumler_hazir.difference_update([k for k in _bolumler_hazir if k[0] == DB_NAME])
+            _bolum_hazirla(cursor, datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f'))
         
-    conn.commit()
-    conn.close()
+        if vacuum:
+            conn.execute("VACUUM")
+        _hazir_veritabanlari.add((DB_NAME, _dosya_kimligi(), _havuz_nesli))
+
+# --- AYARLAR ---
+# ayar_surumu tablosundaki sayaç her ayar değişikliğinde (tek transaction içinde) artar.
+# Okuyucular ayarları thread başına önbellekte tutar; PRAGMA data_version değişmediyse
+# veritabanına hiç gidilmez, değiştiyse sadece sürüm satırı okunur. Tablo ancak sürüm
+# farklıysa yeniden okunur.
+
+def _ayar_onbellegi():
+    """Geçerliliği doğrulanmış (surum, ayarlar) çiftini döndür"""
+    conn = baglanti(salt_okunur=True)
+    veri_surumu = conn.execute("PRAGMA data_version").fetchone()[0]
+    onbellek = getattr(_yerel, 'ayarlar', None)
+    if onbellek is not None and onbellek[0] == DB_NAME and onbellek[1] is conn:
+        if onbellek[2] == veri_surumu:
+            return onbellek[3], onbellek[4]
+        surum = conn.execute("SELECT surum FROM ayar_surumu WHERE id = 1").fetchone()[0]
+        if surum == onbellek[3]:
+            _yerel.ayarlar = onbellek[:2] + (veri_surumu,) + onbellek[3:]
+            return onbellek[3], onbellek[4]
+
+    # Sürüm ve ayarlar tek sorguda (aynı anlık görüntüden) okunur
+    satirlar = conn.execute("""
+        SELECT s.surum, a.anahtar, a.deger
+        FROM ayar_surumu s LEFT JOIN ayarlar a
+        WHERE s.id = 1
+    """).fetchall()
+    surum = satirlar[0][0]
+    ayarlar = {row[1]: row[2] for row in satirlar if row[1] is not None}
+    _yerel.ayarlar = (DB_NAME, conn, veri_surumu, surum, ayarlar)
+    return surum, ayarlar
+
+def ayar_surumu():
+    """Ayarların güncel sürüm numarası (değişiklik kontrolü için, genelde önbellekten)"""
+    try:
+        return _ayar_onbellegi()[0]
+    except Exception as e:
+        print(f"⚠️ Ayar sürümü okuma hatası: {e}")
+        return 0
 
 def ayar_oku(anahtar, varsayilan=None):
     """Veritabanından ayar oku"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute('SELECT deger FROM ayarlar WHERE anahtar = ?', (anahtar,))
-        sonuc = cursor.fetchone()
-        conn.close()
-        if sonuc:
-            return sonuc[0]
-        return varsayilan
+        return _ayar_onbellegi()[1].get(anahtar, varsayilan)
     except Exception as e:
         print(f"⚠️ Ayar okuma hatası ({anahtar}): {e}")
         return varsayilan
 
-def ayar_yaz(anahtar, deger):
-    """Veritabanına ayar yaz"""
+def ayarlari_yaz(ayarlar):
+    """
+    Birden fazla ayarı tek transaction içinde yaz.
+    Değer gerçekten değiştiyse ayar sürümü bir kez artırılır; okuyucular
+    (collector) ya eski ya yeni ayar setinin tamamını görür.
+    
+    Args:
+        ayarlar: {anahtar: deger} sözlüğü
+    """
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO ayarlar (anahtar, deger, guncelleme_zamani)
-            VALUES (?, ?, CURRENT_TIMESTAMP)
-        """, (anahtar, str(deger)))
-        conn.commit()
-        conn.close()
+        conn = baglanti()
+        with conn:
+            onceki = conn.total_changes
+            conn.executemany("""
+                INSERT INTO ayarlar (anahtar, deger, guncelleme_zamani)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(anahtar) DO UPDATE SET
+                    deger = excluded.deger, guncelleme_zamani = excluded.guncelleme_zamani
+                WHERE deger IS NOT excluded.deger
+            """, [(anahtar, str(deger)) for anahtar, deger in ayarlar.items()])
+            if conn.total_changes != onceki:
+                conn.execute("UPDATE ayar_surumu SET surum = surum + 1 WHERE id = 1")
         return True
     except Exception as e:
-        print(f"⚠️ Ayar yazma hatası ({anahtar}): {e}")
+        print(f"⚠️ Ayar yazma hatası ({', '.join(map(str, ayarlar))}): {e}")
         return False
 
+def ayar_yaz(anahtar, deger):
+    """Veritabanına ayar yaz"""
+    return ayarlari_yaz({anahtar: deger})
+
 def tum_ayarlari_oku():
     """Tüm ayarları dict olarak döndür"""
     try:
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute('SELECT anahtar, deger FROM ayarlar')
-        ayarlar = {row[0]: row[1] for row in cursor.fetchall()}
-        conn.close()
-        return ayarlar
+        return dict(_ayar_onbellegi()[1])
     except:
         return {
             'refresh_rate': '2', 'guc_scale': '1.0', 'volt_scale': '0.1',
             'akim_scale': '0.1', 'isi_scale': '1.0', 'guc_addr': '70',
-            'volt_addr': '71', 'akim_addr': '72', 'isi_addr': '73',
+            'volt_addr': '71', 'akim_addr': '72', 'isi_addr': '74',
             'target_ip': '10.35.14.10', 'target_port': '502', 'slave_ids': '1,2,3',
-            'veri_saklama_gun': '365'
+            'veri_saklama_gun': '365', 'eszamanli_istek': '4', 'okuma_bosluk': '16',
+            'uretim_addr': '73', 'uretim_count': '1', 'uretim_scale': '1.0',
+            'alarm_periyot': '10', 'enerji_periyot': '60', 'cihaz_periyotlari': '',
+            'gecitler': ''
         }
 
+def _olcum_satiri(slave_id, zaman, data):
+    return (slave_id, zaman, data['guc'], data['voltaj'], data['akim'], data['sicaklik'],
+            data.get('hata_kodu', 0), data.get('hata_kodu_193', 0), data.get('toplam_uretim_wh'))
+
+def _son_durumu_guncelle(cursor, satirlar):
+    """Her cihazın partideki en yeni örneğini (bkz. _olcum_satiri) son_durum tablosuna yazar"""
+    en_yeniler = {}
+    for satir in satirlar:
+        if satir[0] not in en_yeniler or satir[1] >= en_yeniler[satir[0]][1]:
+            en_yeniler[satir[0]] = satir
+    cursor.executemany(f"""
+        INSERT INTO son_durum ({OLCUM_SUTUNLARI})
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(slave_id) DO UPDATE SET
+            zaman = excluded.zaman, guc = excluded.guc, voltaj = excluded.voltaj,
+            akim = excluded.akim, sicaklik = excluded.sicaklik,
+            hata_kodu = excluded.hata_kodu, hata_kodu_193 = excluded.hata_kodu_193,
+            toplam_uretim_wh = excluded.toplam_uretim_wh
+        WHERE excluded.zaman >= son_durum.zaman
+    """, list(en_yeniler.values()))
+
+def veri_ekle_toplu(kayitlar):
+    """
+    Birden fazla ölçümü tek transaction içinde yazar (tek fsync).
+    
+    Aynı (slave_id, zaman) anahtarıyla zaten yazılmış örnekler (tekrar denenen parti,
+    yaz saati geri alınırken tekrarlanan saat, kapanışta kuyruğun ikinci kez boşaltılması)
+    yok sayılır; bölüm sayaçlarına, özetlere, enerjiye ve arıza olaylarına sadece
+    gerçekten eklenen satırlar işlenir.
+    
+    Args:
+        kayitlar: [(slave_id, zaman_str, data dict), ...]
+    
+    Returns:
+        int: eklenen satır sayısı
+    """
+    if not kayitlar:
+        return 0
+    tum_satirlar = [_olcum_satiri(slave_id, zaman, data) for slave_id, zaman, data in kayitlar]
+    bolum_satirlari = {}
+    for satir in tum_satirlar:
+        bolum_satirlari.setdefault(_bolum_adi(satir[1]), []).append(satir)
+
+    conn = baglanti()
+    with conn:
+        cursor = conn.cursor()
+        # Enerji entegrasyonu için her cihazın partiden önceki son örneği
+        cihazlar = sorted({satir[0] for satir in tum_satirlar})
+        cursor.execute(f"""
+            SELECT {OLCUM_SUTUNLARI} FROM son_durum
+            WHERE slave_id IN ({", ".join("?" * len(cihazlar))})
+        """, cihazlar)
+        onceki_satirlar = {row[0]: row for row in cursor.fetchall()}
+
+        eklenenler = []
+        for satirlar in bolum_satirlari.values():
+            tablo = _bolum_hazirla(cursor, satirlar[0][1])
+            ekle = f"INSERT OR IGNORE INTO {tablo} ({OLCUM_SUTUNLARI}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            bolum_eklenen, cihaz_sayaclari = 0, {}
+            for satir in satirlar:
+                kompakt = _kompakt_satir(satir)
+                cursor.execute(ekle, kompakt)
+                if cursor.rowcount > 0:
+                    eklenenler.append(satir)
+                    bolum_eklenen += 1
+                    sayi, ilk_ms, son_ms = cihaz_sayaclari.get(satir[0], (0, kompakt[1], kompakt[1]))
+                    cihaz_sayaclari[satir[0]] = (sayi + 1, min(ilk_ms, kompakt[1]), max(son_ms, kompakt[1]))
+            if bolum_eklenen:
+                cursor.execute("UPDATE olcum_bolumleri SET kayit_sayisi = kayit_sayisi + ? WHERE tablo = ?",
+                               (bolum_eklenen, tablo))
+                cursor.executemany("""
+                    INSERT INTO bolum_cihazlari (tablo, slave_id, kayit_sayisi, ilk_ms, son_ms)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(tablo, slave_id) DO UPDATE SET
+                        kayit_sayisi = kayit_sayisi + excluded.kayit_sayisi,
+                        ilk_ms = MIN(ilk_ms, excluded.ilk_ms),
+                        son_ms = MAX(son_ms, excluded.son_ms)
+                """, [(tablo, slave_id) + sayac for slave_id, sayac in cihaz_sayaclari.items()])
+        if eklenenler:
+            _ozet_guncelle(cursor, eklenenler, onceki_satirlar)
+            _ariza_olaylarini_guncelle(cursor, eklenenler, onceki_satirlar)
+            _son_durumu_guncelle(cursor, eklenenler)
+    return len(eklenenler)
+
 def veri_ekle(slave_id, data):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
     simdi = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
-    hk_189 = data.get('hata_kodu', 0)
-    hk_193 = data.get('hata_kodu_193', 0)
-    cursor.execute("""
-        INSERT INTO olcumler (slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (slave_id, simdi, data['guc'], data['voltaj'], data['akim'], data['sicaklik'], hk_189, hk_193))
-    conn.commit()
-    conn.close()
+    veri_ekle_toplu([(slave_id, simdi, data)])
+
+# Program kapanırken bekleyen örnekler kaybolmasın: tek atexit kancası yaşayan tüm
+# tamponları boşaltır (tampon başına kayıt, atılan tamponları kapanışa kadar tutardı)
+_tamponlar = weakref.WeakSet()
+
+def _tamponlari_bosalt():
+    for tampon in list(_tamponlar):
+        tampon.bosalt()
+
+atexit.register(_tamponlari_bosalt)
+
+class VeriTamponu:
+    """
+    Write-behind ölçüm tamponu.
+    Örnekler bellekte toplanır; boyut/süre eşiği aşılınca, alarm geldiğinde
+    (alarmda_bosalt=True) veya bosalt() çağrılınca tek transaction ile yazılır.
+    Zaman damgası ekle() anında alınır, yazma gecikmesi ölçüm zamanını değiştirmez.
+    
+    Veritabanı yazılamıyorsa (kilit, disk) örnekler bellekte bekler ve kendiliğinden
+    boşaltma katlanarak artan aralıklarla denenir; bekleyen örnekler max_bekleyen'i
+    aşarsa en eskiler atılır. Veri hatası veren parti ikiye bölünerek yazılır, tek
+    bozuk kayıt atlanır ve sonraki yazmaları engellemez.
+    """
+    ILK_BEKLEME = 1.0       # saniye: ilk hatadan sonra kendiliğinden deneme aralığı
+    MAX_BEKLEME = 60.0      # saniye: deneme aralığının üst sınırı
+
+    def __init__(self, max_kayit=500, max_sure=10.0, alarmda_bosalt=True, max_bekleyen=100000):
+        self.max_kayit = max_kayit
+        self.max_sure = max_sure
+        self.alarmda_bosalt = alarmda_bosalt
+        self.max_bekleyen = max_bekleyen
+        self.atilan = 0  # Yazılamadan atılan örnek sayısı (taşma + bozuk kayıt)
+        self._kayitlar = []
+        self._ilk_kayit_zamani = None
+        self._ardisik_hata = 0
+        self._sonraki_deneme = 0.0
+        self._tasma_bildirildi = False
+        self._kilit = threading.Lock()
+        _tamponlar.add(self)
 
+    def __len__(self):
+        return len(self._kayitlar)
+
+    def ekle(self, slave_id, data, zaman=None):
+        """zaman verilmezse şimdiki zaman kullanılır (başka süreçte okunan örnekler için verilir)"""
+        if zaman is None:
+            zaman = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+        with self._kilit:
+            if not self._kayitlar:
+                self._ilk_kayit_zamani = time.monotonic()
+            self._kayitlar.append((slave_id, zaman, data))
+            simdi = time.monotonic()
+            dolu = (len(self._kayitlar) >= self.max_kayit or
+                    simdi - self._ilk_kayit_zamani >= self.max_sure)
+            denenebilir = simdi >= self._sonraki_deneme
+        alarm = data.get('hata_kodu', 0) != 0 or data.get('hata_kodu_193', 0) != 0
+        if denenebilir and (dolu or (alarm and self.alarmda_bosalt)):
+            self.bosalt()
+
+    def vadesi_geldiyse_bosalt(self):
+        """İlk bekleyen örnek max_sure'den eskiyse yaz (yeni örnek gelmese de)"""
+        simdi = time.monotonic()
+        if (self._kayitlar and simdi - self._ilk_kayit_zamani >= self.max_sure
+                and simdi >= self._sonraki_deneme):
+            return self.bosalt()
+        return 0
+
+    def bosalt(self):
+        """Bekleyen tüm örnekleri yaz; yazılan kayıt sayısını döndür"""
+        with self._kilit:
+            kayitlar, self._kayitlar = self._kayitlar, []
+            if not kayitlar:
+                return 0
+            try:
+                yazilan = self._yaz(kayitlar)
+            except sqlite3.OperationalError as e:
+                # Yazılamayanlar geri alınır (bölünmüş partinin yazılmış yarısı tekrar
+                # yazılırsa veri_ekle_toplu aynı anahtarları yok sayar)
+                self._ardisik_hata += 1
+                bekleme = min(self.MAX_BEKLEME, self.ILK_BEKLEME * 2 ** (self._ardisik_hata - 1))
+                self._ilk_kayit_zamani = time.monotonic()
+                self._sonraki_deneme = self._ilk_kayit_zamani + bekleme
+                self._kayitlar = kayitlar
+                fazla = len(kayitlar) - self.max_bekleyen
+                if fazla > 0:
+                    del self._kayitlar[:fazla]
+                    if not self._tasma_bildirildi:
+                        print(f"⚠️ Yazma tamponu doldu, en eski örnekler atılıyor (en fazla {self.max_bekleyen} kayıt bekler)")
+                        self._tasma_bildirildi = True
+                    self.atilan += fazla
+                print(f"⚠️ Toplu yazma hatası ({len(self._kayitlar)} kayıt bekliyor, "
+                      f"{bekleme:.0f} sn sonra tekrar denenecek): {e}")
+                return 0
+            self._ardisik_hata = 0
+            self._sonraki_deneme = 0.0
+            self._tasma_bildirildi = False
+            return yazilan
+
+    def _yaz(self, kayitlar):
+        """Veri hatası veren partiyi ikiye bölerek yazar; veritabanı hataları çağırana iletilir"""
+        try:
+            return veri_ekle_toplu(kayitlar)
+        except sqlite3.OperationalError:
+            raise
+        except Exception as e:
+            if len(kayitlar) == 1:
+                slave_id, zaman, _ = kayitlar[0]
+                print(f"⚠️ Yazılamayan örnek atlandı (ID {slave_id}, {zaman}): {e}")
+                self.atilan += 1
+                return 0
+            orta = len(kayitlar) // 2
+            return self._yaz(kayitlar[:orta]) + self._yaz(kayitlar[orta:])
+
+@paylasilan_onbellek
 def son_verileri_getir(slave_id, limit=100):
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
-        FROM olcumler WHERE slave_id = ?
-        ORDER BY zaman DESC LIMIT ?
-    """, (slave_id, limit))
-    rows = cursor.fetchall()
-    conn.close()
+    cursor = baglanti(salt_okunur=True).cursor()
+    # En yeni bölümden geriye doğru, limit dolana kadar oku
+    tablolar = [row[0] for row in cursor.execute(
+        "SELECT tablo FROM olcum_bolumleri ORDER BY baslangic DESC")]
+    rows = []
+    for tablo in tablolar:
+        cursor.execute(f"""
+            SELECT zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193 FROM (
+                SELECT {COZULMUS_SUTUNLAR} FROM {tablo} WHERE slave_id = ?
+                ORDER BY {tablo}.zaman DESC LIMIT ?
+            )
+        """, (slave_id, limit - len(rows)))
+        rows.extend(cursor.fetchall())
+        if len(rows) >= limit:
+            break
     return rows[::-1]
 
+def yeni_verileri_getir(slave_id, imlec=None, limit=100):
+    """
+    Canlı grafikler için artımlı okuma: zamanı `imlec`ten büyük ölçümler (en fazla son `limit`).
+    Sadece imleçten sonraki bölümler okunur ve (slave_id, zaman) anahtarında imleçten
+    başlanır; maliyet pencere boyutuna değil gelen yeni örnek sayısına bağlıdır.
+    Her oturumun imleci farklı olduğundan paylaşılan önbelleğe alınmaz.
+    
+    Args:
+        imlec: istemcinin elindeki son zaman metni; None ise son `limit` örnek döner
+    
+    Returns:
+        tuple: (satirlar, yeni_imlec) - satırlar son_verileri_getir biçiminde, eskiden yeniye;
+               yeni örnek yoksa imleç değişmez
+    """
+    if imlec is None:
+        rows = son_verileri_getir(slave_id, limit)
+        return rows, (rows[-1][0] if rows else None)
+    cursor = baglanti(salt_okunur=True).cursor()
+    imlec_ms = _zaman_ms(imlec)
+    tablolar = [row[0] for row in cursor.execute(
+        "SELECT tablo FROM olcum_bolumleri WHERE bitis > ? ORDER BY baslangic DESC", (str(imlec)[:19],))]
+    rows = []
+    for tablo in tablolar:
+        cursor.execute(f"""
+            SELECT zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193 FROM (
+                SELECT {COZULMUS_SUTUNLAR} FROM {tablo} WHERE slave_id = ? AND zaman > ?
+                ORDER BY {tablo}.zaman DESC LIMIT ?
+            )
+        """, (slave_id, imlec_ms, limit - len(rows)))
+        rows.extend(cursor.fetchall())
+        if len(rows) >= limit:
+            break
+    return rows[::-1], (rows[0][0] if rows else imlec)
+
+@paylasilan_onbellek
 def tum_cihazlarin_son_durumu():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    """Her cihazın son örneği (son_durum tablosundan, cihaz sayısı kadar satır)"""
+    cursor = baglanti(salt_okunur=True).cursor()
     cursor.execute("""
-        SELECT slave_id, MAX(zaman) as son_zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
-        FROM olcumler GROUP BY slave_id ORDER BY slave_id ASC
+        SELECT slave_id, zaman as son_zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193
+        FROM son_durum ORDER BY slave_id ASC
     """)
     rows = cursor.fetchall()
-    conn.close()
     return rows
 
+def cihaz_sagligini_yaz(kayitlar):
+    """
+    Durumu değişen cihazların sağlık bilgisini yaz.
+    
+    Args:
+        kayitlar: [(slave_id, durum, ardisik_hata, son_hata, son_basari, sonraki_deneme_sn), ...]
+                  (bkz. cihaz_sagligi.CihazSagligi.degisenleri_al)
+    """
+    simdi = datetime.now()
+    try:
+        conn = baglanti()
+        with conn:
+            conn.executemany("""
+                INSERT OR REPLACE INTO cihaz_sagligi
+                    (slave_id, durum, ardisik_hata, son_hata, son_basari, sonraki_deneme, guncelleme_zamani)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (slave_id, durum, ardisik_hata, son_hata, son_basari,
+                 (simdi + timedelta(seconds=kalan)).strftime('%Y-%m-%d %H:%M:%S') if kalan is not None else None,
+                 simdi.strftime('%Y-%m-%d %H:%M:%S'))
+                for slave_id, durum, ardisik_hata, son_hata, son_basari, kalan in kayitlar
+            ])
+        return True
+    except Exception as e:
+        print(f"⚠️ Cihaz sağlığı yazma hatası: {e}")
+        return False
+
+@paylasilan_onbellek
+def cihaz_sagligini_getir():
+    """{slave_id: (durum, ardisik_hata, son_hata, son_basari, sonraki_deneme)} - kaydı olmayan cihaz sağlıklıdır"""
+    try:
+        cursor = baglanti(salt_okunur=True).cursor()
+        cursor.execute("""
+            SELECT slave_id, durum, ardisik_hata, son_hata, son_basari, sonraki_deneme
+            FROM cihaz_sagligi
+        """)
+        return {row[0]: row[1:] for row in cursor.fetchall()}
+    except Exception as e:
+        print(f"⚠️ Cihaz sağlığı okuma hatası: {e}")
+        return {}
+
+# --- ARIZA OLAYLARI ---
+# Yazma sırasında her örneğin arıza bit maskeleri cihazın önceki örneğiyle karşılaştırılır;
+# değişen bitler ariza_olaylari tablosuna başlangıç (yeni satır) ve bitiş (bitis alanı)
+# olarak yazılır. Bitler bayt tablosuyla, mesajlar sözlükten bir kez kurulan register
+# tablolarıyla çözülür. Alarm sayfası ham ölçümleri hiç taramaz.
+ARIZA_REGISTERLERI = ((189, 6), (193, 7))  # (register, _olcum_satiri içindeki sütun)
+ARIZA_BIT_SAYISI = 32
+
+VARSAYILAN_ARIZA_KODLARI = (
+    [(189, bit, f"DC Overcurrent Fault [{bit // 2 + 1}-{bit % 2 + 1}]", 'hata') for bit in range(24)] +
+    [(193, bit, f"PV Overvoltage[{bit + 1}]", 'uyari') for bit in range(12)]
+)
+
+# Her bayt değeri için set olan bit numaraları
+_BAYT_BITLERI = tuple(tuple(bit for bit in range(8) if deger >> bit & 1) for deger in range(256))
+
+_ariza_tablolari = {}  # DB_NAME -> (sözlük sürümü, {register: [(mesaj, seviye)] * ARIZA_BIT_SAYISI})
+
+def _bitler(maske):
+    """Maskede set olan bit numaraları (küçükten büyüğe)"""
+    bitler, kaydirma = [], 0
+    while maske:
+        bitler.extend(kaydirma + bit for bit in _BAYT_BITLERI[maske & 0xFF])
+        maske >>= 8
+        kaydirma += 8
+    return bitler
+
+def _ariza_tablosu(cursor):
+    """Sözlükten kurulan çözme tablosu; sözlük sürümü değişince yeniden kurulur"""
+    surum = cursor.execute("SELECT surum FROM ariza_kodu_surumu WHERE id = 1").fetchone()[0]
+    onbellek = _ariza_tablolari.get(DB_NAME)
+    if onbellek is not None and onbellek[0] == surum:
+        return onbellek[1]
+    tablo = {register: [(f"Bilinmeyen Hata (Bit {bit})", 'hata') for bit in range(ARIZA_BIT_SAYISI)]
+             for register, _ in ARIZA_REGISTERLERI}
+    for register, bit, mesaj, seviye in cursor.execute("SELECT register, bit, mesaj, seviye FROM ariza_kodlari"):
+        if register in tablo and 0 <= bit < ARIZA_BIT_SAYISI:
+            tablo[register][bit] = (mesaj, seviye)
+    _ariza_tablolari[DB_NAME] = (surum, tablo)
+    return tablo
+
+def _ariza_olaylarini_guncelle(cursor, satirlar, onceki_satirlar):
+    """
+    Maskesi önceki örnekten farklı olan örnekler için arıza başlangıç/bitiş olaylarını yazar.
+    onceki_satirlar: {slave_id: partiden önceki son ölçüm satırı}; geç gelen örnekler atlanır.
+    """
+    durumlar = {slave_id: (row[1], row[6] or 0, row[7] or 0) for slave_id, row in onceki_satirlar.items()}
+    olaylar = []
+    for satir in sorted(satirlar, key=lambda r: (r[0], r[1])):
+        slave_id, zaman = satir[0], satir[1]
+        onceki = durumlar.get(slave_id, (None, 0, 0))
+        if onceki[0] is not None and zaman < onceki[0]:
+            continue
+        maskeler = tuple(satir[sutun] or 0 for _, sutun in ARIZA_REGISTERLERI)
+        if maskeler != onceki[1:]:
+            for (register, _), eski, yeni in zip(ARIZA_REGISTERLERI, onceki[1:], maskeler):
+                olaylar.extend((False, slave_id, register, bit, zaman[:23]) for bit in _bitler(eski & ~yeni))
+                olaylar.extend((True, slave_id, register, bit, zaman[:23]) for bit in _bitler(yeni & ~eski))
+        durumlar[slave_id] = (zaman,) + maskeler
+    if not olaylar:
+        return
+
+    tablo = _ariza_tablosu(cursor)
+    for basladi, slave_id, register, bit, zaman in olaylar:
+        if basladi:
+            mesaj, seviye = tablo[register][bit] if bit < ARIZA_BIT_SAYISI else (f"Bilinmeyen Hata (Bit {bit})", 'hata')
+            cursor.execute("""
+                INSERT OR IGNORE INTO ariza_olaylari (slave_id, register, bit, mesaj, seviye, baslangic)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (slave_id, register, bit, mesaj, seviye, zaman))
+        else:
+            cursor.execute("""
+                UPDATE ariza_olaylari SET bitis = ?
+                WHERE slave_id = ? AND register = ? AND bit = ? AND bitis IS NULL
+            """, (zaman, slave_id, register, bit))
+
+@paylasilan_onbellek
+def aktif_arizalar():
+    """
+    Bitmemiş arıza olayları (açık olay index'inden)
+    
+    Returns:
+        list: [(slave_id, register, bit, mesaj, seviye, baslangic), ...]
+    """
+    cursor = baglanti(salt_okunur=True).cursor()
+    return cursor.execute("""
+        SELECT slave_id, register, bit, mesaj, seviye, baslangic FROM ariza_olaylari
+        WHERE bitis IS NULL ORDER BY slave_id, register, bit
+    """).fetchall()
+
+@paylasilan_onbellek
+def ariza_gecmisi(baslangic, bitis, slave_id=None, limit=1000):
+    """
+    [baslangic, bitis] aralığıyla kesişen arıza olayları, en yeni başlayan önce.
+    Bitmemiş olayların bitis değeri None'dır.
+    
+    Returns:
+        list: [(slave_id, register, bit, mesaj, seviye, baslangic, bitis), ...]
+    """
+    baslangic_str, bitis_str = str(baslangic), str(bitis)
+    if len(bitis_str) == 10:
+        bitis_str += " 23:59:59.999"
+    kosul, parametreler = "", ()
+    if slave_id is not None:
+        kosul, parametreler = "AND slave_id = ?", (slave_id,)
+    cursor = baglanti(salt_okunur=True).cursor()
+    return cursor.execute(f"""
+        SELECT slave_id, register, bit, mesaj, seviye, baslangic, bitis FROM ariza_olaylari
+        WHERE baslangic <= ? AND (bitis IS NULL OR bitis >= ?) {kosul}
+        ORDER BY baslangic DESC LIMIT ?
+    """, (bitis_str, baslangic_str) + parametreler + (limit,)).fetchall()
+
+def ariza_kodlarini_getir():
+    """Arıza kodu sözlüğü: [(register, bit, mesaj, seviye), ...]"""
+    cursor = baglanti(salt_okunur=True).cursor()
+    return cursor.execute("SELECT register, bit, mesaj, seviye FROM ariza_kodlari ORDER BY register, bit").fetchall()
+
+def ariza_kodlarini_yaz(kodlar):
+    """
+    Sözlüğü tamamen değiştirir; sözlük sürümünü artırarak yazıcının çözme tablosunu yeniletir
+    (ayar sürümü değişmez, collector yeniden yapılandırılmaz). Mevcut olayların mesajları değişmez, yeni olaylar yeni mesajla yazılır.
+    
+    Args:
+        kodlar: [(register, bit, mesaj, seviye), ...]
+    """
+    try:
+        conn = baglanti()
+        with conn:
+            conn.execute("DELETE FROM ariza_kodlari")
+            conn.executemany("INSERT OR REPLACE INTO ariza_kodlari (register, bit, mesaj, seviye) VALUES (?, ?, ?, ?)",
+                             [(int(register), int(bit), str(mesaj), str(seviye)) for register, bit, mesaj, seviye in kodlar])
+            conn.execute("UPDATE ariza_kodu_surumu SET surum = surum + 1 WHERE id = 1")
+        return True
+    except Exception as e:
+        print(f"⚠️ Arıza kodu yazma hatası: {e}")
+        return False
+
 def db_temizle():
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
     try:
-        cursor.execute('DELETE FROM olcumler')
-        conn.commit()
+        conn = baglanti()
+        with conn:
+            cursor = conn.cursor()
+            for (tablo,) in cursor.execute("SELECT tablo FROM olcum_bolumleri").fetchall():
+                cursor.execute(f"DELETE FROM {tablo}")
+            cursor.execute("UPDATE olcum_bolumleri SET kayit_sayisi = 0")
+            cursor.execute("DELETE FROM bolum_cihazlari")
+            for tablo, _ in OZET_TABLOLARI:
+                cursor.execute(f"DELETE FROM {tablo}")
+            cursor.execute("DELETE FROM son_durum")
+            cursor.execute("DELETE FROM ariza_olaylari")
+            cursor.execute("UPDATE arsiv_durumu SET sinir_ms = NULL")
+        arsiv.temizle(arsiv.klasor(DB_NAME))
         return True
     except:
         return False
-    finally:
-        conn.close()
 
 # ==================== YENİ FONKSİYONLAR: GEÇMİŞ VERİ YÖNETİMİ ====================
 
+# --- ARŞİV ---
+# Saklama süresi dolan ham ölçümler silinmeden önce Parquet arşivine yazılır (bkz. arsiv).
+# arsiv_durumu.sinir_ms'den eski satırlar arşivde, yeniler bölüm tablolarındadır; sınır
+# bölümlerden silme ile aynı transaction'da ilerler, okuyucular iki kaynağı çakıştırmaz.
+ARSIV_SUTUNLARI = ", ".join(
+    f"{ad} * 1.0 / {DEGER_OLCEGI}" if ad in OLCEKLI_SUTUNLAR else ad for ad in _SUTUN_ADLARI)
+
+def _arsiv_siniri(cursor):
+    """Arşivdeki verinin üst sınırı (epoch ms) veya arşiv yoksa None"""
+    try:
+        satir = cursor.execute("SELECT sinir_ms FROM arsiv_durumu WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    return satir[0] if satir else None
+
+def _bolum_cihazlari(cursor, tablo):
+    """Bölümdeki cihazlar (birincil anahtarda atlayarak; tabloyu taramaz)"""
+    cihazlar = []
+    satir = cursor.execute(f"SELECT MIN(slave_id) FROM {tablo}").fetchone()
+    while satir and satir[0] is not None:
+        cihazlar.append(satir[0])
+        satir = cursor.execute(f"SELECT MIN(slave_id) FROM {tablo} WHERE slave_id > ?", (satir[0],)).fetchone()
+    return cihazlar
+
+def _arsivden_oku(cursor, baslangic_ms, bitis_ms, slave_ids=None, sutunlar=arsiv.SUTUNLAR):
+    """Aralığın arşivdeki kısmı ([baslangic_ms, bitis_ms) ∩ sınırdan önce) için RecordBatch'ler"""
+    sinir_ms = _arsiv_siniri(cursor)
+    if sinir_ms is None or baslangic_ms >= sinir_ms:
+        return iter(())
+    return arsiv.parcalari_oku(arsiv.klasor(DB_NAME), baslangic_ms, min(bitis_ms, sinir_ms), slave_ids, sutunlar)
+
+def _bolumleri_arsivle(cursor, tablolar, eski_sinir_ms, yeni_sinir_ms):
+    """
+    Bölümlerdeki [eski_sinir, yeni_sinir) satırlarını cihaz/ay Parquet parçalarına yazar.
+    
+    Returns:
+        tuple: (arşivlenen satır sayısı, [(slave_id, ay), ...])
+    """
+    kok = arsiv.klasor(DB_NAME)
+    toplam, yazilanlar = 0, []
+    for tablo in tablolar:
+        ay = tablo[-6:]
+        for slave_id in _bolum_cihazlari(cursor, tablo):
+            okuma = cursor.connection.execute(f"""
+                SELECT {ARSIV_SUTUNLARI} FROM {tablo}
+                WHERE slave_id = ? AND zaman >= ? AND zaman < ? ORDER BY slave_id, zaman
+            """, (slave_id, eski_sinir_ms, yeni_sinir_ms))
+            satir_sayisi = arsiv.parca_yaz(kok, slave_id, ay, eski_sinir_ms,
+                                           iter(lambda: okuma.fetchmany(AKIS_PARCA_BOYUTU), []))
+            if satir_sayisi:
+                toplam += satir_sayisi
+                yazilanlar.append((slave_id, ay))
+    return toplam, yazilanlar
+
 def eski_verileri_temizle(gun_sayisi=None):
     """
-    Belirtilen günden eski verileri sil
+    Belirtilen günden eski verileri arşive taşı (pyarrow yoksa sil)
     gun_sayisi None ise ayarlardan oku
     gun_sayisi 0 ise sınırsız saklama (silme yapma)
+    
+    Tamamen süresi dolmuş aylık bölümler DROP TABLE ile atılır (VACUUM yok,
+    boşalan sayfalar yeni kayıtlarda tekrar kullanılır). Sınırdaki tek bölümde
+    sadece o aya ait eski satırlar index üzerinden silinir. Silinecek satırlar
+    önce data/archive altına cihaz/ay Parquet dosyalarına yazılır; sorgu
+    fonksiyonları arşivi gerektiğinde kendiliğinden okur.
+    
+    Kesim günün başına yuvarlanır: saatlik çağrılar gün içinde aynı sınırı bulur
+    ve bir şey yazmaz, sınır ayında cihaz başına günde en fazla bir parça oluşur.
     """
-    conn = sqlite3.connect(DB_NAME)
+    conn = baglanti()
     cursor = conn.cursor()
     
     try:
@@ -221,100 +1543,145 @@ def eski_verileri_temizle(gun_sayisi=None):
         if gun_sayisi == 0:
             return 0
         
-        tarih = datetime.now() - timedelta(days=gun_sayisi)
+        tarih = (datetime.now() - timedelta(days=gun_sayisi)).replace(hour=0, minute=0, second=0, microsecond=0)
         tarih_str = tarih.strftime('%Y-%m-%d %H:%M:%S')
-        cursor.execute('DELETE FROM olcumler WHERE zaman < ?', (tarih_str,))
-        silinen = cursor.rowcount
-        conn.commit()
+        sinir_ms = _zaman_ms(tarih_str)
+        silinen = 0
+        
+        dolanlar = cursor.execute(
+            "SELECT tablo, kayit_sayisi FROM olcum_bolumleri WHERE bitis <= ?", (tarih_str,)
+        ).fetchall()
+        sinir = cursor.execute(
+            "SELECT tablo FROM olcum_bolumleri WHERE baslangic <= ? AND bitis > ?", (tarih_str, tarih_str)
+        ).fetchone()
+        
+        # 0. Silinecek satırları arşive yaz (dosyalar tamamlanmadan veritabanından silinmez)
+        arsivlenen, arsiv_aylari = 0, []
+        if arsiv.KULLANILABILIR:
+            eski_sinir_ms = _arsiv_siniri(cursor) or 0
+            tablolar = [tablo for tablo, _ in dolanlar] + ([sinir[0]] if sinir else [])
+            arsivlenen, arsiv_aylari = _bolumleri_arsivle(cursor, tablolar, eski_sinir_ms, sinir_ms)
+        
+        with conn:
+            # 1. Süresi tamamen dolmuş bölümler
+            for tablo, kayit_sayisi in dolanlar:
+                cursor.execute(f"DROP TABLE IF EXISTS {tablo}")
+                cursor.execute("DELETE FROM olcum_bolumleri WHERE tablo = ?", (tablo,))
+                cursor.execute("DELETE FROM bolum_cihazlari WHERE tablo = ?", (tablo,))
+                _bolumler_hazir.discard((DB_NAME, tablo))
+                silinen += kayit_sayisi or 0
+            if dolanlar:
+                _gorunumu_yenile(cursor)
+            
+            # 2. Sınırdaki bölüm (kesim tarihi bu ayın içinde)
+            # Cihaz başına (slave_id, zaman) anahtar aralığından silinir; cihaz sayacı
+            # azaltılır, ilk örnek yine anahtardan okunur
+            if sinir:
+                tablo, sinir_silinen = sinir[0], 0
+                cihazlar = cursor.execute("SELECT slave_id FROM bolum_cihazlari WHERE tablo = ? AND ilk_ms < ?",
+                                          (tablo, sinir_ms)).fetchall()
+                for (slave_id,) in cihazlar:
+                    cursor.execute(f"DELETE FROM {tablo} WHERE slave_id = ? AND zaman < ?", (slave_id, sinir_ms))
+                    cihaz_silinen = cursor.rowcount
+                    sinir_silinen += cihaz_silinen
+                    cursor.execute(f"""
+                        UPDATE bolum_cihazlari SET kayit_sayisi = MAX(0, kayit_sayisi - ?),
+                            ilk_ms = (SELECT MIN(zaman) FROM {tablo} WHERE slave_id = ?)
+                        WHERE tablo = ? AND slave_id = ?
+                    """, (cihaz_silinen, slave_id, tablo, slave_id))
+                cursor.execute("DELETE FROM bolum_cihazlari WHERE tablo = ? AND ilk_ms IS NULL", (tablo,))
+                cursor.execute("UPDATE olcum_bolumleri SET kayit_sayisi = MAX(0, kayit_sayisi - ?) WHERE tablo = ?",
+                               (sinir_silinen, tablo))
+                silinen += sinir_silinen
+            
+            # 3. Dakika özetleri ham veriyle birlikte gider; saat/gün özetleri
+            # küçük olduğundan raporlar için saklanır
+            cursor.execute("DELETE FROM ozet_dakika WHERE kova < ?", (tarih_str[:16],))
+            cursor.execute("DELETE FROM son_durum WHERE zaman < ?", (tarih_str,))
+            
+            if arsiv.KULLANILABILIR:
+                cursor.execute("UPDATE arsiv_durumu SET sinir_ms = MAX(COALESCE(sinir_ms, 0), ?) WHERE id = 1",
+                               (sinir_ms,))
+        
+        # 4. Tamamen arşivlenen ayların parçalarını tek dosyada birleştir
+        biten_aylar = {tablo[-6:] for tablo, _ in dolanlar}
+        for slave_id, ay in arsiv_aylari:
+            if ay in biten_aylar:
+                arsiv.ay_birlestir(arsiv.klasor(DB_NAME), slave_id, ay)
         
         if silinen > 0:
-            # VACUUM ile DB boyutunu küçült
-            cursor.execute('VACUUM')
-            print(f"🧹 {silinen} eski kayıt temizlendi ({gun_sayisi} günden eski)")
+            islem = f"{arsivlenen} kayıt arşive taşındı" if arsiv.KULLANILABILIR else f"{silinen} eski kayıt temizlendi"
+            print(f"🧹 {islem} ({gun_sayisi} günden eski, {len(dolanlar)} bölüm kaldırıldı)")
         
         return silinen
     except Exception as e:
+        conn.rollback()
         print(f"⚠️ Eski veri temizleme hatası: {e}")
         return 0
-    finally:
-        conn.close()
 
+@paylasilan_onbellek
 def veritabani_istatistikleri():
     """Veritabanı boyutu ve kayıt sayısı hakkında bilgi"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    cursor = baglanti(salt_okunur=True).cursor()
     
     try:
-        # Toplam kayıt sayısı
-        cursor.execute('SELECT COUNT(*) FROM olcumler')
+        # Toplam kayıt sayısı (bölüm kataloğundan, tablo taraması yok)
+        cursor.execute('SELECT COALESCE(SUM(kayit_sayisi), 0) FROM olcum_bolumleri')
         toplam_kayit = cursor.fetchone()[0]
         
-        # İlk ve son kayıt tarihleri
-        cursor.execute('SELECT MIN(zaman), MAX(zaman) FROM olcumler')
-        tarih_araligi = cursor.fetchone()
-        
-        # Cihaz başına kayıt sayısı
+        # Cihaz başına kayıt sayısı ve zaman aralığı (bölüm x cihaz sayaçlarından)
         cursor.execute('''
-            SELECT slave_id, COUNT(*) as kayit_sayisi, 
-                   MIN(zaman) as ilk_kayit, 
-                   MAX(zaman) as son_kayit
-            FROM olcumler 
-            GROUP BY slave_id 
+            SELECT slave_id, SUM(kayit_sayisi), MIN(ilk_ms), MAX(son_ms)
+            FROM bolum_cihazlari
+            GROUP BY slave_id
             ORDER BY slave_id
         ''')
-        cihaz_istatistik = cursor.fetchall()
+        sayaclar = cursor.fetchall()
+        cihaz_istatistik = [(slave_id, sayi, *_ms_metne([ilk_ms, son_ms]))
+                            for slave_id, sayi, ilk_ms, son_ms in sayaclar]
+        
+        # İlk ve son kayıt tarihleri
+        ilk_kayit = min((row[2] for row in cihaz_istatistik), default=None)
+        son_kayit = max((row[3] for row in cihaz_istatistik), default=None)
         
         # Veritabanı dosya boyutu
         db_boyut = os.path.getsize(DB_NAME) / (1024 * 1024)  # MB cinsinden
         
+        # Parquet arşivi (sınırdan eski veri)
+        sinir_ms = _arsiv_siniri(cursor)
+        arsiv_bilgisi = arsiv.istatistik(arsiv.klasor(DB_NAME))
+        arsiv_bilgisi['sinir'] = _ms_metne([sinir_ms])[0][:19] if sinir_ms is not None else None
+        
         return {
             'toplam_kayit': toplam_kayit,
-            'ilk_kayit': tarih_araligi[0],
-            'son_kayit': tarih_araligi[1],
+            'ilk_kayit': ilk_kayit,
+            'son_kayit': son_kayit,
             'cihaz_istatistik': cihaz_istatistik,
-            'db_boyut_mb': round(db_boyut, 2)
+            'db_boyut_mb': round(db_boyut, 2),
+            'arsiv': arsiv_bilgisi
         }
     except Exception as e:
         print(f"⚠️ İstatistik hatası: {e}")
         return None
-    finally:
-        conn.close()
 
+@paylasilan_onbellek
 def tarih_araliginda_ortalamalar(baslangic, bitis, slave_id=None):
-    """Belirtilen tarih aralığındaki ortalama değerler"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    baslangic_str = f"{baslangic} 00:00:00"
-    bitis_str = f"{bitis} 23:59:59"
+    """Belirtilen tarih aralığındaki ortalama değerler (günlük özet tablosundan)"""
+    cursor = baglanti(salt_okunur=True).cursor()
     
     try:
-        if slave_id:
-            cursor.execute('''
-                SELECT 
-                    AVG(guc) as ort_guc,
-                    AVG(voltaj) as ort_voltaj,
-                    AVG(akim) as ort_akim,
-                    AVG(sicaklik) as ort_sicaklik,
-                    MAX(guc) as max_guc,
-                    MIN(guc) as min_guc,
-                    COUNT(*) as toplam_olcum
-                FROM olcumler
-                WHERE zaman BETWEEN ? AND ? AND slave_id = ?
-            ''', (baslangic_str, bitis_str, slave_id))
-        else:
-            cursor.execute('''
-                SELECT 
-                    AVG(guc) as ort_guc,
-                    AVG(voltaj) as ort_voltaj,
-                    AVG(akim) as ort_akim,
-                    AVG(sicaklik) as ort_sicaklik,
-                    MAX(guc) as max_guc,
-                    MIN(guc) as min_guc,
-                    COUNT(*) as toplam_olcum
-                FROM olcumler
-                WHERE zaman BETWEEN ? AND ?
-            ''', (baslangic_str, bitis_str))
+        kaynak, parametreler = _ozet_sorgusu(baslangic, bitis, slave_id)
+        cursor.execute(f'''
+            SELECT 
+                SUM(guc_toplam) / SUM(sayi) as ort_guc,
+                SUM(voltaj_toplam) / SUM(sayi) as ort_voltaj,
+                SUM(akim_toplam) / SUM(sayi) as ort_akim,
+                SUM(sicaklik_toplam) / SUM(sayi) as ort_sicaklik,
+                MAX(guc_max) as max_guc,
+                MIN(guc_min) as min_guc,
+                SUM(sayi) as toplam_olcum
+            FROM {kaynak}
+        ''', parametreler)
         
         sonuc = cursor.fetchone()
         return {
@@ -329,84 +1696,63 @@ def tarih_araliginda_ortalamalar(baslangic, bitis, slave_id=None):
     except Exception as e:
         print(f"⚠️ Ortalama hesaplama hatası: {e}")
         return None
-    finally:
-        conn.close()
 
-def gunluk_uretim_hesapla(tarih, slave_id=None):
-    """Belirli bir gün için toplam enerji üretimi tahmini (Wh)"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+@paylasilan_onbellek
+def uretim_hesapla(baslangic, bitis, slave_id=None):
+    """
+    Tarih aralığındaki enerji üretimi (Wh).
     
-    baslangic = f"{tarih} 00:00:00"
-    bitis = f"{tarih} 23:59:59"
+    Sayacı olan cihazlarda toplam üretim sayacı farkları, olmayanlarda gerçek zaman
+    damgalarıyla trapez integrali kullanılır (bkz. _enerji_hesapla). Değerler özet
+    tablosunda hazır tutulduğundan sorgu sadece gün kovalarını toplar.
+    """
+    cursor = baglanti(salt_okunur=True).cursor()
     
     try:
-        if slave_id:
-            cursor.execute('''
-                SELECT AVG(guc) as ort_guc, COUNT(*) as olcum_sayisi
-                FROM olcumler
-                WHERE zaman BETWEEN ? AND ? AND slave_id = ?
-            ''', (baslangic, bitis, slave_id))
-        else:
-            cursor.execute('''
-                SELECT AVG(guc) as ort_guc, COUNT(*) as olcum_sayisi
-                FROM olcumler
-                WHERE zaman BETWEEN ? AND ?
-            ''', (baslangic, bitis))
+        kaynak, parametreler = _ozet_sorgusu(baslangic, bitis, slave_id)
+        cursor.execute(f'''
+            SELECT SUM(guc_toplam) / SUM(sayi) as ort_guc,
+                   SUM(enerji_wh) as uretim_wh,
+                   SUM(sure_sn) as sure_sn,
+                   SUM(sayac_sayisi) as sayac_sayisi
+            FROM {kaynak}
+        ''', parametreler)
         
         sonuc = cursor.fetchone()
         ort_guc = sonuc[0] or 0
-        olcum_sayisi = sonuc[1] or 0
-        
-        # Varsayılan veri toplama aralığı (saniye)
-        ayarlar = tum_ayarlari_oku()
-        refresh_rate = float(ayarlar.get('refresh_rate', 2))
-        
-        # Toplam süre (saat)
-        toplam_saat = (olcum_sayisi * refresh_rate) / 3600
-        
-        # Tahmini üretim (Watt-saat)
-        uretim_wh = ort_guc * toplam_saat
+        uretim_wh = sonuc[1] or 0
+        toplam_saat = (sonuc[2] or 0) / 3600
         
         return {
             'uretim_wh': round(uretim_wh, 2),
             'uretim_kwh': round(uretim_wh / 1000, 3),
             'ort_guc': round(ort_guc, 2),
-            'calisma_suresi_saat': round(toplam_saat, 2)
+            'calisma_suresi_saat': round(toplam_saat, 2),
+            'enerji_kaynagi': 'sayac' if sonuc[3] else 'trapez'
         }
     except Exception as e:
         print(f"⚠️ Üretim hesaplama hatası: {e}")
         return None
-    finally:
-        conn.close()
 
+@paylasilan_onbellek
+def gunluk_uretim_hesapla(tarih, slave_id=None):
+    """Belirli bir gün için toplam enerji üretimi (Wh)"""
+    return uretim_hesapla(tarih, tarih, slave_id)
+
+@paylasilan_onbellek
 def hata_sayilarini_getir(baslangic, bitis, slave_id=None):
-    """Belirtilen tarih aralığındaki hata kayıtlarını getir"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    baslangic_str = f"{baslangic} 00:00:00"
-    bitis_str = f"{bitis} 23:59:59"
+    """Belirtilen tarih aralığındaki hata kayıtlarını getir (günlük özet tablosundan)"""
+    cursor = baglanti(salt_okunur=True).cursor()
     
     try:
-        if slave_id:
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as toplam,
-                    SUM(CASE WHEN hata_kodu > 0 THEN 1 ELSE 0 END) as hata_189,
-                    SUM(CASE WHEN hata_kodu_193 > 0 THEN 1 ELSE 0 END) as hata_193
-                FROM olcumler
-                WHERE zaman BETWEEN ? AND ? AND slave_id = ?
-            ''', (baslangic_str, bitis_str, slave_id))
-        else:
-            cursor.execute('''
-                SELECT 
-                    COUNT(*) as toplam,
-                    SUM(CASE WHEN hata_kodu > 0 THEN 1 ELSE 0 END) as hata_189,
-                    SUM(CASE WHEN hata_kodu_193 > 0 THEN 1 ELSE 0 END) as hata_193
-                FROM olcumler
-                WHERE zaman BETWEEN ? AND ?
-            ''', (baslangic_str, bitis_str))
+        kaynak, parametreler = _ozet_sorgusu(baslangic, bitis, slave_id)
+        cursor.execute(f'''
+            SELECT 
+                SUM(sayi) as toplam,
+                SUM(hata_189_sayisi) as hata_189,
+                SUM(hata_193_sayisi) as hata_193
+            FROM {kaynak}
+        ''', parametreler)
         
         sonuc = cursor.fetchone()
         return {
@@ -417,5 +1763,226 @@ def hata_sayilarini_getir(baslangic, bitis, slave_id=None):
     except Exception as e:
         print(f"⚠️ Hata sayısı getirme hatası: {e}")
         return None
+
+@paylasilan_onbellek
+def filo_raporu(baslangic, bitis, slave_ids=None):
+    """
+    Tarih aralığındaki tüm cihazların üretim, ortalama, uç değer ve hata özetleri.
+    
+    Cihaz başına ayrı ayrı çağrılan uretim_hesapla / tarih_araliginda_ortalamalar /
+    hata_sayilarini_getir yerine özet tablosunda tek bir GROUP BY geçişi yapar.
+    
+    Returns:
+        list: Ölçümü olan her cihaz için slave_id sırasıyla bir dict
+    """
+    cursor = baglanti(salt_okunur=True).cursor()
+    
+    try:
+        kaynak, parametreler = _ozet_sorgusu(baslangic, bitis)
+        if slave_ids is not None:
+            slave_ids = [int(slave_id) for slave_id in slave_ids]
+            if not slave_ids:
+                return []
+            kaynak += f" AND slave_id IN ({', '.join('?' * len(slave_ids))})"
+            parametreler += tuple(slave_ids)
+        cursor.execute(f'''
+            SELECT slave_id,
+                   SUM(sayi) as toplam_olcum,
+                   SUM(guc_toplam) / SUM(sayi) as ort_guc,
+                   SUM(voltaj_toplam) / SUM(sayi) as ort_voltaj,
+                   SUM(akim_toplam) / SUM(sayi) as ort_akim,
+                   SUM(sicaklik_toplam) / SUM(sayi) as ort_sicaklik,
+                   MAX(guc_max) as max_guc,
+                   MIN(guc_min) as min_guc,
+                   SUM(hata_189_sayisi) as hata_189,
+                   SUM(hata_193_sayisi) as hata_193,
+                   SUM(enerji_wh) as uretim_wh,
+                   SUM(sure_sn) as sure_sn,
+                   SUM(sayac_sayisi) as sayac_sayisi
+            FROM {kaynak}
+            GROUP BY slave_id
+            HAVING SUM(sayi) > 0
+            ORDER BY slave_id
+        ''', parametreler)
+        
+        rapor = []
+        for row in cursor.fetchall():
+            uretim_wh = row[10] or 0
+            rapor.append({
+                'slave_id': row[0],
+                'toplam_olcum': row[1],
+                'ort_guc': row[2] or 0,
+                'ort_voltaj': row[3] or 0,
+                'ort_akim': row[4] or 0,
+                'ort_sicaklik': row[5] or 0,
+                'max_guc': row[6] or 0,
+                'min_guc': row[7] or 0,
+                'hata_189_sayisi': row[8] or 0,
+                'hata_193_sayisi': row[9] or 0,
+                'uretim_wh': round(uretim_wh, 2),
+                'uretim_kwh': round(uretim_wh / 1000, 3),
+                'calisma_suresi_saat': round((row[11] or 0) / 3600, 2),
+                'enerji_kaynagi': 'sayac' if row[12] else 'trapez'
+            })
+        return rapor
+    except Exception as e:
+        print(f"⚠️ Filo raporu hatası: {e}")
+        return []
+
+# --- GRAFİK VERİSİ ---
+# Grafikler pencere uzunluğundan bağımsız olarak sabit sayıda nokta çizer. Kaynak,
+# en az `nokta` kova veren en kaba çözünürlüktür: kısa pencerelerde ham ölçümler,
+# uzun pencerelerde dakika/saat/gün özetleri. Seçilen kaynak seyreltilerek döndürülür.
+OZET_KOVA_SURESI = {'ozet_gun': 86400, 'ozet_saat': 3600, 'ozet_dakika': 60}
+
+def _ms_metne(ms):
+    """epoch ms dizisi -> 'YYYY-MM-DD HH:MM:SS.fff' metin listesi"""
+    return [z.replace('T', ' ') for z in np.datetime_as_string(np.asarray(ms, dtype='datetime64[ms]'))]
+
+def _grafik_ham(cursor, slave_id, baslangic_str, bitis_str, alanlar):
+    """
+    Kompakt bölümlerden (slave_id, zaman) birincil anahtarıyla aralık taraması.
+    Aralık arşiv sınırından önceye uzanıyorsa o kısım Parquet arşivinden okunur.
+    """
+    baslangic_ms, bitis_ms = _zaman_ms(baslangic_str), _zaman_ms(bitis_str)
+    parcalar = [np.column_stack([parca.column(i).to_numpy(zero_copy_only=False).astype(np.float64)
+                                 for i in range(parca.num_columns)])
+                for parca in _arsivden_oku(cursor, baslangic_ms, bitis_ms + 1, [slave_id], ['zaman'] + alanlar)]
+    tablolar = [row[0] for row in cursor.execute("""
+        SELECT tablo FROM olcum_bolumleri WHERE bitis > ? AND baslangic <= ? ORDER BY baslangic
+    """, (baslangic_str, bitis_str))]
+    for tablo in tablolar:
+        satirlar = cursor.execute(f"""
+            SELECT zaman, {', '.join(f'{alan} * 1.0 / {DEGER_OLCEGI}' for alan in alanlar)} FROM {tablo}
+            WHERE slave_id = ? AND zaman BETWEEN ? AND ? ORDER BY zaman
+        """, (slave_id, baslangic_ms, bitis_ms)).fetchall()
+        if satirlar:
+            parcalar.append(np.array(satirlar, dtype=np.float64))
+    if not parcalar:
+        return None
+    dizi = np.concatenate(parcalar)
+    return {alan: (dizi[:, 0], dizi[:, i + 1]) for i, alan in enumerate(alanlar)}
+
+def _grafik_ozet(cursor, tablo, uzunluk, slave_id, baslangic_str, bitis_str, alanlar, yontem):
+    """Özet kovalarından ortalama (lttb) veya min/max (min_maks) serisi; zaman kova ortası"""
+    if yontem == 'min_maks':
+        sutunlar = ", ".join(f"{alan}_min, {alan}_max" for alan in alanlar)
+    else:
+        sutunlar = ", ".join(f"{alan}_toplam * 1.0 / sayi" for alan in alanlar)
+    satirlar = cursor.execute(f"""
+        SELECT kova, {sutunlar} FROM {tablo}
+        WHERE slave_id = ? AND kova >= ? AND kova <= ? AND sayi > 0 ORDER BY kova
+    """, (slave_id, baslangic_str[:uzunluk], bitis_str[:uzunluk])).fetchall()
+    if len(satirlar) < 2:
+        return None
+    x = (np.array([row[0] for row in satirlar], dtype='datetime64[ms]').astype(np.float64)
+         + OZET_KOVA_SURESI[tablo] * 500)
+    degerler = np.array([row[1:] for row in satirlar], dtype=np.float64)
+    if yontem != 'min_maks':
+        return {alan: (x, degerler[:, i]) for i, alan in enumerate(alanlar)}
+    # Her kova iki nokta: (ortası, min) ve (ortası, max)
+    return {alan: (np.repeat(x, 2), degerler[:, 2 * i:2 * i + 2].reshape(-1)) for i, alan in enumerate(alanlar)}
+
+@paylasilan_onbellek
+def grafik_verisi(slave_id, baslangic, bitis, alanlar=OZET_ALANLARI, nokta=500, yontem='lttb'):
+    """
+    Bir cihazın [baslangic, bitis] aralığındaki seyreltilmiş grafik serileri.
+    
+    Args:
+        baslangic, bitis: 'YYYY-MM-DD HH:MM:SS' metinleri
+        alanlar: OZET_ALANLARI içinden seriler
+        nokta: seri başına en fazla nokta sayısı
+        yontem: 'lttb' veya 'min_maks' (bkz. ornekleme)
+    
+    Returns:
+        dict: {'kaynak': 'ham' | özet tablosu, 'seriler': {alan: [(zaman, deger), ...]}}
+              veri yoksa seriler boş
+    """
+    alanlar = [alan for alan in alanlar if alan in OZET_ALANLARI]
+    if yontem not in ornekleme.YONTEMLER:
+        raise ValueError(f"Bilinmeyen seyreltme yöntemi: {yontem}")
+    baslangic_str, bitis_str = str(baslangic)[:19], str(bitis)[:19]
+    sure_sn = (_zaman_ms(bitis_str) - _zaman_ms(baslangic_str)) / 1000
+    
+    # En az `nokta` kova veren en kaba özet; daha kabaları yedek (dakika özetleri
+    # ham veriyle birlikte silinir, saat/gün özetleri daha uzun kalır). Dakika özeti
+    # silinmiş eski aralıklarda ham veri arşivden okunur, saat özetine ondan sonra düşülür.
+    kaynaklar = [('ozet_gun', 10), ('ozet_saat', 13), ('ozet_dakika', 16)]
+    yeterli = [k for k in kaynaklar if sure_sn / OZET_KOVA_SURESI[k[0]] >= nokta]
+    if yeterli and yeterli[0][0] == 'ozet_dakika':
+        kaynaklar = [('ozet_dakika', 16), ('ham', None), ('ozet_saat', 13), ('ozet_gun', 10)]
+    elif yeterli:
+        adaylar = [k for k in kaynaklar if k[0] != yeterli[0][0]]
+        kaynaklar = [yeterli[0]] + adaylar[::-1]
+    else:
+        kaynaklar = [('ham', None)] + kaynaklar[::-1]
+    
+    cursor = baglanti(salt_okunur=True).cursor()
+    for tablo, uzunluk in kaynaklar:
+        if tablo == 'ham':
+            seriler = _grafik_ham(cursor, slave_id, baslangic_str, bitis_str, alanlar)
+        else:
+            seriler = _grafik_ozet(cursor, tablo, uzunluk, slave_id, baslangic_str, bitis_str, alanlar, yontem)
+        if seriler:
+            break
+    else:
+        return {'kaynak': None, 'seriler': {}}
+    
+    sonuc = {}
+    for alan, (x, y) in seriler.items():
+        x, y = ornekleme.seyrelt(x, y, nokta, yontem)
+        sonuc[alan] = list(zip(_ms_metne(x), y.tolist()))
+    return {'kaynak': tablo, 'seriler': sonuc}
+
+# --- HAM VERİ AKIŞI (DIŞA AKTARMA) ---
+AKIS_PARCA_BOYUTU = 5000  # Tek seferde okunan satır sayısı
+
+def olcum_akisi(baslangic, bitis, slave_ids=None, parca=None):
+    """
+    [baslangic, bitis] aralığındaki ham ölçümleri parça parça üreten generator.
+    Bellek kullanımı toplam satır sayısından bağımsızdır (en fazla `parca` satır,
+    verilmezse AKIS_PARCA_BOYUTU).
+    
+    Sıra: aylık bölüm, cihaz, zaman - bölümlerin (slave_id, zaman) birincil anahtar
+    sırası olduğundan sıralama için geçici tablo kurulmaz.
+    Uzun süren aktarmalar havuzdaki bağlantıları meşgul etmesin diye kendi
+    read-only bağlantısını açar ve bitince (veya yarıda bırakılınca) kapatır.
+    Arşiv sınırından eski kısım önce Parquet arşivinden (aynı sırayla) okunur.
+    
+    Yields:
+        list: [(slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu, hata_kodu_193, toplam_uretim_wh), ...]
+    """
+    parca = parca or AKIS_PARCA_BOYUTU
+    baslangic_str, bitis_str = str(baslangic), str(bitis)
+    kosul = "zaman BETWEEN ? AND ?"
+    parametreler = (_zaman_ms(baslangic_str), _zaman_ms(bitis_str))
+    if slave_ids is not None:
+        slave_ids = [int(slave_id) for slave_id in slave_ids]
+        if not slave_ids:
+            return
+        kosul += f" AND slave_id IN ({', '.join('?' * len(slave_ids))})"
+        parametreler += tuple(slave_ids)
+    
+    conn = _baglanti_ac(salt_okunur=True)
+    try:
+        for kayitlar in _arsivden_oku(conn.cursor(), parametreler[0], parametreler[1] + 1, slave_ids):
+            sutunlar = [kayitlar.column(i).to_pylist() for i in range(kayitlar.num_columns)]
+            sutunlar[1] = _ms_metne(kayitlar.column(1).to_numpy())
+            satirlar = list(zip(*sutunlar))
+            for i in range(0, len(satirlar), parca):
+                yield satirlar[i:i + parca]
+        
+        tablolar = [row[0] for row in conn.execute("""
+            SELECT tablo FROM olcum_bolumleri WHERE bitis > ? AND baslangic <= ? ORDER BY baslangic
+        """, (baslangic_str, bitis_str))]
+        for tablo in tablolar:
+            cursor = conn.execute(f"""
+                SELECT {COZULMUS_SUTUNLAR} FROM {tablo} WHERE {kosul} ORDER BY slave_id, {tablo}.zaman
+            """, parametreler)
+            while True:
+                satirlar = cursor.fetchmany(parca)
+                if not satirlar:
+                    break
+                yield satirlar
     finally:
         conn.close()
\ No newline at end of file
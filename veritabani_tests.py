@@ -0,0 +1,388 @@
+import os
+import sqlite3
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+import arsiv
+import veritabani
+
+TEST_DB = "test_veritabani.db"
+
+
+def ornek(guc, hata_kodu=0, hata_kodu_193=0):
+    return {"guc": guc, "voltaj": 220.0, "akim": guc / 220.0, "sicaklik": 40.0,
+            "hata_kodu": hata_kodu, "hata_kodu_193": hata_kodu_193}
+
+
+class TestVeritabani(unittest.TestCase):
+    def setUp(self):
+        self.original_db = veritabani.DB_NAME
+        veritabani.DB_NAME = TEST_DB
+        veritabani.init_db()
+
+    def tearDown(self):
+        veritabani.baglantilari_kapat()
+        for yol in (TEST_DB, TEST_DB + "-wal", TEST_DB + "-shm"):
+            if os.path.exists(yol):
+                os.remove(yol)
+        arsiv.temizle(arsiv.klasor(TEST_DB))
+        veritabani.DB_NAME = self.original_db
+
+    def test_ozetler_ham_veriyle_ayni(self):
+        bugun = datetime.now().strftime('%Y-%m-%d')
+        kayitlar = [
+            (1, f"{bugun} 00:00:01.000000", ornek(100)),
+            (1, f"{bugun} 10:30:00.000000", ornek(300, hata_kodu=4)),
+            (2, f"{bugun} 12:00:00.000000", ornek(50, hata_kodu_193=1)),
+        ]
+        veritabani.veri_ekle_toplu(kayitlar[:2])
+        veritabani.veri_ekle_toplu(kayitlar[2:])
+
+        ort = veritabani.tarih_araliginda_ortalamalar(bugun, bugun, slave_id=1)
+        self.assertEqual(ort['toplam_olcum'], 2)
+        self.assertAlmostEqual(ort['ort_guc'], 200.0)
+        self.assertEqual(ort['max_guc'], 300)
+        self.assertEqual(ort['min_guc'], 100)
+
+        hatalar = veritabani.hata_sayilarini_getir(bugun, bugun)
+        self.assertEqual((hatalar['toplam_olcum'], hatalar['hata_189_sayisi'], hatalar['hata_193_sayisi']), (3, 1, 1))
+
+    def test_filo_raporu_tek_tek_sorgularla_ayni(self):
+        bugun = datetime.now().strftime('%Y-%m-%d')
+        veritabani.veri_ekle_toplu([
+            (1, f"{bugun} 09:00:00.000000", ornek(100)),
+            (1, f"{bugun} 09:10:00.000000", ornek(300, hata_kodu=4)),
+            (2, f"{bugun} 09:00:00.000000", ornek(50, hata_kodu_193=1)),
+            (3, f"{bugun} 09:00:00.000000", ornek(70)),
+        ])
+
+        rapor = veritabani.filo_raporu(bugun, bugun, slave_ids=[1, 2, 5])
+        self.assertEqual([c['slave_id'] for c in rapor], [1, 2])
+        self.assertEqual([c['slave_id'] for c in veritabani.filo_raporu(bugun, bugun)], [1, 2, 3])
+        self.assertEqual(veritabani.filo_raporu(bugun, bugun, slave_ids=[]), [])
+        for cihaz in rapor:
+            ort = veritabani.tarih_araliginda_ortalamalar(bugun, bugun, slave_id=cihaz['slave_id'])
+            uretim = veritabani.gunluk_uretim_hesapla(bugun, slave_id=cihaz['slave_id'])
+            hatalar = veritabani.hata_sayilarini_getir(bugun, bugun, slave_id=cihaz['slave_id'])
+            for anahtar in ('toplam_olcum', 'ort_guc', 'max_guc', 'min_guc'):
+                self.assertEqual(cihaz[anahtar], ort[anahtar])
+            self.assertEqual(cihaz['uretim_wh'], uretim['uretim_wh'])
+            self.assertEqual(cihaz['hata_189_sayisi'], hatalar['hata_189_sayisi'])
+            self.assertEqual(cihaz['hata_193_sayisi'], hatalar['hata_193_sayisi'])
+
+    def test_ayarlar_tek_surumle_yazilir(self):
+        surum = veritabani.ayar_surumu()
+        self.assertTrue(veritabani.ayarlari_yaz({'target_ip': '10.0.0.5', 'guc_addr': 80, 'yeni_ayar': 'x'}))
+        self.assertEqual(veritabani.ayar_surumu(), surum + 1)
+        ayarlar = veritabani.tum_ayarlari_oku()
+        self.assertEqual((ayarlar['target_ip'], ayarlar['guc_addr'], ayarlar['yeni_ayar']), ('10.0.0.5', '80', 'x'))
+
+        # Değişmeyen değerler sürümü artırmaz; önbellekteki kopya dışarıdan bozulmaz
+        ayarlar['target_ip'] = 'bozuk'
+        self.assertTrue(veritabani.ayarlari_yaz({'target_ip': '10.0.0.5'}))
+        self.assertEqual(veritabani.ayar_surumu(), surum + 1)
+        self.assertEqual(veritabani.ayar_oku('target_ip'), '10.0.0.5')
+
+    def test_son_durum_en_yeni_ornegi_tutar(self):
+        simdi = datetime.now()
+        yeni = simdi.strftime('%Y-%m-%d %H:%M:%S.%f')
+        eski = (simdi - timedelta(minutes=5)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        veritabani.veri_ekle_toplu([(1, yeni, ornek(500, hata_kodu=2))])
+        veritabani.veri_ekle_toplu([(1, eski, ornek(100)), (2, eski, ornek(200))])
+
+        durum = veritabani.tum_cihazlarin_son_durumu()
+        self.assertEqual([row[0] for row in durum], [1, 2])
+        self.assertEqual((durum[0][1], durum[0][2], durum[0][6]), (yeni, 500, 2))
+
+    def test_tekrar_yazilan_ornek_sayaclari_bozmaz(self):
+        bugun = datetime.now().strftime('%Y-%m-%d')
+        parti = [(1, f"{bugun} 10:00:00.000000", dict(ornek(1000), toplam_uretim_wh=5000)),
+                 (1, f"{bugun} 10:00:10.000000", dict(ornek(1000), toplam_uretim_wh=5010))]
+        self.assertEqual(veritabani.veri_ekle_toplu(parti), 2)
+        # Tekrar denenen parti ve parti içinde aynı anahtar
+        self.assertEqual(veritabani.veri_ekle_toplu(parti + [parti[1]]), 0)
+
+        cursor = veritabani.baglanti().cursor()
+        self.assertEqual(cursor.execute("SELECT SUM(kayit_sayisi) FROM olcum_bolumleri").fetchone()[0], 2)
+        self.assertEqual(cursor.execute("SELECT SUM(sayi) FROM ozet_dakika").fetchone()[0], 2)
+        self.assertEqual(veritabani.veritabani_istatistikleri()['toplam_kayit'], 2)
+        self.assertEqual(veritabani.gunluk_uretim_hesapla(bugun, slave_id=1)['uretim_wh'], 10)
+
+    def test_tampon_boyut_sure_ve_alarmda_yazar(self):
+        sayi = lambda: veritabani.baglanti().execute("SELECT SUM(kayit_sayisi) FROM olcum_bolumleri").fetchone()[0]
+        tampon = veritabani.VeriTamponu(max_kayit=3, max_sure=60)
+        tampon.ekle(1, ornek(10))
+        tampon.ekle(2, ornek(20))
+        self.assertEqual((len(tampon), sayi()), (2, 0))
+        tampon.ekle(3, ornek(30))
+        self.assertEqual((len(tampon), sayi()), (0, 3))
+
+        tampon.ekle(1, ornek(40, hata_kodu=2))
+        self.assertEqual((len(tampon), sayi()), (0, 4))
+
+        tampon.max_sure = 0.5
+        tampon.ekle(2, ornek(50))
+        self.assertEqual(tampon.vadesi_geldiyse_bosalt(), 0)
+        time.sleep(0.6)
+        self.assertEqual(tampon.vadesi_geldiyse_bosalt(), 1)
+
+    def test_tampon_yazma_hatasinda_bekler_ve_sinirlar(self):
+        asil = veritabani.veri_ekle_toplu
+        self.addCleanup(setattr, veritabani, 'veri_ekle_toplu', asil)
+        denemeler = []
+        def kilitli(kayitlar):
+            denemeler.append(len(kayitlar))
+            raise sqlite3.OperationalError("database is locked")
+        veritabani.veri_ekle_toplu = kilitli
+
+        tampon = veritabani.VeriTamponu(max_kayit=1, max_bekleyen=3)
+        simdi = datetime.now()
+        zamanlar = [(simdi + timedelta(seconds=i)).strftime('%Y-%m-%d %H:%M:%S.%f') for i in range(5)]
+        for i, zaman in enumerate(zamanlar):
+            tampon.ekle(1, ornek(10 + i), zaman=zaman)
+        # İlk hatadan sonra geri çekilme süresince tekrar denenmez, en eskiler atılır
+        self.assertEqual(denemeler, [1])
+        self.assertEqual((len(tampon), tampon.atilan), (5, 0))
+        self.assertEqual(tampon.bosalt(), 0)
+        self.assertEqual((len(tampon), tampon.atilan), (3, 2))
+        self.assertEqual(tampon.vadesi_geldiyse_bosalt(), 0)
+        self.assertEqual(denemeler, [1, 5])
+
+        veritabani.veri_ekle_toplu = asil
+        self.assertEqual(tampon.bosalt(), 3)
+        self.assertEqual([s[1] for s in veritabani.son_verileri_getir(1)], [12, 13, 14])
+
+    def test_tampon_bozuk_kaydi_atlar(self):
+        tampon = veritabani.VeriTamponu()
+        for slave_id in (1, 2, 3, 4):
+            tampon.ekle(slave_id, ornek(10) if slave_id != 3 else {"guc": 10})
+        self.assertEqual((tampon.bosalt(), tampon.atilan, len(tampon)), (3, 1, 0))
+        self.assertEqual(len(veritabani.son_verileri_getir(3)), 0)
+
+    def test_uretim_sayac_ve_trapez(self):
+        bugun = datetime.now().strftime('%Y-%m-%d')
+        # Cihaz 1 sayaçlı, cihaz 2 sayaçsız; ikinci batch önceki son örnekten devam etmeli
+        veritabani.veri_ekle_toplu([
+            (1, f"{bugun} 10:00:00.000000", dict(ornek(1000), toplam_uretim_wh=5000)),
+            (2, f"{bugun} 10:00:00.000000", ornek(1000)),
+        ])
+        veritabani.veri_ekle_toplu([
+            (1, f"{bugun} 10:30:00.000000", dict(ornek(0), toplam_uretim_wh=5400)),
+            (2, f"{bugun} 10:30:00.000000", ornek(2000)),
+            (2, f"{bugun} 12:30:00.000000", ornek(2000)),
+        ])
+
+        sayacli = veritabani.gunluk_uretim_hesapla(bugun, slave_id=1)
+        self.assertEqual((sayacli['uretim_wh'], sayacli['enerji_kaynagi']), (400, 'sayac'))
+
+        # 30 dk trapez (1500 W ort.) = 750 Wh; 2 saatlik boşluk entegre edilmez
+        sayacsiz = veritabani.gunluk_uretim_hesapla(bugun, slave_id=2)
+        self.assertEqual((sayacsiz['uretim_wh'], sayacsiz['enerji_kaynagi']), (750, 'trapez'))
+        self.assertAlmostEqual(sayacsiz['calisma_suresi_saat'], 0.5)
+
+    def test_yeni_veriler_imlecten_sonrasini_dondurur(self):
+        bugun = datetime.now().strftime('%Y-%m-%d')
+        veritabani.veri_ekle_toplu([(1, f"{bugun} 10:00:0{i}.000000", ornek(i)) for i in range(5)])
+        satirlar, imlec = veritabani.yeni_verileri_getir(1, None, limit=3)
+        self.assertEqual(([s[1] for s in satirlar], imlec), ([2, 3, 4], f"{bugun} 10:00:04.000"))
+
+        self.assertEqual(veritabani.yeni_verileri_getir(1, imlec), ([], imlec))
+        veritabani.veri_ekle_toplu([(1, f"{bugun} 10:00:0{i}.000000", ornek(i)) for i in range(5, 8)]
+                                   + [(2, f"{bugun} 10:00:09.000000", ornek(9))])
+        satirlar, imlec = veritabani.yeni_verileri_getir(1, imlec, limit=2)
+        self.assertEqual(([s[1] for s in satirlar], imlec), ([6, 7], f"{bugun} 10:00:07.000"))
+
+    def test_paylasilan_onbellek_veri_degisince_yenilenir(self):
+        veritabani.veri_ekle(1, ornek(100))
+        ilk = veritabani.tum_cihazlarin_son_durumu()
+        sonuclar = []
+        thread = threading.Thread(target=lambda: sonuclar.append(veritabani.tum_cihazlarin_son_durumu()))
+        thread.start()
+        thread.join()
+        # Başka thread (oturum) aynı sonucu sorgu çalıştırmadan alır
+        self.assertIs(sonuclar[0], ilk)
+
+        veritabani.veri_ekle(1, ornek(250))
+        yeni = veritabani.tum_cihazlarin_son_durumu()
+        self.assertIsNot(yeni, ilk)
+        self.assertEqual(yeni[0][2], 250)
+
+    def test_grafik_verisi_pencereye_gore_kaynak_secer(self):
+        bas = datetime(2026, 3, 1)
+        veritabani.veri_ekle_toplu([
+            (1, (bas + timedelta(seconds=i * 30)).strftime('%Y-%m-%d %H:%M:%S.%f'), ornek(i % 100))
+            for i in range(4 * 24 * 120)])
+
+        saatlik = veritabani.grafik_verisi(1, "2026-03-01 10:00:00", "2026-03-01 11:00:00", nokta=500)
+        self.assertEqual(saatlik['kaynak'], 'ham')
+        self.assertEqual(len(saatlik['seriler']['guc']), 121)
+
+        gunluk = veritabani.grafik_verisi(1, "2026-03-01 00:00:00", "2026-03-02 00:00:00", nokta=20)
+        self.assertEqual(gunluk['kaynak'], 'ozet_saat')
+        self.assertEqual(len(gunluk['seriler']['guc']), 20)
+        self.assertEqual(gunluk['seriler']['guc'][0][0], "2026-03-01 00:30:00.000")
+
+        dort_gun = veritabani.grafik_verisi(1, "2026-03-01 00:00:00", "2026-03-05 00:00:00",
+                                            alanlar=('guc',), nokta=200, yontem='min_maks')
+        self.assertEqual(dort_gun['kaynak'], 'ozet_dakika')
+        self.assertLessEqual(len(dort_gun['seriler']['guc']), 200)
+        self.assertEqual(max(deger for _, deger in dort_gun['seriler']['guc']), 99)
+
+    def test_ariza_olaylari_maske_degisiminden_yazilir(self):
+        bugun = datetime.now().strftime('%Y-%m-%d')
+        veritabani.veri_ekle_toplu([
+            (1, f"{bugun} 10:00:00.000000", ornek(100)),
+            (1, f"{bugun} 10:00:10.000000", ornek(100, hata_kodu=0b101)),
+            (1, f"{bugun} 10:00:20.000000", ornek(100, hata_kodu=0b100, hata_kodu_193=1)),
+        ])
+        # Sözlük değişince yeni olaylar yeni mesajla çözülür; ayar sürümü (collector yapılandırması) değişmez
+        kodlar = veritabani.ariza_kodlarini_getir()
+        surum = veritabani.ayar_surumu()
+        self.assertTrue(veritabani.ariza_kodlarini_yaz(kodlar + [(189, 30, "Izolasyon Hatasi", "hata")]))
+        self.assertEqual(veritabani.ayar_surumu(), surum)
+        veritabani.veri_ekle_toplu([
+            (1, f"{bugun} 10:00:30.000000", ornek(100, hata_kodu=1 << 30)),
+        ])
+        veritabani.veri_ekle_toplu([(1, f"{bugun} 10:00:25.000000", ornek(100))])  # Geç gelen örnek olay üretmez
+
+        self.assertEqual(veritabani.aktif_arizalar(),
+                         [(1, 189, 30, "Izolasyon Hatasi", "hata", f"{bugun} 10:00:30.000")])
+        gecmis = [(o[1], o[2], o[5][11:19], o[6] and o[6][11:19]) for o in veritabani.ariza_gecmisi(bugun, bugun)]
+        self.assertEqual(sorted(gecmis), [
+            (189, 0, "10:00:10", "10:00:20"), (189, 2, "10:00:10", "10:00:30"),
+            (189, 30, "10:00:30", None), (193, 0, "10:00:20", "10:00:30")])
+        self.assertEqual(veritabani.ariza_gecmisi(bugun, bugun, slave_id=2), [])
+
+    def test_eski_semali_veritabani_gocle_yukseltilir(self):
+        yol = "test_goc.db"
+        self.addCleanup(lambda: [os.remove(y) for y in (yol, yol + "-wal", yol + "-shm") if os.path.exists(y)])
+        self.addCleanup(veritabani.baglantilari_kapat)
+        conn = sqlite3.connect(yol)
+        conn.executescript("""
+            CREATE TABLE ayarlar (anahtar TEXT PRIMARY KEY, deger TEXT);
+            INSERT INTO ayarlar VALUES ('isi_addr', '73');
+            CREATE TABLE olcum_bolumleri (tablo TEXT PRIMARY KEY, baslangic TEXT NOT NULL, bitis TEXT NOT NULL,
+                                          kayit_sayisi INTEGER DEFAULT 0);
+            INSERT INTO olcum_bolumleri VALUES ('olcumler_202601', '2026-01-01 00:00:00', '2026-02-01 00:00:00', 2);
+            CREATE TABLE olcumler_202601 (id INTEGER PRIMARY KEY, slave_id INTEGER, zaman TIMESTAMP, guc REAL,
+                                          voltaj REAL, akim REAL, sicaklik REAL, hata_kodu INTEGER DEFAULT 0,
+                                          hata_kodu_193 INTEGER DEFAULT 0);
+            INSERT INTO olcumler_202601 (slave_id, zaman, guc, voltaj, akim, sicaklik, hata_kodu)
+            VALUES (1, '2026-01-05 10:00:00.000000', 100.5, 230, 0.5, 40, 0),
+                   (1, '2026-01-05 10:00:10.000000', 200.5, 231, 0.9, 41, 4);
+        """)
+        conn.close()
+
+        veritabani.DB_NAME = yol
+        veritabani.init_db()
+        self.assertEqual(veritabani.sema_surumu(), veritabani.GOCLER[-1][0])
+        self.assertEqual(veritabani.ayar_oku('isi_addr'), '74')
+        self.assertEqual(veritabani.ayar_oku('okuma_bosluk'), '16')
+        self.assertEqual([s[1] for s in veritabani.son_verileri_getir(1)], [100.5, 200.5])
+        self.assertEqual(veritabani.tarih_araliginda_ortalamalar('2026-01-05', '2026-01-05', 1)['toplam_olcum'], 2)
+        self.assertEqual([a[:3] for a in veritabani.aktif_arizalar()], [(1, 189, 2)])
+        self.assertEqual(veritabani.veritabani_istatistikleri()['cihaz_istatistik'],
+                         [(1, 2, '2026-01-05 10:00:00.000', '2026-01-05 10:00:10.000')])
+
+        # Göçler bir kez uygulanır; yeni bağlantı neslinde sadece sürüm kontrol edilir
+        veritabani.baglantilari_kapat()
+        veritabani.init_db()
+        sayi = veritabani.baglanti().execute("SELECT COUNT(*) FROM schema_version").fetchone()[0]
+        self.assertEqual(sayi, len(veritabani.GOCLER))
+
+    def test_kompakt_bolum_semasi(self):
+        zaman = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+        veritabani.veri_ekle_toplu([(1, zaman, dict(ornek(1234.5), voltaj=230.1, toplam_uretim_wh=None))])
+
+        tablo = veritabani._bolum_adi(zaman)
+        conn = veritabani.baglanti()
+        ham = conn.execute(f"SELECT typeof(zaman), guc, voltaj, toplam_uretim_wh FROM {tablo}").fetchone()
+        self.assertEqual(ham, ('integer', 1234500, 230100, None))
+        indexler = conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?",
+                                (tablo,)).fetchall()
+        self.assertEqual(indexler, [])
+
+        son = veritabani.son_verileri_getir(1)[0]
+        self.assertEqual(son[0], zaman[:23])
+        self.assertEqual((son[1], son[2]), (1234.5, 230.1))
+
+    def test_saklama_suresi_bolum_dusurur(self):
+        eski = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d %H:%M:%S.%f')
+        veritabani.veri_ekle_toplu([(1, eski, ornek(10)), (2, eski, ornek(20))])
+        veritabani.veri_ekle(1, ornek(30))
+
+        self.assertEqual(veritabani.eski_verileri_temizle(30), 2)
+        tablolar = [row[0] for row in veritabani.baglanti().execute("SELECT tablo FROM olcum_bolumleri")]
+        self.assertEqual(tablolar, [veritabani._bolum_adi(datetime.now().strftime('%Y-%m-%d'))])
+        self.assertEqual(len(veritabani.son_verileri_getir(1)), 1)
+
+    def test_bolumleme_ve_sinir_bolumu_kirpma(self):
+        simdi = datetime.now()
+        # Kesim günün başına yuvarlanır; ayın ilk günü olmasın ki sınır bölümünde kesimden eski satır olsun
+        gun_sayisi = 46 if (simdi - timedelta(days=45)).day == 1 else 45
+        kesim = (simdi - timedelta(days=gun_sayisi)).replace(hour=0, minute=0, second=0, microsecond=0)
+        ay_basi = kesim.replace(day=1)
+        metin = lambda z: z.strftime('%Y-%m-%d %H:%M:%S.%f')
+        dolan = metin(simdi - timedelta(days=90))
+        kesim_oncesi = metin(ay_basi + (kesim - ay_basi) / 2)
+        kesim_sonrasi = metin(kesim + (simdi - timedelta(days=gun_sayisi) - kesim) / 2)  # Kesim günü içinde
+        yeni = metin(simdi)
+        veritabani.veri_ekle_toplu([(1, dolan, ornek(10)), (1, kesim_oncesi, ornek(20)), (2, kesim_oncesi, ornek(30)),
+                                    (1, kesim_sonrasi, ornek(40)), (1, yeni, ornek(50))])
+
+        # Her satır kendi ayının bölümüne yazılır
+        cursor = veritabani.baglanti().cursor()
+        bolumler = dict(cursor.execute("SELECT tablo, kayit_sayisi FROM olcum_bolumleri"))
+        sinir_tablosu = veritabani._bolum_adi(kesim_oncesi)
+        self.assertEqual(bolumler, {veritabani._bolum_adi(dolan): 1, sinir_tablosu: 3, veritabani._bolum_adi(yeni): 1})
+        self.assertEqual(cursor.execute(f"SELECT COUNT(*) FROM {sinir_tablosu}").fetchone()[0], 3)
+        istatistik = veritabani.veritabani_istatistikleri()
+        self.assertEqual(istatistik['cihaz_istatistik'], [(1, 4, dolan[:23], yeni[:23]),
+                                                          (2, 1, kesim_oncesi[:23], kesim_oncesi[:23])])
+        self.assertEqual((istatistik['ilk_kayit'], istatistik['son_kayit']), (dolan[:23], yeni[:23]))
+
+        # Dolan bölüm düşer, sınır bölümünde sadece kesim gününden eski satırlar silinir
+        arsiv_kullanilabilir, arsiv.KULLANILABILIR = arsiv.KULLANILABILIR, False
+        try:
+            self.assertEqual(veritabani.eski_verileri_temizle(gun_sayisi), 3)
+        finally:
+            arsiv.KULLANILABILIR = arsiv_kullanilabilir
+        bolumler = dict(cursor.execute("SELECT tablo, kayit_sayisi FROM olcum_bolumleri"))
+        self.assertEqual(bolumler, {sinir_tablosu: 1, veritabani._bolum_adi(yeni): 1})
+        self.assertFalse(veritabani._tablo_var_mi(cursor, veritabani._bolum_adi(dolan)))
+        self.assertEqual(cursor.execute(f"SELECT COUNT(*) FROM {sinir_tablosu}").fetchone()[0], 1)
+        istatistik = veritabani.veritabani_istatistikleri()
+        self.assertEqual(istatistik['toplam_kayit'], 2)
+        self.assertEqual(istatistik['cihaz_istatistik'], [(1, 2, kesim_sonrasi[:23], yeni[:23])])
+
+    @unittest.skipUnless(arsiv.KULLANILABILIR, "pyarrow kurulu değil")
+    def test_saklama_suresi_dolan_veri_arsivden_okunur(self):
+        simdi = datetime.now()
+        eski = [(1, (simdi - timedelta(days=90, minutes=i)).strftime('%Y-%m-%d %H:%M:%S.%f'), ornek(10 + i))
+                for i in range(5)]
+        veritabani.veri_ekle_toplu(eski + [(2, eski[0][1], ornek(20))])
+        veritabani.veri_ekle(1, ornek(30))
+        baslangic = (simdi - timedelta(days=100)).strftime('%Y-%m-%d %H:%M:%S')
+        bitis = simdi.strftime('%Y-%m-%d %H:%M:%S')
+        once = [satir for parca in veritabani.olcum_akisi(baslangic, bitis) for satir in parca]
+
+        self.assertEqual(veritabani.eski_verileri_temizle(30), 6)
+        self.assertEqual(arsiv.istatistik(arsiv.klasor(TEST_DB))['dosya_sayisi'], 2)
+        sonra = [satir for parca in veritabani.olcum_akisi(baslangic, bitis, parca=2) for satir in parca]
+        self.assertEqual(sonra, once)
+
+        # Tekrar çalıştırmak arşivdeki satırları çoğaltmaz
+        self.assertEqual(veritabani.eski_verileri_temizle(30), 0)
+        self.assertEqual(sum(len(p) for p in veritabani.olcum_akisi(baslangic, bitis)), len(once))
+
+        # Dakika özetleri silinmiş aralık arşivdeki ham veriden çizilir
+        grafik = veritabani.grafik_verisi(1, (simdi - timedelta(days=91)).strftime('%Y-%m-%d %H:%M:%S'),
+                                          (simdi - timedelta(days=89)).strftime('%Y-%m-%d %H:%M:%S'), alanlar=['guc'])
+        self.assertEqual(grafik['kaynak'], 'ham')
+        self.assertEqual([deger for _, deger in grafik['seriler']['guc']], [14.0, 13.0, 12.0, 11.0, 10.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+"""
+Deadline tabanlı okuma zamanlayıcısı
+Her cihazın her register grubu (ölçüm, alarm, enerji sayacı) kendi periyoduyla okunur.
+Görevler son tarihlerine (deadline) göre bir heap'te sıralanır; gateway bant genişliği
+hızlı değişen ölçümlere, yavaş değişen alarm/sayaç register'larına göre daha sık gider.
+"""
+import heapq
+import json
+import logging
+import random
+import time
+
+import okuma_plani
+
+# Bu kadar saniye içinde vadesi gelecek gruplar aynı cihaz isteğinde birleştirilir
+BIRLESTIRME_PENCERESI = 0.25
+
+# Başlangıç fazlarına eklenen rastgele kayma (periyodun oranı)
+JITTER_ORANI = 0.05
+
+
+def cihaz_periyotlarini_coz(metin):
+    """
+    'cihaz_periyotlari' ayarını çözer.
+    Örnek: '{"5": {"olcum": 10}, "7": {"alarm": 60}}'
+
+    Returns:
+        dict: {slave_id: {grup: periyot_sn}}
+    """
+    if not str(metin or '').strip():
+        return {}
+    try:
+        ham = json.loads(metin)
+        return {int(dev_id): {grup: float(periyot) for grup, periyot in gruplar.items()
+                              if grup in okuma_plani.GRUPLAR and float(periyot) > 0}
+                for dev_id, gruplar in ham.items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        logging.warning(f"cihaz_periyotlari ayarı okunamadı: {e}")
+        return {}
+
+
+def grup_periyotlari(config, slave_id):
+    """Bir cihazın okunacak grupları ve periyotları (cihaz ayarı genel ayarı ezer)"""
+    periyotlar = {
+        'olcum': config['refresh_rate'],
+        'alarm': config['alarm_periyot'],
+    }
+    if config.get('uretim_addr') is not None:
+        periyotlar['enerji'] = config['enerji_periyot']
+    for grup, periyot in config.get('cihaz_periyotlari', {}).get(slave_id, {}).items():
+        if grup in periyotlar:
+            periyotlar[grup] = periyot
+    return periyotlar
+
+
+class Zamanlayici:
+    """
+    (son_tarih, sıra, slave_id, grup) görevlerinden oluşan heap.
+
+    hazir_gorevler() vadesi gelen görevleri cihaz başına birleştirip döndürür ve
+    her görevi bir sonraki periyoda planlar. Bir görev bütün bir periyot geç
+    kalmışsa gecikme (overrun) sayılır ve kaçırılan okumalar telafi edilmeden
+    şimdiden itibaren tekrar planlanır.
+    """
+
+    def __init__(self, config, saat=time.monotonic):
+        self._saat = saat
+        self._heap = []
+        self._sira = 0
+        self.son_degerler = {}  # {slave_id: son bilinen tüm alanlar}
+        self.gecikmeler = {}    # {grup: periyodunu kaçıran görev sayısı}
+        self.max_gecikme = 0.0
+        self.yapilandir(config)
+
+    def yapilandir(self, config):
+        """Ayarlar değişince heap'i yeniden kur (son bilinen değerler korunur)"""
+        self.config = config
+        simdi = self._saat()
+        self._heap = []
+        slave_ids = list(config['slave_ids'])
+        for sira, slave_id in enumerate(slave_ids):
+            for grup, periyot in grup_periyotlari(config, slave_id).items():
+                # Cihazlar periyot içine eşit aralıklarla yayılır, üstüne küçük rastgele kayma
+                faz = periyot * sira / len(slave_ids) + random.uniform(0, periyot * JITTER_ORANI)
+                self._ekle(simdi + faz, slave_id, grup, periyot)
+        for slave_id in list(self.son_degerler):
+            if slave_id not in slave_ids:
+                del self.son_degerler[slave_id]
+
+    def _ekle(self, son_tarih, slave_id, grup, periyot):
+        self._sira += 1
+        heapq.heappush(self._heap, (son_tarih, self._sira, slave_id, grup, periyot))
+
+    def sonraki_zaman(self):
+        """En yakın görevin son tarihi (saat cinsinden); görev yoksa None"""
+        return self._heap[0][0] if self._heap else None
+
+    def hazir_gorevler(self, simdi=None):
+        """
+        Vadesi gelmiş (veya BIRLESTIRME_PENCERESI içinde gelecek) görevleri al.
+
+        Returns:
+            list: [(slave_id, gruplar frozenset), ...] - son tarih sırasıyla
+        """
+        simdi = self._saat() if simdi is None else simdi
+        cihaz_gruplari = {}
+        while self._heap and self._heap[0][0] <= simdi + BIRLESTIRME_PENCERESI:
+            son_tarih, _, slave_id, grup, periyot = heapq.heappop(self._heap)
+            cihaz_gruplari.setdefault(slave_id, set()).add(grup)
+
+            gecikme = simdi - son_tarih
+            self.max_gecikme = max(self.max_gecikme, gecikme)
+            sonraki = son_tarih + periyot
+            if sonraki <= simdi:
+                self.gecikmeler[grup] = self.gecikmeler.get(grup, 0) + 1
+                sonraki = simdi + periyot
+            self._ekle(sonraki, slave_id, grup, periyot)
+        return [(slave_id, frozenset(gruplar)) for slave_id, gruplar in cihaz_gruplari.items()]
+
+    def tamamlandi(self, slave_id, gruplar, veriler):
+        """
+        Okuma sonucunu son bilinen değerlerle birleştirir.
+
+        Ölçüm grubu okunduysa veya alarm kodu değiştiyse kaydedilecek tam örneği,
+        aksi halde None döndürür (sadece önbellek güncellenir).
+        """
+        if veriler is None:
+            return None
+        onceki = self.son_degerler.get(slave_id, {})
+        guncel = dict(onceki, **veriler)
+        self.son_degerler[slave_id] = guncel
+        if 'guc' not in guncel:
+            return None  # Henüz hiç ölçüm okunmadı
+        if 'olcum' in gruplar:
+            return dict(guncel)
+        alarm_anahtarlari = [alan.anahtar for alan in
+                             okuma_plani.grup_alanlari(self.config, self.config['alarm_registers'])['alarm']]
+        if any(onceki.get(anahtar, 0) != guncel.get(anahtar, 0) for anahtar in alarm_anahtarlari):
+            return dict(guncel)
+        return None
+
+    def gecikme_raporu(self):
+        """Son rapordan beri biriken gecikme sayaçlarını döndür ve sıfırla"""
+        rapor = {'gecikmeler': dict(self.gecikmeler), 'max_gecikme': round(self.max_gecikme, 3)}
+        self.gecikmeler = {}
+        self.max_gecikme = 0.0
+        return rapor
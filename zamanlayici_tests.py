@@ -0,0 +1,87 @@
+import unittest
+
+import okuma_plani
+import zamanlayici
+
+CONFIG = {
+    'slave_ids': [1, 2],
+    'guc_addr': 70, 'guc_scale': 1.0,
+    'volt_addr': 71, 'volt_scale': 0.1,
+    'akim_addr': 72, 'akim_scale': 0.1,
+    'isi_addr': 74, 'isi_scale': 1.0,
+    'uretim_addr': 73,
+    'refresh_rate': 2.0, 'alarm_periyot': 10.0, 'enerji_periyot': 60.0,
+    'cihaz_periyotlari': {2: {'olcum': 4.0}},
+    'alarm_registers': list(okuma_plani.VARSAYILAN_ALARM_REGISTERLERI),
+}
+
+
+class SahteSaat:
+    def __init__(self):
+        self.zaman = 1000.0
+
+    def __call__(self):
+        return self.zaman
+
+
+class TestZamanlayici(unittest.TestCase):
+    def setUp(self):
+        self.saat = SahteSaat()
+        self.plan = zamanlayici.Zamanlayici(CONFIG, saat=self.saat)
+
+    def _calistir(self, sure, adim=0.5):
+        okunan = []
+        bitis = self.saat.zaman + sure
+        while self.saat.zaman < bitis:
+            okunan.extend(self.plan.hazir_gorevler())
+            self.saat.zaman += adim
+        return okunan
+
+    def test_grup_ve_cihaz_periyotlari(self):
+        okunan = self._calistir(60)
+        sayilar = {}
+        for slave_id, gruplar in okunan:
+            for grup in gruplar:
+                sayilar[(slave_id, grup)] = sayilar.get((slave_id, grup), 0) + 1
+        self.assertEqual(sayilar[(1, 'olcum')], 30)
+        self.assertEqual(sayilar[(2, 'olcum')], 15)
+        self.assertEqual(sayilar[(1, 'alarm')], 6)
+        self.assertEqual(sayilar[(1, 'enerji')], 1)
+        self.assertEqual(self.plan.gecikme_raporu()['gecikmeler'], {})
+
+    def test_ilk_okumada_gruplar_birlesir(self):
+        orijinal, zamanlayici.JITTER_ORANI = zamanlayici.JITTER_ORANI, 0
+        try:
+            self.plan.yapilandir(CONFIG)
+        finally:
+            zamanlayici.JITTER_ORANI = orijinal
+        self.assertEqual(self.plan.hazir_gorevler(), [(1, frozenset({'olcum', 'alarm', 'enerji'}))])
+
+    def test_kacirilan_periyot_raporlanir(self):
+        self.plan.hazir_gorevler()
+        self.saat.zaman += 25
+        self.plan.hazir_gorevler()
+        rapor = self.plan.gecikme_raporu()
+        self.assertEqual(rapor['gecikmeler']['olcum'], 2)
+        self.assertGreater(rapor['max_gecikme'], 20)
+        # Kaçırılan okumalar telafi edilmez, bir sonraki okuma bir periyot sonradır
+        self.assertGreaterEqual(self.plan.sonraki_zaman(), self.saat.zaman)
+
+    def test_son_degerlerle_birlestirir(self):
+        olcum = {'guc': 100, 'voltaj': 230.0, 'akim': 0.4, 'sicaklik': 40}
+        self.assertIsNone(self.plan.tamamlandi(1, frozenset({'alarm'}), {'hata_kodu': 0, 'hata_kodu_193': 0}))
+        ornek = self.plan.tamamlandi(1, frozenset({'olcum'}), olcum)
+        self.assertEqual(ornek['hata_kodu'], 0)
+        self.assertIsNone(self.plan.tamamlandi(1, frozenset({'enerji'}), {'toplam_uretim_wh': 5000}))
+        # Alarm değişimi ölçüm periyodu beklenmeden örnek üretir
+        ornek = self.plan.tamamlandi(1, frozenset({'alarm'}), {'hata_kodu': 4, 'hata_kodu_193': 0})
+        self.assertEqual((ornek['guc'], ornek['hata_kodu'], ornek['toplam_uretim_wh']), (100, 4, 5000))
+
+    def test_cihaz_periyotlari_ayari(self):
+        self.assertEqual(zamanlayici.cihaz_periyotlarini_coz('{"5": {"olcum": 10, "x": 3}}'), {5: {'olcum': 10.0}})
+        self.assertEqual(zamanlayici.cihaz_periyotlarini_coz(''), {})
+        self.assertEqual(zamanlayici.cihaz_periyotlarini_coz('bozuk'), {})
+
+
+if __name__ == '__main__':
+    unittest.main()